@@ -0,0 +1,302 @@
+import os
+import json
+import time
+import threading
+import subprocess
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+# Largest `per_page` the server honors (GitHub and GitLab both cap it at 100)
+DEFAULT_PAGE_SIZE = 100
+
+class FakeApi:
+    """
+    A local stand-in for the GitHub REST API (`flavor="github"`) or GitLab's v4 API
+    (`flavor="gitlab"`), serving the repositories in `repos` ({name: metadata}).
+
+    - `latency`: seconds added to every API response
+    - `page_size`: largest page returned
+    - `rate_limit`: requests allowed per `rate_window` seconds (None: unlimited), reported in
+      the provider's rate limit headers and enforced with 403 (GitHub) or 429 (GitLab)
+    - `git_root`: bare repositories served over smart HTTP (`git http-backend`) at `/<name>.git`,
+      push included
+
+    Counts API requests (`calls`) and rate-limited answers (`throttled`); `reset_counters()`
+    starts a new measurement.
+    """
+
+    def __init__(self, flavor="github", repos=None, latency=0.0, page_size=DEFAULT_PAGE_SIZE,
+                 rate_limit=None, rate_window=60.0, git_root=None, host="127.0.0.1", port=0):
+        if flavor not in ("github", "gitlab"):
+            raise ValueError(f"Unknown flavor: {flavor}")
+        self.flavor = flavor
+        self.repos = repos if repos is not None else {}
+        self.latency = latency
+        self.page_size = page_size
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.git_root = git_root
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self._used = 0
+        self.calls = 0
+        self.throttled = 0
+        self.git_requests = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        """What the provider is configured with (GITHUB_API_URL / GITLAB_API_URL)."""
+        return self.url if self.flavor == "github" else f"{self.url}/api/v4"
+
+    def git_url(self, name):
+        return f"{self.url}/{name}.git"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=f"fake-{self.flavor}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = 0
+            self.throttled = 0
+            self.git_requests = 0
+
+    # --- API ---
+
+    def api(self, method, path, query):
+        """
+        Answers one API request.
+        Returns: (status, headers, JSON body)
+        """
+        headers, allowed = self._take_budget()
+        if not allowed:
+            with self._lock:
+                self.throttled += 1
+            if self.flavor == "github":
+                return 403, headers, {"message": "API rate limit exceeded"}
+            retry_after = max(0, int(headers["RateLimit-Reset"]) - int(time.time()))
+            return 429, {**headers, "Retry-After": str(retry_after)}, {"message": "429 Too Many Requests"}
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if self.flavor == "github":
+            status, extra, body = self._github(method, path, query)
+        else:
+            status, extra, body = self._gitlab(method, path, query)
+        return status, {**headers, **extra}, body
+
+    def _take_budget(self):
+        with self._lock:
+            self.calls += 1
+            if self.rate_limit is None:
+                return {}, True
+            now = time.time()
+            if now - self._window_start >= self.rate_window:
+                self._window_start = now
+                self._used = 0
+            allowed = self._used < self.rate_limit
+            if allowed:
+                self._used += 1
+            remaining = self.rate_limit - self._used
+            reset = str(int(self._window_start + self.rate_window))
+
+        prefix = "X-RateLimit" if self.flavor == "github" else "RateLimit"
+        return {f"{prefix}-Limit": str(self.rate_limit), f"{prefix}-Remaining": str(remaining), f"{prefix}-Reset": reset}, allowed
+
+    def _page(self, path, query, items, render=lambda item: item):
+        """
+        One page of `items` (rendered with `render`), with GitHub's `Link` or GitLab's
+        `X-Total-Pages` header.
+        """
+        per_page = min(int(query.get("per_page", 30)), self.page_size)
+        page = max(1, int(query.get("page", 1)))
+        last = max(1, -(-len(items) // per_page))
+        headers = {}
+        if self.flavor == "github":
+            links = [f'<{self.url}{path}?per_page={per_page}&page={last}>; rel="last"']
+            if page < last:
+                links.insert(0, f'<{self.url}{path}?per_page={per_page}&page={page + 1}>; rel="next"')
+            headers["Link"] = ", ".join(links)
+        else:
+            headers["X-Total-Pages"] = str(last)
+            headers["X-Total"] = str(len(items))
+        return 200, headers, [render(item) for item in items[(page - 1) * per_page:page * per_page]]
+
+    def _sorted_repos(self):
+        return [self.repos[name] for name in sorted(self.repos)]
+
+    def _github(self, method, path, query):
+        if path == "/user/repos":
+            return self._page(path, query, self._sorted_repos(), self._github_repo)
+        if path == "/user/orgs":
+            return self._page(path, query, [])
+        if path == "/user":
+            return 200, {}, {"login": "bench"}
+        if path.startswith("/repos/"):
+            name = path.split("/")[-1]
+            meta = self.repos.get(name)
+            if meta is None or "/branches/" in path:
+                return 404, {}, {"message": "Not Found"}
+            return 200, {}, self._github_repo(meta)
+        return 404, {}, {"message": "Not Found"}
+
+    def _github_repo(self, meta):
+        return {
+            "id": meta["id"],
+            "name": meta["name"],
+            "full_name": f"bench/{meta['name']}",
+            "clone_url": meta["clone_url"],
+            "size": meta["size"],
+            "pushed_at": meta["pushed_at"].strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "default_branch": "main",
+            "archived": False,
+            "fork": False
+        }
+
+    def _gitlab(self, method, path, query):
+        path = path[len("/api/v4"):] if path.startswith("/api/v4") else path
+        if path == "/projects":
+            return self._page(path, query, self._sorted_repos(), self._gitlab_project)
+        if path == "/events":
+            return 200, {}, []
+        if path.startswith("/projects/"):
+            rest = unquote(path[len("/projects/"):])
+            if "/protected_branches/" in rest:
+                return 404, {}, {"message": "404 Not found"}
+            meta = self.repos.get(rest.rsplit("/", 1)[-1])
+            if meta is None:
+                # Destination projects are created by the push itself
+                return 200, {}, {"id": abs(hash(rest)) % 10**9, "default_branch": "main", "path": rest}
+            return 200, {}, self._gitlab_project(meta)
+        return 404, {}, {"message": "404 Not found"}
+
+    def _gitlab_project(self, meta):
+        return {
+            "id": meta["id"],
+            "path": meta["name"],
+            "name": meta["name"],
+            "path_with_namespace": f"bench/{meta['name']}",
+            "http_url_to_repo": meta["clone_url"],
+            "default_branch": "main",
+            "last_activity_at": meta["pushed_at"].strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "statistics": {"repository_size": meta["size"] * 1024}
+        }
+
+    # --- git smart HTTP ---
+
+    def git(self, method, path, query_string, headers, body):
+        """
+        Runs `git http-backend` for one smart HTTP request.
+        Returns: (status, headers, body bytes)
+        """
+        with self._lock:
+            self.git_requests += 1
+        env = {
+            **os.environ,
+            "GIT_PROJECT_ROOT": os.path.abspath(self.git_root),
+            "GIT_HTTP_EXPORT_ALL": "1",
+            "REMOTE_USER": "bench",  # enables receive-pack (pushes)
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": query_string,
+            "CONTENT_TYPE": headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+        }
+        if headers.get("Content-Encoding"):
+            env["HTTP_CONTENT_ENCODING"] = headers["Content-Encoding"]
+        if headers.get("Git-Protocol"):
+            env["GIT_PROTOCOL"] = headers["Git-Protocol"]
+
+        out = subprocess.run(["git", "http-backend"], input=body, env=env, capture_output=True).stdout
+        # CGI response: headers, a blank line, then the body
+        separator = b"\r\n\r\n" if b"\r\n\r\n" in out else b"\n\n"
+        head, _, payload = out.partition(separator)
+
+        status = 200
+        response_headers = {}
+        for line in head.decode(errors="replace").splitlines():
+            key, _, value = line.partition(":")
+            if key.lower() == "status":
+                status = int(value.strip().split()[0])
+            elif key:
+                response_headers[key.strip()] = value.strip()
+        return status, response_headers, payload
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+            def _handle(self, method):
+                parsed = urlparse(self.path)
+                body = self._read_body()
+                if server.git_root and ".git/" in parsed.path:
+                    status, headers, payload = server.git(method, parsed.path, parsed.query, self.headers, body)
+                    self._reply(status, headers, payload)
+                    return
+
+                query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                status, headers, data = server.api(method, parsed.path, query)
+                self._reply(status, {"Content-Type": "application/json", **headers}, json.dumps(data).encode())
+
+            def _read_body(self) -> bytes:
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    chunks = []
+                    while True:
+                        size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            return b"".join(chunks)
+                        chunks.append(self.rfile.read(size))
+                        self.rfile.readline()
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def _reply(self, status, headers, payload):
+                self.send_response(status)
+                for key, value in headers.items():
+                    if key.lower() != "content-length":
+                        self.send_header(key, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def repo_metadata(repo_id, name, clone_url, size_kb) -> dict:
+    """The fields FakeApi serves for one repository."""
+    return {
+        "id": repo_id,
+        "name": name,
+        "clone_url": clone_url,
+        "size": size_kb,
+        "pushed_at": datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    }
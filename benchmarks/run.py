@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "src"))
+
+from fake_api import FakeApi, repo_metadata, DEFAULT_PAGE_SIZE  # noqa: E402
+from synthetic import RepoFactory, empty_bare_repos  # noqa: E402
+
+# Bumped whenever the result format changes
+FORMAT_VERSION = 1
+DEFAULT_SIZES = (100, 1000, 10000)
+# A cycle this much slower than the baseline counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Holocron end-to-end benchmark: full sync cycles against a local fake API and synthetic repositories")
+    parser.add_argument("--repos", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Repository counts to benchmark (default: 100 1000 10000)")
+    parser.add_argument("--source", choices=["github", "gitlab"], default="github", help="Provider API the fake server speaks (default: github)")
+    parser.add_argument("--destination", choices=["local", "gitlab"], default="local", help="local (--backup-only) or a fake GitLab receiving pushes over HTTP (default: local)")
+    parser.add_argument("--transport", choices=["file", "http"], default="file", help="Serve source repositories over file:// or git http-backend (default: file; a GitLab source is always http)")
+    parser.add_argument("--engine", choices=["threaded", "pipeline", "async"], default="threaded", help="Holocron sync engine (default: threaded)")
+    parser.add_argument("--concurrency", type=int, default=5, help="Holocron --concurrency (default: 5)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every API response (default: 0)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help=f"Largest API page served (default: {DEFAULT_PAGE_SIZE})")
+    parser.add_argument("--rate-limit", type=int, default=None, help="API requests allowed per --rate-window (default: unlimited)")
+    parser.add_argument("--rate-window", type=float, default=60.0, help="Rate limit window in seconds (default: 60)")
+    parser.add_argument("--commits", type=int, default=20, help="Commits per branch in each synthetic repository (default: 20)")
+    parser.add_argument("--file-kb", type=int, default=4, help="KiB of random content added by each commit (default: 4)")
+    parser.add_argument("--branches", type=int, default=2, help="Branches per synthetic repository (default: 2)")
+    parser.add_argument("--churn", type=float, default=0.1, help="Fraction of repositories receiving new commits before the second cycle (default: 0.1)")
+    parser.add_argument("--churn-commits", type=int, default=1, help="Commits added to each churned repository (default: 1)")
+    parser.add_argument("--workdir", type=str, default=None, help="Where repositories and mirrors are created (default: a temporary directory, removed afterwards)")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline results file: report makespan changes and exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help=f"Allowed slowdown against --compare, as a fraction (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--verbose", action="store_true", help="Show Holocron's logs")
+    parser.add_argument("--single", type=int, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def run_size(args, count, workdir) -> dict:
+    """
+    Benchmarks one repository count in this process: a cold cycle (every mirror is cloned),
+    a churn cycle (a fraction of the sources moved) and an idle cycle (nothing moved).
+    """
+    from holocron.logger import setup_logger, logger
+    from holocron.state import StateStore
+    from holocron.__main__ import run_sync_cycle, get_provider
+
+    setup_logger(args.verbose)
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+    names = [f"repo-{i:05d}" for i in range(count)]
+    factory = RepoFactory(os.path.join(workdir, "source"), commits=args.commits, file_kb=args.file_kb, branches=args.branches)
+
+    started = time.monotonic()
+    paths = factory.create(names)
+    setup_seconds = time.monotonic() - started
+    size_kb = factory.size_kb(paths[names[0]])
+
+    http_source = args.transport == "http" or args.source == "gitlab"
+    source = FakeApi(args.source, latency=args.latency, page_size=args.page_size, rate_limit=args.rate_limit,
+                     rate_window=args.rate_window, git_root=factory.root if http_source else None).start()
+    destination = None
+    try:
+        for i, name in enumerate(names):
+            clone_url = source.git_url(name) if http_source else f"file://{paths[name]}"
+            source.repos[name] = repo_metadata(i + 1, name, clone_url, size_kb)
+
+        if args.destination == "gitlab":
+            destination_root = os.path.join(workdir, "destination")
+            empty_bare_repos(destination_root, names)
+            destination = FakeApi("gitlab", latency=args.latency, page_size=args.page_size, rate_limit=args.rate_limit,
+                                  rate_window=args.rate_window, git_root=destination_root).start()
+
+        source_provider = get_provider(args.source, "bench-token", source.api_url, source.api_url, concurrency=args.concurrency)
+        destination_provider = None
+        if destination:
+            destination_provider = get_provider("gitlab", "bench-token", destination.api_url, destination.api_url, concurrency=args.concurrency)
+
+        storage = os.path.join(workdir, "mirrors")
+        config = {
+            "concurrency": args.concurrency,
+            "fetch_concurrency": None,
+            "prepare_concurrency": None,
+            "push_concurrency": None,
+            "storage": storage,
+            "watch": False,
+            "window": 10,
+            "interval": 60,
+            "backup_only": destination is None,
+            "dry_run": False,
+            "checkout": False,
+            "engine": args.engine,
+        }
+        os.makedirs(storage, exist_ok=True)
+        state = StateStore(os.path.join(workdir, "state.db"))
+
+        cycles = []
+        try:
+            for name in ("cold", "churn", "idle"):
+                changed = count if name == "cold" else 0
+                if name == "churn":
+                    churned = names[:max(1, int(count * args.churn))] if args.churn > 0 else []
+                    for repo in churned:
+                        factory.churn(paths[repo], args.churn_commits)
+                        source.repos[repo] = {**source.repos[repo], "pushed_at": datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)}
+                    changed = len(churned)
+                for server in (source, destination):
+                    if server:
+                        server.reset_counters()
+
+                started = time.monotonic()
+                synced = run_sync_cycle(config, source_provider, destination_provider, state)
+                makespan = time.monotonic() - started
+                cycles.append({
+                    "cycle": name,
+                    "makespan_s": round(makespan, 3),
+                    # Every repository is looked at; only the changed ones are fetched
+                    "synced": synced,
+                    "changed": changed,
+                    "repos_per_s": round(synced / makespan, 2) if makespan > 0 else None,
+                    "api_calls": source.calls + (destination.calls if destination else 0),
+                    "api_throttled": source.throttled + (destination.throttled if destination else 0),
+                    "git_http_requests": source.git_requests + (destination.git_requests if destination else 0),
+                })
+        finally:
+            state.close()
+    finally:
+        source.stop()
+        if destination:
+            destination.stop()
+
+    return {
+        "repos": count,
+        "repo_size_kb": size_kb,
+        "setup_s": round(setup_seconds, 3),
+        "cycles": cycles,
+        # Linux reports KiB (macOS: bytes); the children are the git processes
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "peak_child_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+def run_isolated(args, count, workdir) -> dict:
+    """Runs one size in a fresh interpreter, so peak RSS belongs to that size alone."""
+    argv = [sys.executable, os.path.abspath(__file__), "--single", str(count), "--workdir", workdir]
+    for key, value in vars(args).items():
+        if key in ("repos", "single", "workdir", "output", "compare", "tolerance") or value is None or value is False:
+            continue
+        argv.append(f"--{key.replace('_', '-')}")
+        if value is not True:
+            argv.append(str(value))
+    out = subprocess.run(argv, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(out)
+
+def environment(args) -> dict:
+    git = subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+    options = {key: value for key, value in vars(args).items() if key not in ("repos", "single", "workdir", "output", "compare", "tolerance", "verbose")}
+    return {
+        "format": FORMAT_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "git": git,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "options": options,
+    }
+
+def compare(results, baseline, tolerance) -> list:
+    """
+    Matches cycles by (repos, cycle) and lists the makespan changes.
+    Returns: [(repos, cycle, baseline seconds, seconds, ratio, regressed)]
+    """
+    before = {(size["repos"], cycle["cycle"]): cycle["makespan_s"] for size in baseline["results"] for cycle in size["cycles"]}
+    rows = []
+    for size in results["results"]:
+        for cycle in size["cycles"]:
+            key = (size["repos"], cycle["cycle"])
+            if key not in before or not before[key]:
+                continue
+            ratio = cycle["makespan_s"] / before[key]
+            rows.append((*key, before[key], cycle["makespan_s"], ratio, ratio > 1 + tolerance))
+    return rows
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.single is not None:
+        print(json.dumps(run_size(args, args.single, args.workdir)))
+        return 0
+
+    root = args.workdir or tempfile.mkdtemp(prefix="holocron-bench-")
+    try:
+        results = {**environment(args), "results": []}
+        for count in args.repos:
+            workdir = os.path.join(root, f"n{count}")
+            shutil.rmtree(os.path.join(workdir, "mirrors"), ignore_errors=True)
+            shutil.rmtree(os.path.join(workdir, "destination"), ignore_errors=True)
+            if os.path.exists(os.path.join(workdir, "state.db")):
+                os.remove(os.path.join(workdir, "state.db"))
+            result = run_isolated(args, count, workdir)
+            results["results"].append(result)
+            summary = ", ".join(f"{c['cycle']} {c['makespan_s']:.1f}s ({c['repos_per_s'] or 0:.1f} repos/s, {c['api_calls']} API calls)" for c in result["cycles"])
+            print(f"{count} repos: {summary}, peak RSS {result['peak_rss_kb'] // 1024} MiB", file=sys.stderr)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressed = False
+        for repos, cycle, old, new, ratio, slower in compare(results, baseline, args.tolerance):
+            regressed = regressed or slower
+            print(f"{repos:>6} {cycle:<6} {old:8.2f}s -> {new:8.2f}s ({ratio - 1:+.0%}){'  REGRESSION' if slower else ''}", file=sys.stderr)
+        return 1 if regressed else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import os
+import time
+import shutil
+import random
+import subprocess
+
+class RepoFactory:
+    """
+    Generates synthetic bare repositories under `root`.
+    One template repository is built with `git fast-import` (`commits` commits of a
+    `file_kb` KiB file on each of `branches` branches), then copied: creating thousands of
+    repositories costs file copies, not thousands of git invocations.
+    """
+
+    def __init__(self, root, commits=20, file_kb=4, branches=2, seed=0):
+        self.root = root
+        self.commits = commits
+        self.file_kb = file_kb
+        self.branches = branches
+        self._random = random.Random(seed)
+        self._clock = int(time.time()) - commits * 60
+
+    def template(self) -> str:
+        path = os.path.join(self.root, ".template.git")
+        if os.path.exists(path):
+            return path
+        tmp = f"{path}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        _init_bare(tmp)
+        stream = []
+        for branch in range(self.branches):
+            ref = "refs/heads/main" if branch == 0 else f"refs/heads/branch-{branch}"
+            for n in range(self.commits):
+                stream.append(self._commit(ref, f"{ref} commit {n}", from_ref="refs/heads/main" if branch and n == 0 else None))
+        _fast_import(tmp, b"".join(stream))
+        subprocess.run(["git", "-C", tmp, "symbolic-ref", "HEAD", "refs/heads/main"], check=True)
+        os.replace(tmp, path)
+        return path
+
+    def create(self, names) -> dict:
+        """
+        Creates one bare repository per name (existing ones are kept).
+        Returns: {name: path}
+        """
+        os.makedirs(self.root, exist_ok=True)
+        template = self.template()
+        paths = {}
+        for name in names:
+            path = os.path.join(self.root, f"{name}.git")
+            if not os.path.exists(path):
+                shutil.copytree(template, path, symlinks=True)
+            paths[name] = path
+        return paths
+
+    def churn(self, path, commits=1):
+        """Adds `commits` commits to `main` of an existing repository."""
+        stream = b"".join(
+            self._commit("refs/heads/main", f"churn {n}", from_ref="refs/heads/main^0" if n == 0 else None)
+            for n in range(commits)
+        )
+        _fast_import(path, stream)
+
+    def size_kb(self, path) -> int:
+        total = 0
+        for directory, _, files in os.walk(path):
+            for name in files:
+                total += os.path.getsize(os.path.join(directory, name))
+        return total // 1024
+
+    def _commit(self, ref, message, from_ref=None) -> bytes:
+        self._clock += 1
+        # Random content: compresses (and deltas) like real binary churn, not like zeros
+        content = self._random.randbytes(self.file_kb * 1024)
+        msg = message.encode()
+        lines = [
+            f"commit {ref}\n".encode(),
+            f"committer Bench <bench@example.com> {self._clock} +0000\n".encode(),
+            f"data {len(msg)}\n".encode() + msg + b"\n",
+        ]
+        if from_ref:
+            lines.append(f"from {from_ref}\n".encode())
+        lines.append(f"M 644 inline file-{self._clock}.bin\n".encode())
+        lines.append(f"data {len(content)}\n".encode() + content + b"\n")
+        return b"".join(lines)
+
+def empty_bare_repos(root, names) -> dict:
+    """Empty bare repositories to push into (a destination), copied from one template."""
+    os.makedirs(root, exist_ok=True)
+    template = os.path.join(root, ".empty.git")
+    if not os.path.exists(template):
+        _init_bare(template)
+    paths = {}
+    for name in names:
+        path = os.path.join(root, f"{name}.git")
+        if not os.path.exists(path):
+            shutil.copytree(template, path, symlinks=True)
+        paths[name] = path
+    return paths
+
+def _init_bare(path):
+    # No template: skips copying the sample hooks into every repository
+    subprocess.run(["git", "init", "--quiet", "--bare", "--template=", path], check=True)
+    subprocess.run(["git", "-C", path, "symbolic-ref", "HEAD", "refs/heads/main"], check=True)
+
+def _fast_import(path, stream: bytes):
+    subprocess.run(["git", "-C", path, "fast-import", "--quiet", "--force"], input=stream, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
@@ -2,20 +2,47 @@
 import os
 import sys
 import time
+import asyncio
+import threading
+import subprocess
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 # Import from local modules
 from .config import parse_args, validate_config, __author__, __license__, GITLAB_API_URL, GITHUB_API_URL
 from .logger import setup_logger, logger, log_execution
-from .mirror import needs_sync, sync_one_repo
-from .utils import handle_credits, print_storage_estimate
+from .mirror import needs_sync, sync_one_repo, create_job, fetch_stage, prepare_stage, push_stage, fail_job, finish_job
+from .pipeline import Pipeline, Stage
+from .async_mirror import sync_all
+from .webhook import Coalescer, WebhookServer, check_exposure, find_repository, Inventory
+from .changes import ChangeFeed
+from .hostlimits import parse_host_limits, configure_host_limits
+from .bundles import BundlePolicy
+from .maintenance import Maintainer
+from .diskusage import DiskAccountant
+from .tracing import Tracer, set_tracer, traced
+from .metrics import MetricsServer, CYCLE_SECONDS, CYCLE_REPOS, SYNCS, QUEUE_DEPTH, in_flight
+from .state import StateStore, default_state_path
+from .scheduler import plan_cycle, check_deadline
+from .utils import handle_credits
 from .providers.gitlab import GitLabProvider
 from .providers.github import GitHubProvider
+from .providers.base import ListingError
+from .providers.http import DEFAULT_ORG_CONCURRENCY
 
+# Webhook mode: least seconds between two reconciliations requested by events about unknown repositories
+MIN_EVENT_RECONCILE_GAP = 60
+
+@traced("cycle", record=())
 @log_execution
-def run_sync_cycle(config: dict, source_provider, destination_provider, synced_pushes):
-    """Executes one full synchronization cycle."""
+def run_sync_cycle(config: dict, source_provider, destination_provider, state: StateStore, change_feed=None, accountant=None):
+    """
+    Executes one full synchronization cycle.
+    Reads the last synced state from `state` and records every outcome back into it.
+    With a `change_feed`, only the repositories it reports as changed are looked at,
+    except on its (slow) reconciliation cadence.
+    With an `accountant` (DiskAccountant), storage usage is measured after full cycles.
+    """
     # Unpack config
     concurrency = config['concurrency']
     storage = config['storage']
@@ -23,63 +50,317 @@ def run_sync_cycle(config: dict, source_provider, destination_provider, synced_p
     window = config['window']
     backup_only = config['backup_only']
     dry_run = config['dry_run']
-    checkout = config['checkout']
 
-    repos = source_provider.fetch_repos()
-    logger.debug(f"Found {len(repos)} repositories on GitHub.")
-    
-    print_storage_estimate(repos, checkout_mode=checkout)
+    try:
+        if change_feed:
+            repos, full = change_feed.poll()
+        else:
+            repos, full = source_provider.fetch_repos(), True
+    except ListingError as e:
+        # A truncated inventory would look like deleted repositories and stale timestamps
+        logger.error(f"Source listing incomplete ({e}), skipping this cycle.")
+        return 0
+
+    if full:
+        logger.debug(f"Found {len(repos)} repositories on GitHub.")
+
+    # One read up front, instead of a query per repository
+    known = state.load()
+
+    # Smart filtering
+    selected = []
+    for repo in repos:
+        repo_name = repo.name
+        pushed_at = repo.pushed_at
+        repo_dir = os.path.join(storage, f"{repo_name}.git")
+
+        # The change feed already vouches for these
+        if watch and full:
+            # 1. Skip if already synced this exact push
+            previous = known.get(repo_name)
+            if previous and previous.pushed_at == pushed_at:
+                continue
+            
+            # 2. Check time window (SKIP if old AND local repo exists)
+            if os.path.exists(repo_dir) and not needs_sync(repo, window):
+                    continue
+
+        selected.append(repo)
+
+    # Longest expected jobs first, so a big repo does not start last
+    plan = plan_cycle(selected, known, storage, concurrency)
+    if watch:
+        check_deadline(plan, config['interval'])
+
+    if config['engine'] == "pipeline" and not dry_run:
+        outcomes = _run_pipelined(plan, config, source_provider, destination_provider, known)
+    elif config['engine'] == "async" and not dry_run:
+        outcomes = _run_async(plan, config, source_provider, destination_provider, known)
+    else:
+        outcomes = _run_threaded(plan, config, source_provider, destination_provider, known)
 
     sync_count = 0
-    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+    unchanged_count = 0
+    failed_count = 0
+    started = time.monotonic()
+    for repo, result, exc in outcomes:
+        if not record_outcome(state, repo, result, exc):
+            failed_count += 1
+            continue
+
+        sync_count += 1
+        if not result.fetched:
+            unchanged_count += 1
+
+    if plan.jobs:
+        makespan = time.monotonic() - started
+        CYCLE_SECONDS.observe(makespan)
+        logger.debug(f"Cycle makespan: {makespan:.1f}s (predicted {plan.makespan:.1f}s).")
+
+    for outcome, count in (("listed", len(repos)), ("selected", len(selected)), ("skipped", len(repos) - len(selected)),
+                           ("synced", sync_count), ("failed", failed_count)):
+        CYCLE_REPOS.set(count, outcome=outcome)
+
+    if sync_count:
+        logger.debug(f"Ref pre-check: {sync_count - unchanged_count} fetched, {unchanged_count} unchanged (skipped).")
+
+    for label, provider in (("source", source_provider), ("destination", destination_provider)):
+        if provider:
+            provider.report_usage(label)
+
+    if accountant and full and not dry_run:
+        accountant.report(repos)
+    
+    return sync_count
+
+def record_outcome(state: StateStore, repo, result, exc=None) -> bool:
+    """
+    Records the outcome of one repository sync in `state`.
+    Returns: True if the sync succeeded.
+    """
+    if exc is not None:
+        logger.error(f"[{repo.name}] generated an exception: {exc}")
+        state.record_failure(repo.name, str(exc))
+        SYNCS.inc(outcome="failure")
+        return False
+
+    if not result.ok:
+        state.record_failure(repo.name, result.error, duration=result.duration)
+        SYNCS.inc(outcome="failure")
+        return False
+
+    SYNCS.inc(outcome="success")
+    state.record_success(
+        repo.name,
+        pushed_at=repo.pushed_at,
+        source_tip=result.source_tip,
+        destination_tip=result.destination_tip,
+        duration=result.duration
+    )
+    return True
+
+def run_webhook_listener(config: dict, source_provider, destination_provider, state: StateStore, tracer=None):
+    """
+    Webhook mode: syncs a repository as soon as its source reports a push, and reconciles
+    the full inventory every --reconcile-interval seconds to catch missed deliveries.
+    Only listed repositories are synced; an event about an unknown one triggers a
+    reconciliation (at most one per MIN_EVENT_RECONCILE_GAP seconds) instead.
+    With a `tracer`, the spans of each reconciliation interval are written to --trace-dir.
+    Runs until interrupted.
+    """
+    inventory = Inventory()  # name -> Repository from the last listing (sizes, default branches, ...)
+    reconcile_now = threading.Event()
+
+    def sync_from_event(queued_repo):
+        # The latest listing wins, e.g. after a default branch rename
+        repo = inventory.get(queued_repo.name, queued_repo)
+        # Current pushed_at, so the next reconciliation does not sync it again
+        repo = source_provider.refresh_repo(repo) or repo
+        try:
+            result = sync_one_repo(
+                repo=repo,
+                storage_path=config['storage'],
+                dry_run=config['dry_run'],
+                backup_only=config['backup_only'],
+                checkout=config['checkout'],
+                source_provider=source_provider,
+                destination_provider=destination_provider,
+                last_state=state.get(repo.name),
+                bundles=bundle_policy(config),
+                fork_pools=config.get('fork_pools', False),
+                checkout_mode=config.get('checkout_mode', 'clone')
+            )
+        except Exception as exc:
+            record_outcome(state, repo, None, exc)
+            return
+        if record_outcome(state, repo, result):
+            logger.info(f"[{repo.name}] Synced after webhook.")
+
+    coalescer = Coalescer(sync_from_event, delay=config['coalesce_delay'], workers=config['concurrency'])
+
+    def on_event(change):
+        route_event(change, inventory, coalescer.submit, reconcile_now.set)
+
+    server = WebhookServer(config['webhook_host'], config['webhook_port'], config['webhook_secret'], on_event)
+    if not config['webhook_secret']:
+        logger.warning("No --webhook-secret set: webhook deliveries are not authenticated (loopback only).")
+    server.start()
+
+    try:
+        while True:
+            reconcile_now.clear()
+            last_reconcile = time.monotonic()
+            try:
+                queued = reconcile(source_provider, state, config['storage'], inventory, coalescer.submit)
+                logger.debug(f"Reconciliation queued {queued} repositories.")
+            except ListingError as e:
+                logger.error(f"Source listing incomplete ({e}), skipping this reconciliation.")
+            reconcile_now.wait(config['reconcile_interval'])
+            time.sleep(max(0.0, last_reconcile + MIN_EVENT_RECONCILE_GAP - time.monotonic()))
+            if tracer:
+                tracer.dump(config['trace_dir'], label="webhook")
+    finally:
+        server.stop()
+        coalescer.close()
+
+def route_event(change, inventory: dict, submit, request_reconcile):
+    """
+    Submits the listed repository a webhook event is about. Unknown repositories (e.g. just
+    created, or a forged name) are never synced from the payload: they request a reconciliation,
+    which syncs them if the source lists them.
+    """
+    repo = find_repository(inventory, change)
+    if repo is None:
+        logger.info(f"[{change.name}] Webhook for a repository not listed yet, reconciling.")
+        request_reconcile()
+        return
+    submit(repo)
+
+def reconcile(source_provider, state: StateStore, storage, inventory: dict, submit) -> int:
+    """
+    Lists the source and submits every repository whose last push was not synced yet,
+    whatever its age (unlike --window), or which has no local mirror.
+    Returns: The number of repositories submitted.
+    """
+    repos = source_provider.fetch_repos()
+    inventory.update({repo.name: repo for repo in repos})
+    known = state.load()
+
+    queued = 0
+    for repo in repos:
+        previous = known.get(repo.name)
+        missing = not os.path.exists(os.path.join(storage, f"{repo.name}.git"))
+        if missing or not previous or previous.pushed_at != repo.pushed_at or previous.error:
+            submit(repo)
+            queued += 1
+    return queued
+
+def _run_threaded(plan, config, source_provider, destination_provider, known):
+    """
+    One worker per repository runs the whole sync_one_repo.
+    Yields: (repo, SyncResult, exception or None) as repositories complete.
+    """
+    bundles = bundle_policy(config)
+
+    def run(**kwargs):
+        QUEUE_DEPTH.dec(stage="sync")
+        with in_flight("sync"):
+            return sync_one_repo(**kwargs)
+
+    with ThreadPoolExecutor(max_workers=config['concurrency']) as executor:
         future_to_repo = {}
-        for repo in repos:
-            repo_name = repo.name
-            pushed_at = repo.pushed_at
-            repo_dir = os.path.join(storage, f"{repo_name}.git")
-
-            # Smart filtering
-            if watch:
-                # 1. Skip if already synced this exact push
-                if repo_name in synced_pushes and synced_pushes[repo_name] == pushed_at:
-                    continue
-                
-                # 2. Check time window (SKIP if old AND local repo exists)
-                if os.path.exists(repo_dir) and not needs_sync(repo, window):
-                        continue
-            
+        for job in plan.jobs:
+            repo = job.repo
+            QUEUE_DEPTH.inc(stage="sync")
             # Pass explicit params to sync_one_repo
             future = executor.submit(
-                sync_one_repo, 
+                run, 
                 repo=repo, 
-                storage_path=storage, 
-                dry_run=dry_run, 
-                backup_only=backup_only,
-                checkout=checkout,
+                storage_path=config['storage'], 
+                dry_run=config['dry_run'], 
+                backup_only=config['backup_only'],
+                checkout=config['checkout'],
                 source_provider=source_provider, 
-                destination_provider=destination_provider
+                destination_provider=destination_provider,
+                last_state=known.get(repo.name),
+                bundles=bundles,
+                fork_pools=config.get('fork_pools', False),
+                checkout_mode=config.get('checkout_mode', 'clone')
             )
             future_to_repo[future] = repo
 
         for future in as_completed(future_to_repo):
             repo = future_to_repo[future]
             try:
-                future.result()
-                sync_count += 1
-                if repo.pushed_at:
-                    synced_pushes[repo.name] = repo.pushed_at
+                yield repo, future.result(), None
             except Exception as exc:
-                logger.error(f"[{repo.name}] generated an exception: {exc}")
-    
-    return sync_count
+                yield repo, None, exc
+
+def _run_pipelined(plan, config, source_provider, destination_provider, known):
+    """
+    Fetch, prepare and push run as separate stages, each with its own pool size
+    (--fetch-concurrency, --prepare-concurrency, --push-concurrency).
+    Yields: (repo, SyncResult, exception or None) as repositories complete.
+    """
+    concurrency = config['concurrency']
+    jobs = _create_jobs(plan, config, source_provider, destination_provider, known)
+    pipeline = Pipeline([
+        Stage("fetch", fetch_stage, config['fetch_concurrency'] or concurrency),
+        Stage("prepare", prepare_stage, config['prepare_concurrency'] or concurrency),
+        Stage("push", push_stage, config['push_concurrency'] or concurrency),
+    ])
 
+    for job, exc in pipeline.run(jobs):
+        if isinstance(exc, subprocess.CalledProcessError):
+            fail_job(job, exc)
+            exc = None
+        yield job.repo, finish_job(job), exc
 
-def get_provider(name, token, api_url_github, api_url_gitlab, namespace=None):
+    if jobs:
+        busy = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in pipeline.busy.items())
+        logger.debug(f"Pipeline stage busy time: {busy}")
+
+def _run_async(plan, config, source_provider, destination_provider, known):
+    """
+    Runs all git operations as asyncio subprocesses on one event loop,
+    at most --concurrency repositories at a time.
+    Yields: (repo, SyncResult, exception or None).
+    """
+    jobs = _create_jobs(plan, config, source_provider, destination_provider, known)
+    for job, exc in asyncio.run(sync_all(jobs, config['concurrency'])):
+        yield job.repo, job.result, exc
+
+def _create_jobs(plan, config, source_provider, destination_provider, known):
+    """Builds the SyncJobs of a plan, in plan order."""
+    os.makedirs(config['storage'], exist_ok=True)
+    return [
+        create_job(
+            job.repo,
+            config['storage'],
+            backup_only=config['backup_only'],
+            checkout=config['checkout'],
+            source_provider=source_provider,
+            destination_provider=destination_provider,
+            last_state=known.get(job.repo.name),
+            bundles=bundle_policy(config),
+            fork_pools=config.get('fork_pools', False),
+            checkout_mode=config.get('checkout_mode', 'clone')
+        )
+        for job in plan.jobs
+    ]
+
+def bundle_policy(config: dict):
+    """BundlePolicy for --bundle-dir, or None if bundle export is off."""
+    if not config.get('bundle_dir'):
+        return None
+    return BundlePolicy(config['bundle_dir'], chain_length=config['bundle_chain_length'])
+
+def get_provider(name, token, api_url_github, api_url_gitlab, namespace=None, org_concurrency=DEFAULT_ORG_CONCURRENCY, concurrency=5, github_graphql=False, protection_ttl=3600):
     """Factory to get the correct provider instance."""
     if name == "github":
-        return GitHubProvider(token, api_url_github)
+        return GitHubProvider(token, api_url_github, org_concurrency=org_concurrency, pool_size=concurrency, use_graphql=github_graphql, protection_ttl=protection_ttl)
     elif name == "gitlab":
-        return GitLabProvider(api_url_gitlab, token, namespace)
+        return GitLabProvider(api_url_gitlab, token, namespace, pool_size=concurrency, protection_ttl=protection_ttl)
     else:
         raise ValueError(f"Unknown provider: {name}")
 
@@ -88,7 +369,15 @@ def main():
     handle_credits(args.credits)
     
     # Initialize Logger Global Configuration
-    setup_logger(args.verbose)
+    setup_logger(args.verbose, json_format=args.log_format == "json")
+
+    try:
+        configure_host_limits(parse_host_limits(args.host_limit))
+        if args.webhook_port:
+            check_exposure(args.webhook_host, args.webhook_secret)
+    except ValueError as e:
+        print(f"CRITICAL: {e}")
+        sys.exit(1)
 
     # Handle 'local' destination alias
     if args.destination == "local":
@@ -108,7 +397,11 @@ def main():
         get_token_for(args.source), 
         GITHUB_API_URL, 
         GITLAB_API_URL,
-        namespace=args.gitlab_namespace
+        namespace=args.gitlab_namespace,
+        org_concurrency=args.org_concurrency,
+        concurrency=args.concurrency,
+        github_graphql=args.github_graphql,
+        protection_ttl=args.protection_ttl
     )
     
     destination_provider = None
@@ -118,31 +411,70 @@ def main():
             get_token_for(args.destination),
             GITHUB_API_URL,
             GITLAB_API_URL,
-            namespace=args.gitlab_namespace
+            namespace=args.gitlab_namespace,
+            org_concurrency=args.org_concurrency,
+            concurrency=args.concurrency,
+            github_graphql=args.github_graphql,
+            protection_ttl=args.protection_ttl
         )
 
     logger.info("Initializing Holocron...")
     if args.dry_run:
         logger.info("!!! DRY RUN MODE ACTIVE !!!")
 
-    synced_pushes = {}
+    # Dry runs must not leave a trace, so they get a throwaway in-memory state
+    state = StateStore(":memory:" if args.dry_run else default_state_path(args.storage))
     
     # Convert args to a dict (or Config object) for easier passing to cycle runner
     # We could also pass args directly but we want to decouple run_sync_cycle from argparse
     config = vars(args)
 
-    while True:
-        sync_count = run_sync_cycle(config, source_provider, destination_provider, synced_pushes)
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = MetricsServer(args.metrics_host, args.metrics_port)
+        metrics_server.start()
 
-        if sync_count > 0:
-            logger.info(f"Sync cycle complete. Updated {sync_count} repositories.")
-        else:
-            logger.debug("No changes detected in this cycle.")
+    maintainer = None
+    if args.maintenance_interval and not args.dry_run:
+        maintainer = Maintainer(args.storage, state, args.maintenance_interval)
+        maintainer.start()
 
-        if not args.watch:
-            break
-            
-        time.sleep(args.interval)
+    accountant = DiskAccountant(args.storage, state)
+
+    tracer = None
+    if args.trace_dir:
+        tracer = Tracer()
+        set_tracer(tracer)
+
+    change_feed = None
+    if args.change_feed and args.watch:
+        change_feed = ChangeFeed(source_provider, state, args.reconcile_interval, name=args.source)
+
+    try:
+        if args.webhook_port:
+            run_webhook_listener(config, source_provider, destination_provider, state, tracer)
+            return
+
+        while True:
+            sync_count = run_sync_cycle(config, source_provider, destination_provider, state, change_feed, accountant)
+            if tracer:
+                tracer.dump(args.trace_dir)
+
+            if sync_count > 0:
+                logger.info(f"Sync cycle complete. Updated {sync_count} repositories.")
+            else:
+                logger.debug("No changes detected in this cycle.")
+
+            if not args.watch:
+                break
+                
+            time.sleep(args.interval)
+    finally:
+        if maintainer:
+            maintainer.stop()
+        if metrics_server:
+            metrics_server.stop()
+        state.close()
 
 if __name__ == "__main__":
     main()
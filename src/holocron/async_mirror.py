@@ -0,0 +1,81 @@
+import asyncio
+import subprocess
+from .hostlimits import async_host_slot
+from .metrics import in_flight, QUEUE_DEPTH
+from .tracing import traced, lane
+from .mirror import SyncJob, Git, sync_plan
+
+# Trace timeline rows of the asyncio worker slots (real thread ids are far larger)
+TRACE_LANE_BASE = 1000
+
+# The asyncio engine (--engine async): runs the same sync plans as mirror.py, but every git command
+# is an asyncio subprocess, so hundreds of repositories can be in flight without a thread each.
+
+async def run_git(cmd, capture=False) -> str:
+    """
+    Runs a git command as an asyncio subprocess.
+    Returns: stdout (decoded) if `capture`, else an empty string.
+    Raises: subprocess.CalledProcessError with the decoded stderr, like the threaded engine.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE if capture else asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        err_msg = stderr.decode(errors="replace").strip() if stderr else ""
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output=stdout, stderr=err_msg)
+    return stdout.decode(errors="replace") if capture else ""
+
+async def sync_all(jobs, concurrency):
+    """
+    Syncs all `jobs` on one event loop, at most `concurrency` at a time.
+    Returns: A list of (SyncJob, exception or None), in completion order.
+    """
+    limit = asyncio.Semaphore(max(1, concurrency))
+    slots = list(range(max(1, concurrency)))
+    outcomes = []
+
+    async def run(job):
+        QUEUE_DEPTH.inc(stage="sync")
+        async with limit:
+            QUEUE_DEPTH.dec(stage="sync")
+            # Each semaphore slot is one row of the trace timeline, like a worker thread
+            slot = slots.pop()
+            try:
+                with in_flight("sync"), lane(TRACE_LANE_BASE + slot, f"async-worker-{slot}"):
+                    await sync_job(job)
+                outcomes.append((job, None))
+            except Exception as e:
+                outcomes.append((job, e))
+            finally:
+                slots.append(slot)
+
+    await asyncio.gather(*(run(job) for job in jobs))
+    return outcomes
+
+async def run_step(step):
+    if isinstance(step, Git):
+        async with async_host_slot(step.host_url):
+            return await run_git(step.cmd, step.capture)
+    # Provider API calls, locks and pools are blocking: keep them off the loop
+    return await asyncio.to_thread(step.func, *step.args)
+
+async def run_plan(plan):
+    """Runs a plan of mirror.py on the event loop (see mirror.run_plan). Returns: what the plan returns."""
+    result, error = None, None
+    while True:
+        try:
+            step = plan.throw(error) if error else plan.send(result)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            result, error = await run_step(step), None
+        except Exception as e:
+            result, error = None, e
+
+@traced("sync", record=())
+async def sync_job(job: SyncJob):
+    """The async counterpart of sync_one_repo: fetch, prepare, push, checkout."""
+    return await run_plan(sync_plan(job))
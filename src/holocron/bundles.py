@@ -0,0 +1,131 @@
+import os
+import json
+import subprocess
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+from .logger import logger
+from .refs import read_local_refs, diff_refs
+
+MANIFEST_FILENAME = "manifest.json"
+# Incremental bundles in a chain before it is consolidated into a single full bundle
+DEFAULT_CHAIN_LENGTH = 7
+
+@dataclass
+class BundlePolicy:
+    """Where bundles go (`root/<repo>/`) and how long a chain may grow."""
+    root: str
+    chain_length: int = DEFAULT_CHAIN_LENGTH
+
+def load_manifest(bundle_dir) -> dict:
+    """
+    Reads a repository's bundle manifest:
+    {"bundles": [{"sequence", "file", "type": "full"|"incremental", "refs": {ref: sha}, "deleted": [...], "created"}]}
+    `file` is None for an entry that only deleted refs.
+    Restoring means fetching every bundle in order; the last entry's `refs` is the final state.
+    """
+    try:
+        with open(os.path.join(bundle_dir, MANIFEST_FILENAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"bundles": []}
+
+def _write_manifest(bundle_dir, manifest):
+    path = os.path.join(bundle_dir, MANIFEST_FILENAME)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def export_bundle(name, repo_dir, policy: BundlePolicy) -> Optional[str]:
+    """
+    Appends a bundle with everything that changed since the last one to `<root>/<name>/`.
+    The first bundle, and the one after `chain_length` incrementals, is a full bundle that
+    replaces the chain. Incrementals only hold objects not reachable from the previous tips.
+    Returns: The path of the new bundle, or None if the refs did not change.
+    """
+    refs = read_local_refs(repo_dir)
+    if not refs:
+        return None
+
+    bundle_dir = os.path.join(policy.root, name)
+    os.makedirs(bundle_dir, exist_ok=True)
+    manifest = load_manifest(bundle_dir)
+    chain = manifest["bundles"]
+    previous = chain[-1]["refs"] if chain else {}
+    if refs == previous:
+        return None
+
+    sequence = chain[-1]["sequence"] + 1 if chain else 1
+    incremental = bool(chain) and len(chain) <= policy.chain_length
+    updated, deleted = diff_refs(previous, refs)
+
+    entry = None
+    stale = []
+    if incremental:
+        entry = {"file": f"{sequence:06d}-incremental.bundle", "type": "incremental"}
+        # Objects the previous tips reach are already in the chain
+        revs = sorted(updated) + sorted({f"^{sha}" for sha in previous.values()})
+        try:
+            _create_bundle(repo_dir, os.path.join(bundle_dir, entry["file"]), revs)
+        except subprocess.CalledProcessError as e:
+            # e.g. a previous tip was force-pushed away and garbage collected
+            logger.debug(f"[{name}] Incremental bundle failed, writing a full one instead: {e.stderr}")
+            entry = None
+        except _NothingToBundle:
+            # Only deletions, or refs moved back to known commits
+            entry = {"file": None, "type": "incremental"}
+
+    if entry is None:
+        entry = {"file": f"{sequence:06d}-full.bundle", "type": "full"}
+        _create_bundle(repo_dir, os.path.join(bundle_dir, entry["file"]))
+        stale = [old["file"] for old in chain if old["file"]]
+        chain = []
+
+    entry.update({
+        "sequence": sequence,
+        "refs": refs,
+        "deleted": deleted,
+        "created": datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+    })
+    chain.append(entry)
+    manifest["bundles"] = chain
+    _write_manifest(bundle_dir, manifest)
+
+    if entry["type"] == "full":
+        # Only once the manifest no longer references them
+        for old in stale:
+            try:
+                os.remove(os.path.join(bundle_dir, old))
+            except OSError:
+                pass
+        logger.info(f"[{name}] Wrote full bundle {entry['file']}.")
+    elif entry["file"]:
+        logger.debug(f"[{name}] Wrote incremental bundle {entry['file']} ({len(updated)} refs, {len(deleted)} deleted).")
+
+    return os.path.join(bundle_dir, entry["file"]) if entry["file"] else None
+
+class _NothingToBundle(Exception):
+    pass
+
+def _create_bundle(repo_dir, path, revs=None):
+    """
+    Runs `git bundle create` into a temp file renamed into place.
+    `revs` (rev-list arguments, passed on stdin) select what goes in; None means all refs.
+    """
+    tmp = f"{path}.tmp"
+    cmd = ["git", "-C", repo_dir, "bundle", "create", "--quiet", os.path.abspath(tmp)]
+    if revs is None:
+        result = subprocess.run([*cmd, "--all"], capture_output=True, text=True)
+    else:
+        if not any(not rev.startswith("^") for rev in revs):
+            raise _NothingToBundle()
+        result = subprocess.run([*cmd, "--stdin"], input="\n".join(revs) + "\n", capture_output=True, text=True)
+    if result.returncode != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        # git refuses to create an empty bundle
+        if "empty bundle" in result.stderr.lower():
+            raise _NothingToBundle()
+        raise subprocess.CalledProcessError(result.returncode, result.args, output=result.stdout, stderr=result.stderr.strip())
+    os.replace(tmp, path)
@@ -0,0 +1,68 @@
+import time
+from .logger import logger
+
+class ChangeFeed:
+    """
+    Decides, per watch cycle, which repositories to look at: the ones the source's event
+    feed reports as changed, or the full inventory when a reconciliation is due or the
+    feed cannot be trusted (first run, gap, unknown repository, error).
+    Changed repositories are re-read one by one before they are handed out, so the
+    `pushed_at` recorded after their sync matches the next full listing.
+    The feed cursor is persisted in the state store, so restarts resume from it.
+    """
+
+    def __init__(self, source_provider, state, reconcile_interval, name="source", clock=time.monotonic):
+        self.source_provider = source_provider
+        self.state = state
+        self.reconcile_interval = reconcile_interval
+        self.cursor_name = f"events:{name}"
+        self._clock = clock
+        self._by_id = {}
+        self._by_name = {}
+        self._last_full = None
+
+    def poll(self):
+        """
+        Returns: (repos, full) - the repositories to consider this cycle, and whether
+        they are the full inventory (True) or only the changed ones (False).
+        """
+        changes, cursor = self.source_provider.fetch_changes(self.state.get_cursor(self.cursor_name))
+
+        due = self._last_full is None or self._clock() - self._last_full >= self.reconcile_interval
+        changed = None if (due or changes is None) else self._resolve(changes)
+
+        if changed is None:
+            repos = self.source_provider.fetch_repos()
+            self._by_id = {repo.id: repo for repo in repos if repo.id is not None}
+            self._by_name = {repo.name: repo for repo in repos}
+            self._last_full = self._clock()
+            self.state.set_cursor(self.cursor_name, cursor)
+            return repos, True
+
+        # Only advanced once the changes are handed out
+        self.state.set_cursor(self.cursor_name, cursor)
+        logger.debug(f"Change feed: {len(changed)} changed repositories, skipping full listing.")
+        return changed, False
+
+    def _resolve(self, changes):
+        """
+        Maps changes to known repositories, refreshed (see Provider.refresh_repo).
+        Returns None if one is unknown (e.g. just created) or cannot be refreshed.
+        """
+        changed = {}
+        for change in changes:
+            repo = self._by_id.get(change.repo_id) or self._by_name.get(change.name)
+            if repo is None:
+                logger.debug(f"Change feed: unknown repository {change.name or change.repo_id}, listing everything.")
+                return None
+            changed[repo.name] = repo
+
+        for name, repo in changed.items():
+            fresh = self.source_provider.refresh_repo(repo)
+            if fresh is None:
+                logger.debug(f"Change feed: could not refresh {name}, listing everything.")
+                return None
+            changed[name] = self._by_name[name] = fresh
+            if fresh.id is not None:
+                self._by_id[fresh.id] = fresh
+        return list(changed.values())
@@ -2,6 +2,7 @@ import os
 import sys
 import argparse
 from dotenv import load_dotenv
+from .bundles import DEFAULT_CHAIN_LENGTH
 
 # Load env vars from .env file
 # Load env vars from .env file
@@ -24,6 +25,11 @@ def parse_args():
     Sets up the command line arguments.
     This allows the user to run: 'python g2g.py --dry-run'
     """
+    # Imported here: the providers import this module for their defaults
+    from .providers.base import DEFAULT_PROTECTION_TTL
+    from .providers.http import DEFAULT_ORG_CONCURRENCY
+    from .webhook import DEFAULT_COALESCE_DELAY
+
     parser = argparse.ArgumentParser(
         description="Holocron: GitHub to GitLab/Local Mirroring Tool"
     )
@@ -32,11 +38,19 @@ def parse_args():
     def get_bool_env(name):
         return os.environ.get(name, "").lower() in ("true", "1", "yes")
 
+    def get_int_env(name):
+        value = os.environ.get(name)
+        return int(value) if value else None
+
     # Flags (True/False options) -> Default from Env Var
     parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}", help="Show the version and exit")
     parser.add_argument("--credits", action="store_true", default=get_bool_env("HOLOCRON_CREDITS"), help="Show the credits and exit")
     parser.add_argument("--dry-run", action="store_true", default=get_bool_env("HOLOCRON_DRY_RUN"), help="Simulate execution without making changes")
     parser.add_argument("--watch", action="store_true", default=get_bool_env("HOLOCRON_WATCH"), help="Run continuously in a loop (Daemon mode)")
+    parser.add_argument("--github-graphql", action="store_true", default=get_bool_env("HOLOCRON_GITHUB_GRAPHQL"), help="List GitHub repositories through the GraphQL API (fewer, smaller requests)")
+    parser.add_argument("--change-feed", action="store_true", default=get_bool_env("HOLOCRON_CHANGE_FEED"), help="Watch mode: find changed repos through the provider's event feed, listing everything only every --reconcile-interval")
+    parser.add_argument("--fork-pools", action="store_true", default=get_bool_env("HOLOCRON_FORK_POOLS"), help="Clone new fork mirrors against a shared per-network object pool (git alternates)")
+    parser.add_argument("--log-format", type=str, choices=["text", "json"], default=os.environ.get("HOLOCRON_LOG_FORMAT", "text"), help="Log as text lines, or as JSON lines with repo/phase/duration_ms/outcome fields (default: text)")
     parser.add_argument("--verbose", action="store_true", default=get_bool_env("HOLOCRON_VERBOSE"), help="Print detailed logs")
     
     # Provider Selection
@@ -48,8 +62,27 @@ def parse_args():
     parser.add_argument("--window", type=int, default=int(os.environ.get("HOLOCRON_WINDOW", 10)), help="Only sync repos updated in the last X minutes")
     parser.add_argument("--storage", type=str, default=os.environ.get("HOLOCRON_STORAGE", "./mirror-data"), help="Local path to store git repositories")
     parser.add_argument("--concurrency", type=int, default=int(os.environ.get("HOLOCRON_CONCURRENCY", 5)), help="Number of concurrent sync threads (default: 5)")
+    parser.add_argument("--engine", type=str, choices=["threaded", "pipeline", "async"], default=os.environ.get("HOLOCRON_ENGINE", "threaded"), help="Sync engine: one thread per repo, separate fetch/prepare/push stages, or asyncio subprocesses (default: threaded)")
+    parser.add_argument("--fetch-concurrency", type=int, default=get_int_env("HOLOCRON_FETCH_CONCURRENCY"), help="Pipeline engine: parallel source fetches (default: --concurrency)")
+    parser.add_argument("--prepare-concurrency", type=int, default=get_int_env("HOLOCRON_PREPARE_CONCURRENCY"), help="Pipeline engine: parallel destination API preparations (default: --concurrency)")
+    parser.add_argument("--push-concurrency", type=int, default=get_int_env("HOLOCRON_PUSH_CONCURRENCY"), help="Pipeline engine: parallel destination pushes and checkouts (default: --concurrency)")
+    parser.add_argument("--host-limit", action="append", metavar="HOST=CONCURRENCY[:RATE]", default=[s for s in os.environ.get("HOLOCRON_HOST_LIMITS", "").split(",") if s.strip()], help="Limit git operations against a host, e.g. gitlab.local=6:2 (6 at once, 2 new per second). Repeatable")
+    parser.add_argument("--org-concurrency", type=int, default=int(os.environ.get("HOLOCRON_ORG_CONCURRENCY", DEFAULT_ORG_CONCURRENCY)), help=f"Number of GitHub organizations listed in parallel (default: {DEFAULT_ORG_CONCURRENCY})")
     parser.add_argument("--backup-only", action="store_true", default=get_bool_env("HOLOCRON_BACKUP_ONLY"), help="Mirror locally only, skip pushing to destination")
     parser.add_argument("--checkout", action="store_true", default=get_bool_env("HOLOCRON_CHECKOUT"), help="Create a checkout of the repository alongside the mirror")
+    parser.add_argument("--checkout-mode", type=str, choices=["clone", "worktree"], default=os.environ.get("HOLOCRON_CHECKOUT_MODE", "clone"), help="New --checkout directories: a separate clone, or a worktree sharing the mirror's objects (default: clone)")
+    parser.add_argument("--protection-ttl", type=int, default=int(os.environ.get("HOLOCRON_PROTECTION_TTL", DEFAULT_PROTECTION_TTL)), help=f"Seconds to trust a verified branch protection state before checking again (default: {DEFAULT_PROTECTION_TTL})")
+    parser.add_argument("--webhook-port", type=int, default=get_int_env("HOLOCRON_WEBHOOK_PORT"), help="Listen for GitHub/GitLab push webhooks on this port and sync on every push")
+    parser.add_argument("--webhook-host", type=str, default=os.environ.get("HOLOCRON_WEBHOOK_HOST", "127.0.0.1"), help="Address the webhook listener binds to; other than loopback requires --webhook-secret (default: 127.0.0.1)")
+    parser.add_argument("--webhook-secret", type=str, default=os.environ.get("HOLOCRON_WEBHOOK_SECRET"), help="Webhook secret (GitHub) or secret token (GitLab) deliveries must carry (required unless --webhook-host is loopback)")
+    parser.add_argument("--coalesce-delay", type=float, default=float(os.environ.get("HOLOCRON_COALESCE_DELAY", DEFAULT_COALESCE_DELAY)), help=f"Seconds to wait for more webhook events of a repository before syncing it (default: {DEFAULT_COALESCE_DELAY:g})")
+    parser.add_argument("--reconcile-interval", type=int, default=int(os.environ.get("HOLOCRON_RECONCILE_INTERVAL", 3600)), help="Webhook and change feed modes: seconds between full inventory listings (default: 3600)")
+    parser.add_argument("--metrics-port", type=int, default=get_int_env("HOLOCRON_METRICS_PORT"), help="Serve Prometheus metrics on this port at /metrics (default: off)")
+    parser.add_argument("--metrics-host", type=str, default=os.environ.get("HOLOCRON_METRICS_HOST", "0.0.0.0"), help="Address the metrics endpoint binds to (default: 0.0.0.0)")
+    parser.add_argument("--trace-dir", type=str, default=os.environ.get("HOLOCRON_TRACE_DIR"), help="Write a Chrome/Perfetto trace-event JSON file per sync cycle into this directory")
+    parser.add_argument("--bundle-dir", type=str, default=os.environ.get("HOLOCRON_BUNDLE_DIR"), help="Write an incremental git bundle per repository and fetch into this directory (for offsite backups)")
+    parser.add_argument("--bundle-chain-length", type=int, default=int(os.environ.get("HOLOCRON_BUNDLE_CHAIN_LENGTH", DEFAULT_CHAIN_LENGTH)), help=f"Incremental bundles before the chain is consolidated into a full bundle (default: {DEFAULT_CHAIN_LENGTH})")
+    parser.add_argument("--maintenance-interval", type=int, default=get_int_env("HOLOCRON_MAINTENANCE_INTERVAL"), help="Run background git maintenance (repack, commit-graph, prune) on mirrors every N seconds (default: off)")
     parser.add_argument("--gitlab-namespace", type=str, default=GITLAB_NAMESPACE, help="GitLab namespace (User or Group) to push to")
 
     return parser.parse_args()
@@ -0,0 +1,169 @@
+import os
+import time
+import shutil
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from .logger import logger
+from .utils import format_size
+from .metrics import STORAGE_BYTES
+
+# Largest repositories listed in each report
+TOP_N = 5
+# Samples older than this do not count towards the growth rate
+GROWTH_WINDOW = timedelta(days=7)
+# Warn when the storage volume is projected to fill up within this many days
+WARN_DAYS = 14
+
+class DirectorySizer:
+    """
+    Measures directory trees, remembering per directory its mtime, the bytes of the files
+    directly inside it and its subdirectories. A directory whose mtime did not change
+    has the same entries, so only its subdirectories are visited again: a rescan costs one
+    stat() per directory instead of one per file.
+    Files rewritten in place (without a rename) are not noticed; git replaces files by renaming.
+    """
+
+    def __init__(self):
+        self._cache = {}  # path -> (mtime_ns, file bytes, subdirectory names)
+        self._lock = threading.Lock()
+        self.rescanned = 0  # directories listed during the last size() calls
+
+    def size(self, path) -> int:
+        """Bytes used by the files under `path` (0 if it does not exist)."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self._cache.pop(path, None)
+            return 0
+
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached and cached[0] == mtime:
+            _, file_bytes, subdirs = cached
+        else:
+            file_bytes, subdirs = self._scan(path)
+            with self._lock:
+                self._cache[path] = (mtime, file_bytes, subdirs)
+                self.rescanned += 1
+
+        return file_bytes + sum(self.size(os.path.join(path, name)) for name in subdirs)
+
+    def _scan(self, path):
+        file_bytes = 0
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif entry.is_file(follow_symlinks=False):
+                            file_bytes += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return file_bytes, tuple(subdirs)
+
+class DiskAccountant:
+    """
+    Tracks what the mirrors (and checkouts) under `storage` really take on disk, cycle
+    over cycle, and projects when the volume fills up. Samples are kept in the state store,
+    so the growth rate survives restarts.
+    """
+
+    def __init__(self, storage, state, top_n=TOP_N, clock=None):
+        self.storage = storage
+        self.state = state
+        self.top_n = top_n
+        self.sizer = DirectorySizer()
+        self._clock = clock or (lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+        self._last_total = None
+
+    def measure(self, names) -> dict:
+        """Returns {name: (mirror bytes, checkout bytes)} for the given repositories."""
+        usage = {}
+        for name in names:
+            mirror = self.sizer.size(os.path.join(self.storage, f"{name}.git"))
+            checkout = self.sizer.size(os.path.join(self.storage, name))
+            if mirror or checkout:
+                usage[name] = (mirror, checkout)
+        return usage
+
+    def report(self, repos) -> dict:
+        """
+        Measures the mirrors of `repos`, records a sample and logs the totals, the growth
+        since the previous cycle, the largest repositories and the projected days until full.
+        Repositories not mirrored yet are counted with their remote size.
+        Returns: The summary that was logged.
+        """
+        started = time.monotonic()
+        self.sizer.rescanned = 0
+        usage = self.measure(repo.name for repo in repos)
+        mirrors = sum(m for m, _ in usage.values())
+        checkouts = sum(c for _, c in usage.values())
+        total = mirrors + checkouts
+        pending = sum((repo.size or 0) * 1024 for repo in repos if repo.name not in usage)
+
+        now = self._clock()
+        self.state.record_disk_sample(now, total)
+        rate = self.growth_rate(now)
+        free = _free_bytes(self.storage)
+        days_left = free / rate if rate and rate > 0 and free is not None else None
+
+        summary = {
+            "mirrors": mirrors,
+            "checkouts": checkouts,
+            "total": total,
+            "growth": None if self._last_total is None else total - self._last_total,
+            "pending_clones": pending,
+            "bytes_per_day": rate,
+            "free": free,
+            "days_until_full": days_left,
+            "largest": sorted(((sum(sizes), name) for name, sizes in usage.items()), reverse=True)[:self.top_n],
+        }
+        self._last_total = total
+        STORAGE_BYTES.set(mirrors, kind="mirrors")
+        STORAGE_BYTES.set(checkouts, kind="checkouts")
+        if free is not None:
+            STORAGE_BYTES.set(free, kind="free")
+
+        logger.debug(
+            f"Storage: {format_size(mirrors / 1024)} in mirrors, {format_size(checkouts / 1024)} in checkouts "
+            f"({len(usage)} repositories, {self.sizer.rescanned} directories rescanned in {time.monotonic() - started:.2f}s)."
+        )
+        if summary["growth"] is not None:
+            logger.debug(f"Storage growth this cycle: {summary['growth'] / 1024 / 1024:+.1f} MB")
+        if pending:
+            logger.debug(f"Not mirrored yet: ~{format_size(pending / 1024)} (remote size).")
+        if summary["largest"]:
+            logger.debug("Largest repositories: " + ", ".join(f"{name} ({format_size(size / 1024)})" for size, name in summary["largest"]))
+        if days_left is not None:
+            msg = f"Storage grows {format_size(rate / 1024)}/day, {format_size(free / 1024)} free: full in ~{days_left:.0f} days."
+            if days_left < WARN_DAYS:
+                logger.warning(msg)
+            else:
+                logger.debug(msg)
+        return summary
+
+    def growth_rate(self, now) -> Optional[float]:
+        """Bytes per day, from a least-squares fit over the recent samples. None if unknown."""
+        samples = self.state.disk_samples(since=now - GROWTH_WINDOW)
+        if len(samples) < 2:
+            return None
+        xs = [(taken_at - samples[0][0]).total_seconds() / 86400 for taken_at, _ in samples]
+        ys = [used for _, used in samples]
+        mean_x = sum(xs) / len(xs)
+        mean_y = sum(ys) / len(ys)
+        spread = sum((x - mean_x) ** 2 for x in xs)
+        if spread == 0:
+            return None
+        return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+def _free_bytes(path) -> Optional[int]:
+    try:
+        return shutil.disk_usage(path).free
+    except OSError:
+        return None
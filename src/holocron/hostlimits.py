@@ -0,0 +1,166 @@
+import time
+import asyncio
+import threading
+import weakref
+from contextlib import contextmanager, asynccontextmanager
+from typing import Optional
+from urllib.parse import urlparse
+from .logger import logger
+
+class TokenBucket:
+    """Allows `rate` operations per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Takes one token and returns how long to wait before using it."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Tokens may go negative: later callers queue up behind earlier ones
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self):
+        """Takes one token, sleeping until one is available."""
+        delay = self._take()
+        if delay > 0:
+            self._sleep(delay)
+
+    async def acquire_async(self):
+        """acquire() for the asyncio engine: waits on the event loop instead of blocking it."""
+        delay = self._take()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class HostLimiter:
+    """Caps the git operations talking to one host: how many at once, and how many per second."""
+
+    def __init__(self, host, concurrency=None, rate=None):
+        self.host = host
+        self.concurrency = concurrency
+        self.rate = rate
+        self._semaphore = threading.BoundedSemaphore(concurrency) if concurrency else None
+        # asyncio semaphores belong to one event loop, so they are created per loop on first use
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        self._bucket = TokenBucket(rate) if rate else None
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waited = 0.0  # seconds spent waiting for a slot, in total
+
+    def acquire(self):
+        started = time.monotonic()
+        if self._semaphore:
+            self._semaphore.acquire()
+        if self._bucket:
+            self._bucket.acquire()
+        with self._lock:
+            self.active += 1
+            self.waited += time.monotonic() - started
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+        if self._semaphore:
+            self._semaphore.release()
+
+    def _async_semaphore(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._async_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._async_semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        return semaphore
+
+    async def acquire_async(self):
+        """acquire() for the asyncio engine: waiting tasks hold no thread."""
+        started = time.monotonic()
+        if self.concurrency:
+            await self._async_semaphore().acquire()
+        if self._bucket:
+            await self._bucket.acquire_async()
+        with self._lock:
+            self.active += 1
+            self.waited += time.monotonic() - started
+
+    def release_async(self):
+        with self._lock:
+            self.active -= 1
+        if self.concurrency:
+            self._async_semaphore().release()
+
+# host -> HostLimiter, set once at startup by configure_host_limits()
+_limiters = {}
+
+def parse_host_limits(specs) -> dict:
+    """
+    Parses `HOST=CONCURRENCY[:RATE]` specs (e.g. `gitlab.local=6:2`) into {host: (concurrency, rate)}.
+    CONCURRENCY may be empty to only limit the rate (`gitlab.local=:2`).
+    """
+    limits = {}
+    for spec in specs or []:
+        host, sep, value = spec.partition("=")
+        if not sep or not host.strip():
+            raise ValueError(f"Invalid host limit '{spec}', expected HOST=CONCURRENCY[:RATE]")
+        concurrency, _, rate = value.partition(":")
+        try:
+            limits[host.strip().lower()] = (int(concurrency) if concurrency else None, float(rate) if rate else None)
+        except ValueError:
+            raise ValueError(f"Invalid host limit '{spec}', expected HOST=CONCURRENCY[:RATE]")
+    return limits
+
+def configure_host_limits(limits: dict):
+    """Installs the per-host limits ({host: (concurrency, rate)}) used by all git transport calls."""
+    _limiters.clear()
+    for host, (concurrency, rate) in limits.items():
+        _limiters[host] = HostLimiter(host, concurrency, rate)
+        logger.debug(f"Git transport limit for {host}: concurrency={concurrency or 'unlimited'}, rate={rate or 'unlimited'}/s")
+
+def remote_host(url) -> Optional[str]:
+    """Host of a git remote URL (https://, ssh://, or scp-like user@host:path). None for local paths."""
+    if not url:
+        return None
+    if "://" in url:
+        return (urlparse(url).hostname or "").lower() or None
+    head, sep, _ = url.partition(":")
+    if sep and "/" not in head:
+        return head.rpartition("@")[2].lower()
+    return None
+
+def limiter_for(url) -> Optional[HostLimiter]:
+    host = remote_host(url)
+    return _limiters.get(host) if host else None
+
+@contextmanager
+def host_slot(url):
+    """Holds a slot of the remote's host for the duration of a git operation."""
+    limiter = limiter_for(url)
+    if limiter is None:
+        yield
+        return
+    limiter.acquire()
+    try:
+        yield
+    finally:
+        limiter.release()
+
+@asynccontextmanager
+async def async_host_slot(url):
+    """host_slot() for the asyncio engine: waits for the slot on the event loop, without a thread."""
+    limiter = limiter_for(url)
+    if limiter is None:
+        yield
+        return
+    await limiter.acquire_async()
+    try:
+        yield
+    finally:
+        limiter.release_async()
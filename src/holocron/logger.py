@@ -1,30 +1,111 @@
+import re
+import json
+import queue
+import atexit
 import logging
+import reprlib
 import functools
-from datetime import datetime
+import logging.handlers
+from datetime import datetime, timezone
 
 # Initialize logger
 logger = logging.getLogger("holocron")
 
-def setup_logger(verbose: bool):
+# Fields every JSON log line carries (null when a record does not set them)
+JSON_FIELDS = ("repo", "phase", "duration_ms", "outcome")
+# Longest argument list rendered by log_execution
+MAX_CALL_REPR = 240
+
+# Writes the queued records to the real handler, on its own thread
+_listener = None
+
+# Most messages are about one repository and start with "[<name>] "
+_REPO_PREFIX = re.compile(r"^\[([^\]]+)\] ")
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, message and the JSON_FIELDS."""
+
+    def format(self, record):
+        message = record.getMessage()
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "message": message,
+        }
+        for name in JSON_FIELDS:
+            entry[name] = getattr(record, name, None)
+        if entry["repo"] is None:
+            match = _REPO_PREFIX.match(message)
+            if match:
+                entry["repo"] = match.group(1)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def setup_logger(verbose: bool, json_format: bool = False):
     """
     Configures the global logger.
+    Worker threads only put records on a queue; a listener thread formats and writes them,
+    so a slow terminal or pipe never stalls a sync.
     """
+    global _listener
     level = logging.DEBUG if verbose else logging.INFO
-    
+
     # Create handler
     handler = logging.StreamHandler()
-    
+
     # Create formatter
     # We want format: [2023-10-27 10:00:00] Message
-    formatter = logging.Formatter('[{asctime}] {message}', style='{', datefmt='%Y-%m-%d %H:%M:%S')
+    if json_format:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('[{asctime}] {message}', style='{', datefmt='%Y-%m-%d %H:%M:%S')
     handler.setFormatter(formatter)
-    
+
+    # Replace the handlers of an earlier call instead of stacking them
+    shutdown_logger()
+    for old in list(logger.handlers):
+        logger.removeHandler(old)
+
+    records = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+
     # Apply settings
     logger.setLevel(level)
-    logger.addHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(records))
     # Prevent duplicate logs if setup is called multiple times or if root logger is active
     logger.propagate = False
 
+def shutdown_logger():
+    """Writes out the queued records and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logger)
+
+# Bounded reprs: a list of 10k repositories or a provider renders as a few dozen characters
+_arg_repr = reprlib.Repr()
+_arg_repr.maxlevel = 2
+_arg_repr.maxlist = _arg_repr.maxtuple = _arg_repr.maxset = _arg_repr.maxdict = 4
+_arg_repr.maxstring = _arg_repr.maxother = 60
+
+class _Call:
+    """`func(args...)`, rendered only if the record is actually emitted."""
+    __slots__ = ("name", "args", "kwargs")
+
+    def __init__(self, name, args, kwargs):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        arg_str = ", ".join([_arg_repr.repr(a) for a in self.args] + [f"{k}={_arg_repr.repr(v)}" for k, v in self.kwargs.items()])
+        if len(arg_str) > MAX_CALL_REPR:
+            arg_str = arg_str[:MAX_CALL_REPR] + "..."
+        return f"{self.name}({arg_str})"
 
 def log_execution(func):
     """
@@ -34,14 +115,12 @@ def log_execution(func):
     def wrapper(*args, **kwargs):
         # We check enabledFor(DEBUG) to minimize overhead if not verbose
         if logger.isEnabledFor(logging.DEBUG):
-            arg_str = ", ".join([repr(a) for a in args] + [f"{k}={v!r}" for k, v in kwargs.items()])
-            logger.debug(f"Executing {func.__name__}({arg_str})")
-        
+            logger.debug("Executing %s", _Call(func.__name__, args, kwargs))
+
         try:
             return func(*args, **kwargs)
         except Exception as e:
             if logger.isEnabledFor(logging.DEBUG):
-                 logger.debug(f"Exception in {func.__name__}: {e}")
+                 logger.debug("Exception in %s: %s", func.__name__, e)
             raise
     return wrapper
-
@@ -0,0 +1,161 @@
+import os
+import time
+import shutil
+import threading
+import subprocess
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from .logger import logger
+from .mirror import repo_lock
+
+# A mirror is maintained once it crosses any of these
+MAX_PACKS = 8
+MAX_LOOSE_OBJECTS = 1000
+MAX_AGE = timedelta(days=7)
+# Unreachable loose objects younger than this are kept (a fetch may still be writing them)
+PRUNE_EXPIRE = "2.weeks.ago"
+
+def object_stats(repo_dir) -> dict:
+    """
+    Parses `git count-objects -v`.
+    Returns: {"count", "size", "in-pack", "packs", "size-pack", "prune-packable", "garbage", "size-garbage"}
+    (sizes in KiB, as git reports them).
+    """
+    out = subprocess.run(["git", "-C", repo_dir, "count-objects", "-v"], check=True, capture_output=True, text=True).stdout
+    stats = {}
+    for line in out.splitlines():
+        key, _, value = line.partition(":")
+        try:
+            stats[key.strip()] = int(value.strip())
+        except ValueError:
+            pass
+    return stats
+
+def disk_usage(stats: dict) -> int:
+    """Bytes taken by objects, packs and garbage."""
+    return (stats.get("size", 0) + stats.get("size-pack", 0) + stats.get("size-garbage", 0)) * 1024
+
+def maintenance_reason(stats: dict, last_maintained: Optional[datetime], now: datetime,
+                       max_packs=MAX_PACKS, max_loose=MAX_LOOSE_OBJECTS, max_age=MAX_AGE) -> Optional[str]:
+    """Returns why a mirror needs maintenance, or None if it does not."""
+    if stats.get("packs", 0) > max_packs:
+        return f"{stats['packs']} packs"
+    if stats.get("count", 0) > max_loose:
+        return f"{stats['count']} loose objects"
+    if last_maintained is None:
+        return "never maintained"
+    if now - last_maintained >= max_age:
+        return f"last maintained {(now - last_maintained).days} days ago"
+    return None
+
+def low_priority(cmd) -> list:
+    """Prefixes a command with `nice` (CPU) and `ionice` (disk) where available."""
+    prefix = []
+    if shutil.which("ionice"):
+        prefix += ["ionice", "-c", "3"]
+    if shutil.which("nice"):
+        prefix += ["nice", "-n", "19"]
+    return prefix + cmd
+
+def maintain_repo(repo_dir):
+    """
+    Runs the maintenance steps on one mirror:
+    - geometric repack: rolls loose objects and small packs into larger ones, writes a multi-pack-index
+    - prune: drops old unreachable loose objects (e.g. left behind by force pushes)
+    - commit-graph: speeds up reachability checks during fetch/push negotiation
+    Returns: (reclaimed bytes, seconds spent)
+    """
+    started = time.monotonic()
+    before = disk_usage(object_stats(repo_dir))
+
+    for cmd in (
+        ["git", "-C", repo_dir, "repack", "-d", "--quiet", "--geometric=2", "--write-midx"],
+        ["git", "-C", repo_dir, "prune", f"--expire={PRUNE_EXPIRE}"],
+        ["git", "-C", repo_dir, "commit-graph", "write", "--reachable", "--split", "--no-progress"],
+    ):
+        subprocess.run(low_priority(cmd), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    after = disk_usage(object_stats(repo_dir))
+    return before - after, time.monotonic() - started
+
+class Maintainer:
+    """
+    Background maintenance of the mirrors under `storage`, every `interval` seconds.
+    Stalest mirrors go first. A mirror that is being synced is skipped until the next round,
+    and a sync waits for maintenance of its mirror to finish (see mirror.repo_lock).
+    """
+
+    def __init__(self, storage, state, interval, max_packs=MAX_PACKS, max_loose=MAX_LOOSE_OBJECTS, max_age=MAX_AGE):
+        self.storage = storage
+        self.state = state
+        self.interval = interval
+        self.max_packs = max_packs
+        self.max_loose = max_loose
+        self.max_age = max_age
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self) -> list:
+        """
+        One maintenance round.
+        Returns: [(name, reclaimed bytes, seconds)] for every maintained mirror.
+        """
+        if not os.path.isdir(self.storage):
+            return []
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        last = self.state.last_maintenance()
+        mirrors = sorted(
+            (entry[:-4] for entry in os.listdir(self.storage) if entry.endswith(".git") and not entry.startswith(".")),
+            key=lambda name: last.get(name) or datetime.min
+        )
+
+        done = []
+        for name in mirrors:
+            if self._stop.is_set():
+                break
+            repo_dir = os.path.join(self.storage, f"{name}.git")
+            lock = repo_lock(repo_dir)
+            if not lock.acquire(blocking=False):
+                logger.debug(f"[{name}] Sync in progress, maintenance postponed.")
+                continue
+            try:
+                reason = maintenance_reason(object_stats(repo_dir), last.get(name), now, self.max_packs, self.max_loose, self.max_age)
+                if not reason:
+                    continue
+                logger.debug(f"[{name}] Running maintenance ({reason})...")
+                reclaimed, duration = maintain_repo(repo_dir)
+            except subprocess.CalledProcessError as e:
+                err_msg = e.stderr.decode().strip() if isinstance(e.stderr, bytes) else (e.stderr or str(e))
+                logger.warning(f"[{name}] Maintenance failed: {err_msg}")
+                continue
+            finally:
+                lock.release()
+
+            self.state.record_maintenance(name, reclaimed, duration)
+            logger.debug(f"[{name}] Maintenance reclaimed {reclaimed / 1024 / 1024:.1f} MB in {duration:.1f}s.")
+            done.append((name, reclaimed, duration))
+
+        if done:
+            logger.info(
+                f"Maintenance: {len(done)} mirrors, reclaimed {sum(r for _, r, _ in done) / 1024 / 1024:.1f} MB "
+                f"in {sum(d for _, _, d in done):.1f}s."
+            )
+        return done
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Maintenance round failed: {e}")
+            self._stop.wait(self.interval)
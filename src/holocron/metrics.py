@@ -0,0 +1,241 @@
+import math
+import logging
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .logger import logger
+
+# Seconds: from a no-op ls-remote to the first clone of a very large repository
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+CYCLE_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class Registry:
+    """Holds the metrics rendered on /metrics."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """The Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=(), registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values -> value
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, extra=()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{self._labels(key)} {_number(value)}" for key, value in values]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DURATION_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def value(self, **labels):
+        """Returns (observation count, sum)."""
+        with self._lock:
+            _, total, count = self._values.get(self._key(labels)) or (None, 0.0, 0)
+        return count, total
+
+    def samples(self) -> list:
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            # Bucket counts are cumulative: `le` is "less than or equal"
+            for bound, n in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{self._labels(key, [('le', _number(bound))])} {n}")
+            lines.append(f"{self.name}_bucket{self._labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if value.is_integer():
+            return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+# --- Holocron's metrics ---
+SYNC_PHASE_SECONDS = Histogram(
+    "holocron_sync_phase_seconds", "Time spent per repository in each sync phase.", ["phase"]
+)
+CYCLE_SECONDS = Histogram(
+    "holocron_cycle_seconds", "Makespan of sync cycles that synced at least one repository.", buckets=CYCLE_BUCKETS
+)
+CYCLE_REPOS = Gauge(
+    "holocron_cycle_repositories", "Repositories listed, selected, skipped, synced and failed in the last cycle.", ["outcome"]
+)
+SYNCS = Counter(
+    "holocron_syncs_total", "Repository syncs by outcome (success or failure).", ["outcome"]
+)
+API_REQUESTS = Counter(
+    "holocron_api_requests_total", "HTTP requests sent to provider APIs, retries included.", ["provider", "status"]
+)
+API_BUDGET = Gauge(
+    "holocron_api_budget", "Rate limit budget last reported by each provider.", ["provider", "kind"]
+)
+API_RETRIES = Counter(
+    "holocron_api_retries_total", "Provider API requests retried (rate limits, transient errors).", ["provider"]
+)
+QUEUE_DEPTH = Gauge(
+    "holocron_queue_depth", "Repositories waiting for a worker, per engine stage.", ["stage"]
+)
+IN_FLIGHT = Gauge(
+    "holocron_in_flight", "Repositories being worked on, per engine stage.", ["stage"]
+)
+STORAGE_BYTES = Gauge(
+    "holocron_storage_bytes", "Bytes used by mirrors and checkouts, and free on the storage volume.", ["kind"]
+)
+
+@contextmanager
+def timed(phase, repo=None):
+    """
+    Observes the duration of a sync phase, failed or not.
+    With `repo` (a name), also logs it at debug level with the structured fields of JSON logs.
+    """
+    started = time.monotonic()
+    outcome = "failure"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        duration = time.monotonic() - started
+        SYNC_PHASE_SECONDS.observe(duration, phase=phase)
+        if repo and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"[{repo}] {phase} took {duration:.2f}s",
+                extra={"repo": repo, "phase": phase, "duration_ms": round(duration * 1000), "outcome": outcome}
+            )
+
+@contextmanager
+def in_flight(stage):
+    """Counts the block as one repository in flight in `stage`."""
+    IN_FLIGHT.inc(stage=stage)
+    try:
+        yield
+    finally:
+        IN_FLIGHT.dec(stage=stage)
+
+class MetricsServer:
+    """Serves `registry` on `http://host:port/metrics` for Prometheus to scrape."""
+
+    def __init__(self, host, port, registry=None):
+        self.registry = registry or REGISTRY
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Serving metrics on port {self.port} (/metrics)...")
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self._reply(404, "text/plain", b"not found")
+                    return
+                self._reply(200, CONTENT_TYPE, server.registry.render().encode())
+
+            def _reply(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Metrics: {format % args}")
+
+        return Handler
@@ -1,7 +1,43 @@
 import os
+import time
+import threading
 import subprocess
+from dataclasses import dataclass, field
+from typing import Optional
 from datetime import datetime, timedelta, timezone
 from .logger import logger, log_execution
+from .refs import read_local_refs, refs_digest, parse_ls_remote, diff_refs
+from .hostlimits import host_slot
+from .bundles import BundlePolicy, export_bundle
+from .pools import clone_args, update_pool
+from .metrics import timed
+from .tracing import traced
+
+# Refspecs per `git push` invocation, to stay well below command line length limits
+PUSH_BATCH_SIZE = 500
+
+# repo_dir -> Lock, held by whatever works on a mirror (a sync, or maintenance)
+_repo_locks = {}
+_repo_locks_guard = threading.Lock()
+
+def repo_lock(repo_dir) -> threading.Lock:
+    """Returns the lock guarding one local mirror."""
+    with _repo_locks_guard:
+        return _repo_locks.setdefault(os.path.abspath(repo_dir), threading.Lock())
+
+@dataclass
+class SyncResult:
+    """Outcome of syncing a single repository."""
+    name: str
+    source_tip: Optional[str] = None  # digest of the mirror refs after fetching
+    destination_tip: Optional[str] = None  # digest of the refs pushed to the destination
+    duration: Optional[float] = None  # in seconds
+    error: Optional[str] = None
+    fetched: bool = True  # False if the ref pre-check found nothing new at the source
+
+    @property
+    def ok(self):
+        return self.error is None
 
 def needs_sync(repo, window_minutes):
     """
@@ -17,86 +53,406 @@ def needs_sync(repo, window_minutes):
     # Check if the difference is inside our window
     return (now - pushed_at) < timedelta(minutes=window_minutes)
 
-@log_execution
-def sync_one_repo(repo, storage_path, dry_run=False, backup_only=False, checkout=False, source_provider=None, destination_provider=None):
-    repo_dir = os.path.join(storage_path, f"{repo.name}.git")
-    
-    # 1. Construct Secure URLs
-    source_url = source_provider.get_remote_url(repo)
-    
+@dataclass
+class SyncJob:
+    """
+    Everything one repository sync needs, handed from stage to stage:
+    fetch_stage -> prepare_stage -> push_stage.
+    """
+    repo: object
+    repo_dir: str
+    source_url: str
+    destination_url: Optional[str] = None
+    destination_provider: object = None
+    backup_only: bool = False
+    checkout: bool = False
+    checkout_mode: str = "clone"  # how new checkouts are made, see checkout_commands()
+    last_state: object = None  # RepoState of the previous sync, if any
+    result: SyncResult = None
+    started: float = field(default_factory=time.monotonic)
+    changes: Optional[tuple] = None  # (updated, deleted) refs, None means "push everything"
+    push_needed: bool = False
+    bundles: Optional[BundlePolicy] = None  # export a git bundle after each fetch
+    locked: bool = False  # holds repo_lock(repo_dir)
+    fork_pools: bool = False  # clone forks against a shared object pool
+    source_provider: object = None  # looks up fork parents for fork_pools
+
+def create_job(repo, storage_path, backup_only=False, checkout=False, source_provider=None, destination_provider=None, last_state=None, bundles=None, fork_pools=False, checkout_mode="clone") -> SyncJob:
+    """Builds the SyncJob for a repository (authenticated URLs included)."""
     destination_url = None
     if not backup_only and destination_provider:
         destination_url = destination_provider.get_remote_url(repo)
 
+    return SyncJob(
+        repo=repo,
+        repo_dir=os.path.join(storage_path, f"{repo.name}.git"),
+        source_url=source_provider.get_remote_url(repo),
+        destination_url=destination_url,
+        destination_provider=destination_provider,
+        backup_only=backup_only,
+        checkout=checkout,
+        checkout_mode=checkout_mode,
+        last_state=last_state,
+        result=SyncResult(name=repo.name),
+        bundles=bundles,
+        fork_pools=fork_pools,
+        source_provider=source_provider
+    )
+
+# --- Sync plans ---
+# The sync steps are written once, as generators ("plans") that yield the work they need done:
+# a Git command, or a blocking Call (provider API, locks, object pools). An engine's runner
+# performs each step and sends the result back (or throws its error in). run_plan() below runs
+# them in the calling thread; async_mirror.run_plan() runs them on an event loop.
+
+@dataclass
+class Git:
+    """A git command of a plan. The plan gets its stdout back with `capture`, else ""."""
+    cmd: list
+    host_url: Optional[str] = None  # the remote talked to, whose host_slot() is held while it runs
+    capture: bool = False
+
+class Call:
+    """A blocking call of a plan, e.g. a provider API request. The plan gets its return value back."""
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+def run_git(cmd, capture=False) -> str:
+    """
+    Runs a git command as a subprocess.
+    Returns: stdout (text) if `capture`, else an empty string.
+    Raises: subprocess.CalledProcessError with the decoded stderr.
+    """
+    try:
+        if capture:
+            return subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        return ""
+    except subprocess.CalledProcessError as e:
+        err_msg = e.stderr.decode(errors="replace") if isinstance(e.stderr, bytes) else e.stderr
+        raise subprocess.CalledProcessError(e.returncode, e.cmd, output=e.output, stderr=err_msg.strip() if err_msg else str(e))
+
+def run_step(step):
+    if isinstance(step, Git):
+        with host_slot(step.host_url):
+            return run_git(step.cmd, step.capture)
+    return step.func(*step.args)
+
+def run_plan(plan):
+    """Runs a plan in this thread. Returns: what the plan returns."""
+    result, error = None, None
+    while True:
+        try:
+            step = plan.throw(error) if error else plan.send(result)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            result, error = run_step(step), None
+        except Exception as e:
+            result, error = None, e
+
+@traced("sync")
+@log_execution
+def sync_one_repo(repo, storage_path, dry_run=False, backup_only=False, checkout=False, source_provider=None, destination_provider=None, last_state=None, bundles=None, fork_pools=False, checkout_mode="clone") -> SyncResult:
+    """
+    Mirrors one repository: source -> local bare mirror -> destination (+ optional checkout).
+    `last_state` (a RepoState) tells what the destination already has, so only refs that
+    moved since then are pushed, and nothing at all for an unchanged repository.
+    """
+    # 1. Construct Secure URLs
+    job = create_job(repo, storage_path, backup_only, checkout, source_provider, destination_provider, last_state, bundles, fork_pools, checkout_mode)
+
     # 2. Dry Run Check
     if dry_run:
-        target_msg = destination_url if not backup_only else "(Local Backup Only)"
+        target_msg = job.destination_url if not backup_only else "(Local Backup Only)"
         logger.info(f"[DRY-RUN] Would sync '{repo.name}' -> '{target_msg}'")
-        return
+        return job.result
 
     # 3. Create Storage Directory if needed
     os.makedirs(storage_path, exist_ok=True)
 
     # 4. Execute Sync Steps
+    return run_plan(sync_plan(job))
+
+def sync_plan(job: SyncJob):
+    """The whole sync of one repository: fetch, prepare, push, checkout. Returns: its SyncResult."""
     try:
-        _ensure_local_mirror(repo, repo_dir, source_url)
-        
-        if not backup_only:
-             destination_provider.prepare_push(repo)
-             _push_to_destination(repo, repo_dir, destination_url)
-        else:
-            logger.info(f"[{repo.name}] Successfully backed up locally.")
-        
-        if checkout:
-            _update_sidecar_checkout(repo, repo_dir)
-        
+        yield from fetch_plan(job)
+        yield from prepare_plan(job)
+        yield from push_plan(job)
     except subprocess.CalledProcessError as e:
-        logger.error(f"ERROR syncing {repo.name}: {e}\nOutput: {e.stderr}")
+        fail_job(job, e)
+    finally:
+        release_job(job)
+
+    return finish_job(job)
+
+# The stages of the pipeline engine, one plan each
+
+def fetch_stage(job: SyncJob):
+    run_plan(fetch_plan(job))
+
+def prepare_stage(job: SyncJob):
+    run_plan(prepare_plan(job))
+
+def push_stage(job: SyncJob):
+    run_plan(push_plan(job))
+
+def lock_job(job: SyncJob):
+    """Takes the mirror's lock for the rest of the job, waiting for maintenance to finish."""
+    lock = repo_lock(job.repo_dir)
+    if not lock.acquire(blocking=False):
+        logger.debug(f"[{job.repo.name}] Mirror busy (maintenance), waiting...")
+        lock.acquire()
+    job.locked = True
+
+def release_job(job: SyncJob):
+    if job.locked:
+        job.locked = False
+        repo_lock(job.repo_dir).release()
+
+def fetch_plan(job: SyncJob):
+    """Source side: brings the local mirror up to date and works out what the destination needs."""
+    repo, result = job.repo, job.result
+    yield Call(lock_job, job)
+    # The clock starts when work starts, not while the job waits in a queue
+    job.started = time.monotonic()
+
+    before = read_local_refs(job.repo_dir)
+    result.fetched = yield from _ensure_local_mirror(repo, job.repo_dir, job.source_url, job.fork_pools, job.source_provider)
+    if job.fork_pools and result.fetched:
+        yield Call(update_pool, repo, job.repo_dir)
+    record_fetch(job, before)
+    if job.bundles:
+        yield Call(bundle_stage, job)
+
+def bundle_stage(job: SyncJob):
+    """
+    Writes an incremental bundle of what changed since the last bundle.
+    A failed export is logged, not fatal: the next sync picks up the same changes.
+    """
+    try:
+        export_bundle(job.repo.name, job.repo_dir, job.bundles)
+    except (OSError, subprocess.CalledProcessError) as e:
+        stderr = getattr(e, "stderr", None)
+        logger.error(f"[{job.repo.name}] Bundle export failed: {stderr or e}")
+
+def record_fetch(job: SyncJob, before: dict):
+    """
+    After a clone/fetch: stores the new source tip and works out what the destination needs.
+    `before` are the mirror refs from before the fetch.
+    """
+    repo, result = job.repo, job.result
+    after = read_local_refs(job.repo_dir) if result.fetched else before
+    result.source_tip = refs_digest(after)
 
-def _ensure_local_mirror(repo, repo_dir, source_url):
-    """Clones or fetches the local bare mirror."""
+    if job.backup_only:
+        return
+
+    # If the destination holds exactly what the mirror held before this fetch,
+    # only the refs that moved need to go out. Otherwise push everything.
+    job.changes = None
+    if job.last_state and job.last_state.destination_tip == refs_digest(before):
+        job.changes = diff_refs(before, after)
+
+    if job.changes is not None and not any(job.changes):
+        logger.debug(f"[{repo.name}] Unchanged since last sync, skipping push.")
+        result.destination_tip = result.source_tip
+    else:
+        job.push_needed = True
+
+def prepare_plan(job: SyncJob):
+    """Destination side, API only: e.g. allow force pushes on the default branch."""
+    if job.push_needed:
+        with timed("prepare_push", job.repo.name):
+            yield Call(job.destination_provider.prepare_push, job.repo)
+
+def push_plan(job: SyncJob):
+    """Destination side, git: pushes the mirror, then refreshes the optional checkout."""
+    repo, result = job.repo, job.result
+
+    if job.push_needed:
+        with timed("push", repo.name):
+            try:
+                yield from _push_to_destination(repo, job.repo_dir, job.destination_url, job.changes)
+            except subprocess.CalledProcessError as e:
+                if not rejected_as_protected(e.stderr):
+                    raise
+                # The cached protection state was wrong or stale: re-check once and retry
+                logger.info(f"[{repo.name}] Push rejected by branch protection, re-checking protection...")
+                yield Call(job.destination_provider.invalidate_protection, repo)
+                yield Call(job.destination_provider.prepare_push, repo)
+                yield from _push_to_destination(repo, job.repo_dir, job.destination_url, job.changes)
+        result.destination_tip = result.source_tip
+    elif job.backup_only:
+        logger.info(f"[{repo.name}] Successfully backed up locally.")
+
+    if job.checkout:
+        with timed("checkout", repo.name):
+            yield from _update_sidecar_checkout(repo, job.repo_dir, job.checkout_mode)
+
+def fail_job(job: SyncJob, e: subprocess.CalledProcessError):
+    """Records a failed git step on the job."""
+    logger.error(f"ERROR syncing {job.repo.name}: {e}\nOutput: {e.stderr}")
+    job.result.error = e.stderr or str(e)
+
+def finish_job(job: SyncJob) -> SyncResult:
+    release_job(job)
+    result = job.result
+    result.duration = time.monotonic() - job.started
+    logger.debug(
+        f"[{job.repo.name}] Sync {'done' if result.ok else 'failed'} in {result.duration:.1f}s.",
+        extra={"repo": job.repo.name, "phase": "sync", "duration_ms": round(result.duration * 1000), "outcome": "success" if result.ok else "failure"}
+    )
+    return result
+
+@traced("git")
+def _ensure_local_mirror(repo, repo_dir, source_url, fork_pools=False, source_provider=None):
+    """
+    Clones or fetches the local bare mirror.
+    With `fork_pools`, a fork is cloned against its network's object pool (see pools.py).
+    Returns: False if the source refs already matched the mirror and the fetch was skipped.
+    """
     if not os.path.exists(repo_dir):
         logger.info(f"[{repo.name}] Cloning new mirror...")
-        try:
-            subprocess.run(["git", "clone", "--mirror", "--quiet", source_url, repo_dir], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-        except subprocess.CalledProcessError as e:
-            err_msg = e.stderr.decode().strip() if e.stderr else str(e)
-            raise subprocess.CalledProcessError(e.returncode, e.cmd, output=e.output, stderr=err_msg)
-    else:
+        extra = []
+        if fork_pools:
+            extra = yield Call(clone_args, repo, os.path.dirname(os.path.abspath(repo_dir)), source_provider)
+        with timed("clone", repo.name):
+            yield Git(["git", "clone", "--mirror", "--quiet", *extra, source_url, repo_dir], host_url=source_url)
+        return True
+
+    with timed("fetch", repo.name):
+        if (yield from _source_unchanged(repo, repo_dir, source_url)):
+            logger.debug(f"[{repo.name}] Source refs unchanged, skipping fetch.")
+            return False
+
         logger.debug(f"[{repo.name}] Fetching updates...")
-        try:
-            subprocess.run(["git", "-C", repo_dir, "fetch", "--quiet", "-p", "origin"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-        except subprocess.CalledProcessError as e:
-            err_msg = e.stderr.decode().strip() if e.stderr else str(e)
-            raise subprocess.CalledProcessError(e.returncode, e.cmd, output=e.output, stderr=err_msg)
+        yield Git(["git", "-C", repo_dir, "fetch", "--quiet", "-p", "origin"], host_url=source_url)
+        return True
+
+def _source_unchanged(repo, repo_dir, source_url):
+    """
+    Cheap pre-check: compares the refs the source advertises (`git ls-remote`)
+    with the refs in the local mirror. Any doubt means "changed", so we fetch.
+    """
+    try:
+        out = yield Git(["git", "ls-remote", "--quiet", source_url], host_url=source_url, capture=True)
+    except subprocess.CalledProcessError as e:
+        logger.debug(f"[{repo.name}] Ref pre-check failed, fetching anyway: {e.stderr or e}")
+        return False
 
-def _push_to_destination(repo, repo_dir, destination_url):
-    """Pushes the local mirror to the destination (GitLab)."""
+    remote_refs = parse_ls_remote(out)
+    if not remote_refs:
+        return False
+    return remote_refs == read_local_refs(repo_dir)
+
+@traced("git")
+def _push_to_destination(repo, repo_dir, destination_url, changes=None):
+    """
+    Pushes the local mirror to the destination (GitLab).
+    `changes` is an (updated, deleted) ref diff: when given, only those refs are pushed.
+    Without it, the whole mirror is pushed with `--mirror`.
+    """
     # Ensure push remote is set (optional but good practice)
-    subprocess.run(["git", "-C", repo_dir, "remote", "set-url", "--push", "origin", destination_url], check=True, stderr=subprocess.DEVNULL)
+    if configured_push_url(repo_dir) != destination_url:
+        yield Git(["git", "-C", repo_dir, "remote", "set-url", "--push", "origin", destination_url])
+
+    for cmd in push_commands(repo, repo_dir, changes):
+        yield Git(cmd, host_url=destination_url)
+    logger.info(f"[{repo.name}] Successfully synced to GitLab.")
+
+def push_commands(repo, repo_dir, changes=None) -> list:
+    """
+    Builds the `git push` command lines for a mirror: a single `--mirror` push,
+    or batches of explicit refspecs for an (updated, deleted) ref diff.
+    """
+    if changes is None:
+        return [["git", "-C", repo_dir, "push", "--mirror", "--quiet"]]
+
+    updated, deleted = changes
+    refspecs = [f"+{ref}:{ref}" for ref in sorted(updated)] + [f":{ref}" for ref in deleted]
+    logger.debug(f"[{repo.name}] Pushing {len(updated)} updated and {len(deleted)} deleted refs...")
+    # `clone --mirror` sets remote.origin.mirror, which refuses explicit refspecs
+    return [
+        ["git", "-C", repo_dir, "-c", "remote.origin.mirror=false", "push", "--quiet", "origin", *refspecs[i:i + PUSH_BATCH_SIZE]]
+        for i in range(0, len(refspecs), PUSH_BATCH_SIZE)
+    ]
+
+def rejected_as_protected(stderr) -> bool:
+    """Recognizes GitLab's and GitHub's "protected branch" push rejections."""
+    if not stderr:
+        return False
+    if isinstance(stderr, bytes):
+        stderr = stderr.decode(errors="replace")
+    return "protected branch" in stderr.lower()
 
+def configured_push_url(repo_dir):
+    """Reads remote.origin.pushurl from the mirror's config file, without spawning git."""
+    section = None
     try:
-        subprocess.run(["git", "-C", repo_dir, "push", "--mirror", "--quiet"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-        logger.info(f"[{repo.name}] Successfully synced to GitLab.")
-    except subprocess.CalledProcessError as e:
-        err_msg = e.stderr.decode().strip() if e.stderr else str(e)
-        raise subprocess.CalledProcessError(e.returncode, e.cmd, output=e.output, stderr=err_msg)
+        with open(os.path.join(repo_dir, "config")) as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("["):
+                    section = line
+                elif section == '[remote "origin"]':
+                    key, _, value = line.partition("=")
+                    if key.strip().lower() == "pushurl":
+                        return value.strip()
+    except OSError:
+        pass
+    return None
 
-def _update_sidecar_checkout(repo, repo_dir):
-    """Updates or clones a separate non-bare checkout for inspection."""
+def checkout_commands(repo, repo_dir, mode="clone"):
+    """
+    Builds the git commands that create or refresh the checkout next to a mirror.
+    New checkouts follow `mode`:
+    - "clone": a separate clone of the mirror (its own .git), refreshed with `git pull`
+    - "worktree": a detached worktree of the mirror itself. It has no objects of its own and
+      moves to the fetched default branch without a second fetch. Local edits are discarded.
+    An existing checkout keeps the kind it was created as.
+    Returns: (creating, commands)
+    """
     checkout_dir = repo_dir.replace(".git", "")
-    
-    if not os.path.exists(checkout_dir):
-        logger.debug(f"[{repo.name}] Creating checkout...")
-        try:
-            subprocess.run(["git", "clone", "--quiet", repo_dir, checkout_dir], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-        except subprocess.CalledProcessError as e:
-            err_msg = e.stderr.decode().strip() if e.stderr else str(e)
-            logger.error(f"[{repo.name}] Failed to create checkout: {err_msg}")
-    else:
-        logger.debug(f"[{repo.name}] Updating checkout...")
-        try:
-            subprocess.run(["git", "-C", checkout_dir, "pull", "--quiet"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-        except subprocess.CalledProcessError as e:
-            err_msg = e.stderr.decode().strip() if e.stderr else str(e)
-            logger.error(f"[{repo.name}] Failed to update checkout: {err_msg}")
+
+    if os.path.isfile(os.path.join(checkout_dir, ".git")):
+        # A worktree: its `.git` is a file pointing into the mirror
+        return False, [["git", "-C", checkout_dir, "checkout", "--quiet", "--force", "--detach", checkout_ref(repo, repo_dir)]]
+    if os.path.exists(checkout_dir):
+        return False, [["git", "-C", checkout_dir, "pull", "--quiet"]]
+    if mode == "worktree":
+        return True, [
+            # Forgets worktrees whose directory was deleted, so the path can be reused
+            ["git", "-C", repo_dir, "worktree", "prune"],
+            ["git", "-C", repo_dir, "worktree", "add", "--quiet", "--detach", os.path.abspath(checkout_dir), checkout_ref(repo, repo_dir)],
+        ]
+    return True, [["git", "clone", "--quiet", repo_dir, checkout_dir]]
+
+def checkout_ref(repo, repo_dir) -> str:
+    """
+    The branch a worktree checkout shows: the default branch, or what the mirror's HEAD points to.
+    Worktrees are detached: a branch checked out in a worktree could no longer be fetched into.
+    """
+    if repo.default_branch:
+        return f"refs/heads/{repo.default_branch}"
+    try:
+        with open(os.path.join(repo_dir, "HEAD")) as f:
+            head = f.read().strip()
+    except OSError:
+        head = ""
+    # "ref: refs/heads/main"; anything else (a detached mirror) is read from inside the mirror
+    return head[len("ref:"):].strip() if head.startswith("ref:") else head or "HEAD"
+
+@traced("git")
+def _update_sidecar_checkout(repo, repo_dir, mode="clone"):
+    """Updates or creates the checkout next to the mirror (see checkout_commands)."""
+    creating, commands = checkout_commands(repo, repo_dir, mode)
+    logger.debug(f"[{repo.name}] {'Creating' if creating else 'Updating'} checkout...")
+    try:
+        for cmd in commands:
+            yield Git(cmd)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"[{repo.name}] Failed to {'create' if creating else 'update'} checkout: {e.stderr}")
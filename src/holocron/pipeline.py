@@ -0,0 +1,116 @@
+import time
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Callable
+from .logger import logger
+from .metrics import QUEUE_DEPTH, in_flight
+from .tracing import span
+
+# Items buffered in front of each stage
+DEFAULT_QUEUE_SIZE = 64
+
+# End-of-stream marker, one per worker
+_DONE = object()
+
+@dataclass
+class Stage:
+    """One step of a pipeline: `func(item)` run by `workers` threads."""
+    name: str
+    func: Callable
+    workers: int
+
+class Pipeline:
+    """
+    Runs items through a chain of stages. Every stage has its own worker threads and reads
+    from its own bounded queue, so a slow stage only stalls the stages in front of it once
+    its queue is full, instead of holding one worker per item for the whole chain.
+
+    An item whose stage raises skips the remaining stages and is reported with the exception.
+    """
+
+    def __init__(self, stages: list, queue_size=DEFAULT_QUEUE_SIZE):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.busy = {stage.name: 0.0 for stage in stages}  # seconds spent inside each stage
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._results = queue.Queue()
+        self._remaining = [max(1, stage.workers) for stage in stages]
+        self._lock = threading.Lock()
+
+    def queue_depths(self) -> dict:
+        """Items currently waiting in front of each stage."""
+        return {stage.name: q.qsize() for stage, q in zip(self.stages, self._queues)}
+
+    def run(self, items):
+        """
+        Feeds `items` through all stages.
+        Yields: (item, exception or None), in completion order.
+        """
+        threads = [threading.Thread(target=self._feed, args=(list(items),), name="pipeline-feed", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            for n in range(max(1, stage.workers)):
+                threads.append(threading.Thread(
+                    target=self._work, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+
+        while True:
+            entry = self._results.get()
+            if entry is _DONE:
+                break
+            yield entry
+
+        for thread in threads:
+            thread.join()
+
+    def _feed(self, items):
+        for item in items:
+            self._put(0, item)
+        for _ in range(self._remaining[0]):
+            self._queues[0].put(_DONE)
+
+    def _work(self, index):
+        stage = self.stages[index]
+        inbox = self._queues[index]
+        is_last = index == len(self.stages) - 1
+
+        while True:
+            entry = inbox.get()
+            if entry is _DONE:
+                break
+
+            item, _ = entry
+            QUEUE_DEPTH.dec(stage=stage.name)
+            started = time.monotonic()
+            try:
+                with in_flight(stage.name), span(stage.name, "pipeline"):
+                    stage.func(item)
+            except Exception as e:
+                logger.debug(f"Pipeline stage '{stage.name}' failed: {e}")
+                self._results.put((item, e))
+                continue
+            finally:
+                with self._lock:
+                    self.busy[stage.name] += time.monotonic() - started
+
+            if is_last:
+                self._results.put((item, None))
+            else:
+                self._put(index + 1, item)
+
+        # The last worker of a stage to finish closes the next stage
+        with self._lock:
+            self._remaining[index] -= 1
+            closing = self._remaining[index] == 0
+        if closing:
+            if is_last:
+                self._results.put(_DONE)
+            else:
+                for _ in range(self._remaining[index + 1]):
+                    self._queues[index + 1].put(_DONE)
+
+    def _put(self, index, item):
+        QUEUE_DEPTH.inc(stage=self.stages[index].name)
+        self._queues[index].put((item, None))
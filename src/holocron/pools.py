@@ -0,0 +1,96 @@
+import os
+import threading
+import subprocess
+from typing import Optional
+from .logger import logger
+from .state import STATE_DIRNAME
+
+POOLS_DIRNAME = "pools"
+
+# pool_dir -> Lock, so two forks never fetch into the same pool at once
+_pool_locks = {}
+_pool_locks_guard = threading.Lock()
+
+def _pool_lock(pool) -> threading.Lock:
+    with _pool_locks_guard:
+        return _pool_locks.setdefault(pool, threading.Lock())
+
+def pool_dir(storage_path, network) -> str:
+    """Object pool of a fork network, keyed by the parent's `owner/name`."""
+    key = network.replace("/", "__")
+    return os.path.join(storage_path, STATE_DIRNAME, POOLS_DIRNAME, f"{key}.git")
+
+def _git(*args):
+    try:
+        subprocess.run(["git", *args], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except subprocess.CalledProcessError as e:
+        err_msg = e.stderr.decode().strip() if e.stderr else str(e)
+        raise subprocess.CalledProcessError(e.returncode, e.cmd, output=e.output, stderr=err_msg)
+
+def ensure_pool(repo, storage_path, network) -> Optional[str]:
+    """
+    Returns the object pool of fork network `network` (the parent's `owner/name`),
+    creating it if needed.
+    A new pool is seeded from the parent's local mirror, if we have one, so the fork's clone
+    only transfers the objects the fork added.
+    Returns None without a network.
+    """
+    if not network:
+        return None
+
+    pool = pool_dir(storage_path, network)
+    with _pool_lock(pool):
+        if os.path.exists(pool):
+            return pool
+
+        logger.debug(f"[{repo.name}] Creating object pool for fork network '{network}'...")
+        tmp = f"{pool}.tmp"
+        _git("init", "--quiet", "--bare", tmp)
+        # Members borrow objects through alternates: the pool must never drop any
+        _git("-C", tmp, "config", "gc.auto", "0")
+        _git("-C", tmp, "config", "gc.pruneExpire", "never")
+
+        parent_mirror = os.path.join(storage_path, f"{network.rsplit('/', 1)[-1]}.git")
+        if os.path.exists(parent_mirror) and parent_mirror != os.path.join(storage_path, f"{repo.name}.git"):
+            _git("-C", tmp, "fetch", "--quiet", "--no-tags", parent_mirror, "+refs/*:refs/members/parent/*")
+        os.replace(tmp, pool)
+    return pool
+
+def clone_args(repo, storage_path, source_provider=None) -> list:
+    """
+    Extra `git clone` arguments for a new mirror: `--reference <pool>` for forks.
+    The parent is only looked up here (see Provider.fork_parent), i.e. once per new fork.
+    """
+    if not (repo.fork or repo.fork_parent):
+        return []
+    network = source_provider.fork_parent(repo) if source_provider else repo.fork_parent
+    pool = ensure_pool(repo, storage_path, network)
+    return ["--reference", pool] if pool else []
+
+def update_pool(repo, repo_dir):
+    """
+    Copies the objects of a fork mirror into its pool, under refs that are never deleted.
+    The pool then keeps every object any member borrows, whatever happens to the members
+    (force pushes, repacks, prunes) later on. Pools themselves are never pruned.
+    The pool is found through the mirror's alternates, so the fork parent is not needed.
+    """
+    pool = _borrowed_pool(repo_dir)
+    if pool is None:
+        return
+
+    with _pool_lock(pool):
+        # Force-pushed-away tips become unreachable here, but are kept: pools are never pruned
+        _git("-C", pool, "fetch", "--quiet", "--no-tags", repo_dir, f"+refs/*:refs/members/{repo.name}/*")
+
+def _borrowed_pool(repo_dir) -> Optional[str]:
+    """The pool a mirror was cloned against (its alternates), or None: only those feed a pool."""
+    pools = os.path.join(os.path.dirname(os.path.abspath(repo_dir)), STATE_DIRNAME, POOLS_DIRNAME)
+    try:
+        with open(os.path.join(repo_dir, "objects", "info", "alternates")) as f:
+            for line in f:
+                objects = os.path.abspath(line.strip())
+                if os.path.dirname(os.path.dirname(objects)) == pools and os.path.exists(objects):
+                    return os.path.dirname(objects)
+    except OSError:
+        pass
+    return None
@@ -1,7 +1,10 @@
+import time
+import threading
 from abc import ABC, abstractmethod
 from typing import Optional
 from dataclasses import dataclass
 from datetime import datetime
+from ..logger import logger
 
 @dataclass
 class Repository:
@@ -10,15 +13,71 @@ class Repository:
     clone_url: str
     size: int = 0  # in KB
     pushed_at: Optional[datetime] = None
+    default_branch: Optional[str] = None
+    id: Optional[int] = None  # provider-side ID, as referenced by change feed events
+    fork_parent: Optional[str] = None  # `owner/name` of the repository this is a fork of
+    fork: bool = False  # set even when the listing does not name the parent (see Provider.fork_parent)
+
+class ListingError(Exception):
+    """A listing could not be fetched completely (a page kept failing); no partial list is returned."""
+
+@dataclass
+class RepoChange:
+    """A ref change reported by a provider's event feed."""
+    repo_id: Optional[int]
+    name: Optional[str]  # None if the feed only carries the ID (GitLab)
+    event: str
+
+# Seconds a known-good branch protection state is trusted before prepare_push checks again
+DEFAULT_PROTECTION_TTL = 3600
+
+class ProtectionCache:
+    """
+    Remembers destination projects whose default branch is known to accept force pushes
+    (unprotected, already allowed, or just fixed by prepare_push), keyed by project and
+    default branch. Entries expire after `ttl` seconds and are dropped when a push is
+    rejected as protected. An entry only vouches for the branch it was verified for, so a
+    renamed default branch is checked again.
+    """
+
+    def __init__(self, ttl=DEFAULT_PROTECTION_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = {}  # project -> (default_branch, checked_at)
+        self._lock = threading.Lock()
+
+    def is_fresh(self, project, default_branch) -> bool:
+        """Whether `default_branch` of `project` was verified within `ttl` (an unknown branch never is)."""
+        with self._lock:
+            entry = self._entries.get(project)
+            return (
+                entry is not None and default_branch is not None and entry[0] == default_branch
+                and self._clock() - entry[1] < self.ttl
+            )
+
+    def remember(self, project, default_branch):
+        with self._lock:
+            self._entries[project] = (default_branch, self._clock())
+
+    def invalidate(self, project):
+        with self._lock:
+            self._entries.pop(project, None)
 
 class Provider(ABC):
     """Abstract base class for all providers (Source or Destination)."""
 
+    # Set by providers talking HTTP: their PooledSession and its RateLimitGovernor
+    session = None
+    governor = None
+    # Totals at the last report_usage(), so each report covers one cycle
+    _reported_usage = None
+
     @abstractmethod
     def fetch_repos(self) -> list[Repository]:
         """
         Fetches the list of repositories from the provider.
         Returns: A list of Repository objects.
+        Raises: ListingError if the list would be incomplete.
         """
         pass
 
@@ -31,9 +90,81 @@ class Provider(ABC):
         """
         pass
 
+    def fetch_changes(self, cursor: Optional[dict]):
+        """
+        Reads the provider's event feed since `cursor` (as returned by the previous call).
+        Returns: (changes, new_cursor). `changes` is a list of RepoChange, or None when the feed
+        cannot vouch for completeness (first call, gap, unsupported) and a full listing is needed.
+        """
+        return None, cursor or {}
+
+    def fork_parent(self, repo: Repository) -> Optional[str]:
+        """
+        `owner/name` of the repository a fork was forked from, looked up if the listing did not
+        carry it. Only called when --fork-pools clones a new fork.
+        """
+        return repo.fork_parent
+
+    def refresh_repo(self, repo: Repository) -> Optional[Repository]:
+        """
+        Re-reads one listed repository by its ID, for the fields a push changes (`pushed_at`, size).
+        Repositories handed out by the change feed or webhooks come from the last full listing,
+        and recording their stale `pushed_at` would make the next listing sync them again.
+        Returns: An updated copy of `repo`, or None if it cannot be read.
+        """
+        return None
+
+    def connection_stats(self) -> dict:
+        """
+        Returns HTTP connection pool statistics since the provider was created: {"opened": int, "reused": int}.
+        Providers without a pooled session report nothing.
+        """
+        if self.session is None:
+            return {}
+        return self.session.connection_stats()
+
+    def rate_limit_status(self) -> dict:
+        """
+        Returns the last known API budget: {"limit", "remaining", "reset_at", "retries"}
+        (`retries` since the provider was created).
+        Providers without a rate-limit governor report nothing.
+        """
+        if self.governor is None:
+            return {}
+        return self.governor.status()
+
+    def report_usage(self, label: str):
+        """
+        Logs HTTP connection reuse and the remaining API budget, once per cycle.
+        Connections and retries are counted since the previous report.
+        """
+        stats = self.connection_stats()
+        budget = self.rate_limit_status()
+        totals = {**stats, "retries": budget.get('retries', 0)}
+        previous = self._reported_usage or {}
+        cycle = {key: max(0, value - previous.get(key, 0)) for key, value in totals.items()}
+        self._reported_usage = totals
+
+        if stats:
+            logger.debug(f"HTTP connections ({label}): {cycle['opened']} opened, {cycle['reused']} reused")
+
+        if budget and budget['remaining'] is not None:
+            msg = f"API budget ({label}): {budget['remaining']}/{budget['limit']} requests remaining, {cycle['retries']} retries"
+            if budget['limit'] and budget['remaining'] < budget['limit'] * 0.1:
+                logger.warning(msg)
+            else:
+                logger.debug(msg)
+
     def prepare_push(self, repo: Repository):
         """
         Optional hook to prepare the repository for pushing.
         e.g., Unprotect branches on GitLab to allow force push.
         """
         pass
+
+    def invalidate_protection(self, repo: Repository):
+        """
+        Optional hook called when a push was rejected by branch protection,
+        so the next prepare_push re-checks instead of trusting a cached state.
+        """
+        pass
@@ -1,23 +1,101 @@
-import requests
+import time
+from dataclasses import replace
 from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
 from ..logger import logger, log_execution
+from ..tracing import traced
 from ..config import GITHUB_API_URL
-from .base import Provider, Repository
+from .base import Provider, Repository, RepoChange, ListingError, ProtectionCache, DEFAULT_PROTECTION_TTL
+from .ratelimit import RateLimitGovernor
+from .http import PooledSession, ValidatorCache, DEFAULT_PAGE_CONCURRENCY, DEFAULT_ORG_CONCURRENCY, DEFAULT_POOL_SIZE, PROTECTION_TIMEOUT
+
+# --- GraphQL inventory queries ---
+# Only the fields we actually use, which is a fraction of the ~100 fields of a REST repo object.
+GRAPHQL_REPO_FIELDS = """
+fragment RepoFields on Repository {
+  databaseId
+  name
+  url
+  diskUsage
+  pushedAt
+  parent { nameWithOwner }
+  defaultBranchRef { name }
+}
+"""
+
+GRAPHQL_VIEWER_REPOS = """
+query($cursor: String) {
+  viewer {
+    repositories(first: 100, after: $cursor, ownerAffiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER]) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...RepoFields }
+    }
+  }
+}
+""" + GRAPHQL_REPO_FIELDS
+
+GRAPHQL_VIEWER_ORGS = """
+query($cursor: String) {
+  viewer {
+    organizations(first: 100, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes { login }
+    }
+  }
+}
+"""
+
+GRAPHQL_ORG_REPOS = """
+query($login: String!, $cursor: String) {
+  organization(login: $login) {
+    repositories(first: 100, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...RepoFields }
+    }
+  }
+}
+""" + GRAPHQL_REPO_FIELDS
+
+# Events that move refs. The events API keeps at most 300 events per feed.
+CHANGE_EVENTS = {"PushEvent", "CreateEvent", "DeleteEvent"}
+EVENT_FEED_PAGES = 3
 
 class GitHubProvider(Provider):
-    def __init__(self, token, api_url=GITHUB_API_URL):
+    def __init__(self, token, api_url=GITHUB_API_URL, page_concurrency=DEFAULT_PAGE_CONCURRENCY, org_concurrency=DEFAULT_ORG_CONCURRENCY, pool_size=DEFAULT_POOL_SIZE, use_graphql=False, protection_ttl=DEFAULT_PROTECTION_TTL):
         self.token = token
         self.api_url = api_url
+        self.use_graphql = use_graphql
+        self.page_concurrency = page_concurrency
+        self.org_concurrency = org_concurrency
+        # Listing fans out to org_concurrency * page_concurrency threads, syncing to pool_size
+        self.governor = RateLimitGovernor("github")
+        self.session = PooledSession(
+            headers={
+                'Authorization': f'token {self.token}',
+                'Accept': 'application/vnd.github.v3+json'
+            },
+            pool_size=max(pool_size, org_concurrency * page_concurrency),
+            governor=self.governor
+        )
+        # Lives as long as the provider, i.e. across watch cycles
+        self._validators = ValidatorCache()
+        self._protection = ProtectionCache(ttl=protection_ttl)
+        self._fork_parents = {}  # full_name -> parent full_name, None if it could not be read
 
     def get_remote_url(self, repo: Repository) -> str:
         """Constructs the authenticated clone URL."""
         # Dataclass field access
         return repo.clone_url.replace("https://", f"https://oauth2:{self.token}@")
 
+    @traced("api", record=())
     @log_execution
     def fetch_repos(self) -> list[Repository]:
         """Fetches all repositories from the user AND their organizations."""
-        headers = {'Authorization': f'token {self.token}'}
+        if self.use_graphql:
+            return self._fetch_repos_graphql()
+
+        headers = {}  # Auth is set once on the session
         all_repos = []
         seen_ids = set()
 
@@ -44,22 +122,117 @@ class GitHubProvider(Provider):
             "organizations"
         )
 
-        # 3. Fetch Repos for each Org
-        for org in orgs:
-            org_name = org['login']
-            org_repos = self._get_all_pages(
-                f"{self.api_url}/orgs/{org_name}/repos",
-                headers,
-                f"repositories for organization '{org_name}'",
-                query_params={"type": "all"}
-            )
-            for item in org_repos:
-                if item['id'] not in seen_ids:
-                    all_repos.append(self._to_repository(item))
-                    seen_ids.add(item['id'])
+        # 3. Fetch Repos for each Org, `org_concurrency` orgs at a time
+        with ThreadPoolExecutor(max_workers=max(1, self.org_concurrency)) as executor:
+            futures = [executor.submit(self._get_org_repos, org['login'], headers) for org in orgs]
+
+            # Merged in org order on this thread, so the dedup stays deterministic
+            timings = []
+            for future in futures:
+                org_name, org_repos, elapsed = future.result()
+                timings.append((elapsed, org_name))
+                logger.debug(f"Listed {len(org_repos)} repositories for organization '{org_name}' in {elapsed:.2f}s")
+                for item in org_repos:
+                    if item['id'] not in seen_ids:
+                        all_repos.append(self._to_repository(item))
+                        seen_ids.add(item['id'])
+
+        if timings:
+            elapsed, org_name = max(timings)
+            logger.debug(f"Slowest organization listing: '{org_name}' ({elapsed:.2f}s)")
                     
         return all_repos
 
+    def fetch_changes(self, cursor):
+        """
+        Polls the authenticated user's event feeds (own, watched repositories, one per organization) for
+        pushes, ref creations and ref deletions since `cursor` ({feed_url: last event id}).
+        Unchanged feeds answer 304 to the conditional request, which is free.
+        """
+        cursor = dict(cursor or {})
+        try:
+            r = self.session.get(f"{self.api_url}/user")
+            r.raise_for_status()
+            login = r.json()['login']
+        except Exception as e:
+            logger.error(f"ERROR reading the GitHub user for the event feed: {e}")
+            return None, cursor
+
+        try:
+            orgs = self._get_all_pages(f"{self.api_url}/user/orgs", {}, "organizations")
+        except ListingError:
+            # Without every organization's feed, changes could be missed
+            return None, cursor
+
+        # The user's own activity, then everyone's activity in watched repositories (owners watch
+        # their repositories by default, so collaborators' pushes show up there), then the orgs
+        feeds = [f"{self.api_url}/users/{login}/events", f"{self.api_url}/users/{login}/received_events"]
+        feeds += [f"{self.api_url}/users/{login}/events/orgs/{org['login']}" for org in orgs]
+
+        changes = []
+        complete = True
+        for feed in feeds:
+            try:
+                events, newest, reached = self._poll_feed(feed, cursor.get(feed))
+            except Exception as e:
+                logger.error(f"ERROR polling {feed}: {e}")
+                complete = False
+                continue
+            complete = complete and reached
+            if newest is not None:
+                cursor[feed] = newest
+            changes.extend(
+                RepoChange(repo_id=event['repo'].get('id'), name=event['repo']['name'].split('/')[-1], event=event['type'])
+                for event in events if event.get('type') in CHANGE_EVENTS
+            )
+
+        logger.debug(f"Event feeds: {len(changes)} ref changes in {len(feeds)} feeds.")
+        return (changes if complete else None), cursor
+
+    def refresh_repo(self, repo: Repository):
+        if repo.id is None:
+            return None
+        try:
+            r = self.session.get(f"{self.api_url}/repositories/{repo.id}")
+            r.raise_for_status()
+            fresh = self._to_repository(r.json())
+        except Exception as e:
+            logger.debug(f"[{repo.name}] Could not refresh repository: {e}")
+            return None
+        return replace(repo, pushed_at=fresh.pushed_at, size=fresh.size)
+
+    def _poll_feed(self, feed, last_id):
+        """
+        Reads one event feed, newest first, down to `last_id`.
+        Returns: (new events, newest event id, whether `last_id` was reached).
+        Not reaching it means events may have been missed (first poll, or more than the feed keeps).
+        """
+        events = []
+        newest = None
+        for page in range(1, EVENT_FEED_PAGES + 1):
+            data, _ = self._get_page(feed, {}, {'per_page': 100}, page)
+            for event in data or []:
+                event_id = int(event['id'])
+                newest = max(newest or event_id, event_id)
+                if last_id is not None and event_id <= last_id:
+                    return events, newest, True
+                events.append(event)
+            if not data or len(data) < 100:
+                # The whole feed fits; an empty feed has nothing to miss either
+                return events, newest if newest is not None else last_id, last_id is not None or not data
+        return events, newest, False
+
+    def _get_org_repos(self, org_name, headers):
+        """Lists the repositories of one organization. Returns: (org_name, items, elapsed seconds)."""
+        started = time.monotonic()
+        org_repos = self._get_all_pages(
+            f"{self.api_url}/orgs/{org_name}/repos",
+            headers,
+            f"repositories for organization '{org_name}'",
+            query_params={"type": "all"}
+        )
+        return org_name, org_repos, time.monotonic() - started
+
     def _to_repository(self, item: dict) -> Repository:
         """Helper to convert GitHub API dict to Repository object."""
         pushed_at = None
@@ -73,48 +246,261 @@ class GitHubProvider(Provider):
             name=item['name'],
             clone_url=item['clone_url'],
             size=item.get('size', 0),
-            pushed_at=pushed_at
+            pushed_at=pushed_at,
+            default_branch=item.get('default_branch'),
+            id=item.get('id'),
+            fork=item.get('fork', False)
+        )
+
+    def fork_parent(self, repo: Repository):
+        """
+        REST listings only flag forks, so the parent costs one request per fork, once per run
+        (failures included): the parent of a fork never changes.
+        """
+        if repo.fork_parent or not repo.fork:
+            return repo.fork_parent
+        # https://github.com/owner/name.git -> owner/name
+        full_name = urlparse(repo.clone_url).path.strip("/").removesuffix(".git")
+        if full_name in self._fork_parents:
+            return self._fork_parents[full_name]
+
+        parent = None
+        try:
+            r = self.session.get(f"{self.api_url}/repos/{full_name}")
+            r.raise_for_status()
+            parent = (r.json().get('parent') or {}).get('full_name')
+        except Exception as e:
+            logger.debug(f"Could not read the parent of fork '{full_name}': {e}")
+
+        self._fork_parents[full_name] = parent
+        return parent
+
+    def _fetch_repos_graphql(self) -> list[Repository]:
+        """
+        Same inventory as the REST listing, through GraphQL.
+        Only the fields we use are requested, 100 repositories per round trip.
+        """
+        all_repos = []
+        seen_ids = set()
+
+        def add(nodes):
+            for node in nodes:
+                if node and node['databaseId'] not in seen_ids:
+                    all_repos.append(self._graphql_to_repository(node))
+                    seen_ids.add(node['databaseId'])
+
+        # 1. User Repos (all affiliations)
+        add(self._graphql_paginate(
+            GRAPHQL_VIEWER_REPOS,
+            {},
+            ("viewer", "repositories"),
+            "user repositories (GraphQL)"
+        ))
+
+        # 2. User Organizations
+        orgs = self._graphql_paginate(
+            GRAPHQL_VIEWER_ORGS,
+            {},
+            ("viewer", "organizations"),
+            "organizations (GraphQL)"
+        )
+
+        # 3. Repos for each Org, merged in org order
+        with ThreadPoolExecutor(max_workers=max(1, self.org_concurrency)) as executor:
+            futures = [
+                executor.submit(
+                    self._graphql_paginate,
+                    GRAPHQL_ORG_REPOS,
+                    {"login": org['login']},
+                    ("organization", "repositories"),
+                    f"repositories for organization '{org['login']}' (GraphQL)"
+                )
+                for org in orgs if org
+            ]
+            for future in futures:
+                add(future.result())
+
+        return all_repos
+
+    def _graphql_url(self):
+        """GitHub.com serves GraphQL at /graphql, GitHub Enterprise at /api/graphql next to /api/v3."""
+        base_url = self.api_url.rstrip('/')
+        if base_url.endswith('/v3'):
+            return f"{base_url[:-3]}/graphql"
+        return f"{base_url}/graphql"
+
+    def _graphql_paginate(self, query, variables, path, context_name):
+        """
+        Runs a cursor-paginated GraphQL query and returns all nodes of the connection at `path`.
+        Access errors (FORBIDDEN, e.g. an organization enforcing SAML the token is not authorized
+        for) only leave out what they cover: they are logged and the rest is returned.
+        Raises: ListingError if a page fails otherwise (like _get_all_pages).
+        """
+        nodes = []
+        cursor = None
+
+        logger.debug(f"Fetching {context_name}...")
+
+        while True:
+            try:
+                r = self.session.post(self._graphql_url(), json={
+                    "query": query,
+                    "variables": {**variables, "cursor": cursor}
+                })
+                r.raise_for_status()
+                payload = r.json()
+                errors = payload.get('errors') or []
+                if any(error.get('type') != 'FORBIDDEN' for error in errors):
+                    raise RuntimeError(errors[0].get('message', errors))
+                for error in errors:
+                    logger.warning(f"Skipping part of {context_name}: {error.get('message')}")
+
+                connection = payload['data']
+                for key in path:
+                    connection = connection[key] if connection else None
+                if connection is None and errors:
+                    break
+
+                nodes.extend(connection['nodes'])
+                logger.debug(f"GraphQL page returned {len(connection['nodes'])} items.")
+
+                page_info = connection['pageInfo']
+                if not page_info['hasNextPage']:
+                    break
+                cursor = page_info['endCursor']
+            except Exception as e:
+                logger.error(f"ERROR fetching {context_name}: {e}")
+                raise ListingError(f"{context_name}: {e}") from e
+        return nodes
+
+    def _graphql_to_repository(self, node: dict) -> Repository:
+        """Helper to convert a GraphQL Repository node to a Repository object."""
+        pushed_at = None
+        if node.get('pushedAt'):
+            try:
+                pushed_at = datetime.strptime(node['pushedAt'], "%Y-%m-%dT%H:%M:%SZ")
+            except ValueError:
+                pass
+
+        default_branch = (node.get('defaultBranchRef') or {}).get('name')
+
+        return Repository(
+            name=node['name'],
+            clone_url=f"{node['url']}.git",
+            size=node.get('diskUsage') or 0,
+            pushed_at=pushed_at,
+            default_branch=default_branch,
+            id=node.get('databaseId'),
+            fork_parent=(node.get('parent') or {}).get('nameWithOwner'),
+            fork=node.get('parent') is not None
         )
 
+    @traced("api", record=("context_name",))
     def _get_all_pages(self, base_url, headers, context_name, query_params=None):
-        """Helper to fetch all pages from a GitHub endpoint."""
+        """
+        Helper to fetch all pages from a GitHub endpoint.
+        If the first page advertises the last page (`Link: rel="last"`), the remaining pages
+        are fetched concurrently. Otherwise pages are walked one by one until a short page.
+        Items are always returned in page order.
+        """
         if query_params is None:
             query_params = {}
             
         items = []
-        page = 1
         query_params['per_page'] = 100
         
         logger.debug(f"Fetching {context_name}...")
-        
+
+        try:
+            data, r = self._get_page(base_url, headers, query_params, 1)
+        except Exception as e:
+            logger.error(f"ERROR fetching {context_name}: {e}")
+            raise ListingError(f"{context_name}: {e}") from e
+
+        if not data:
+            logger.debug("Page 1 empty. stopping.")
+            return items
+        items.extend(data)
+        if len(data) < query_params['per_page']:
+            return items
+
+        # A 304 may not repeat the Link header: fall back to the count cached with the page
+        last_page = self._last_page(r) or self._validators.page_count(base_url, {**query_params, 'page': 1})
+        if last_page:
+            pages = range(2, last_page + 1)
+            logger.debug(f"Fetching pages 2-{last_page} of {context_name} concurrently...")
+            with ThreadPoolExecutor(max_workers=max(1, min(self.page_concurrency, len(pages)))) as executor:
+                futures = [executor.submit(self._get_page, base_url, headers, query_params, page) for page in pages]
+                for future in futures:
+                    try:
+                        data, _ = future.result()
+                    except Exception as e:
+                        logger.error(f"ERROR fetching {context_name}: {e}")
+                        for pending in futures:
+                            pending.cancel()
+                        raise ListingError(f"{context_name}: {e}") from e
+                    items.extend(data or [])
+            return items
+
+        page = 2
         while True:
             try:
-                query_params['page'] = page
-                
-                logger.debug(f"Requesting page {page} from {base_url} with params {query_params}")
-
-                r = requests.get(base_url, headers=headers, params=query_params, timeout=20)
-                r.raise_for_status()
-                
-                data = r.json()
+                data, _ = self._get_page(base_url, headers, query_params, page)
                 if not data:
                     logger.debug(f"Page {page} empty. stopping.")
                     break
                 
-                count = len(data)
-                logger.debug(f"Page {page} returned {count} items.")
-                    
                 items.extend(data)
                 
-                if count < query_params['per_page']:
+                if len(data) < query_params['per_page']:
                     break
                     
                 page += 1
             except Exception as e:
                 logger.error(f"ERROR fetching {context_name}: {e}")
-                break
+                raise ListingError(f"{context_name}: {e}") from e
         return items
 
+    def _get_page(self, base_url, headers, query_params, page):
+        """Fetches a single page. Returns: (items, response)."""
+        # Each page gets its own params, so pages can be fetched from several threads
+        params = {**query_params, 'page': page}
+
+        logger.debug(f"Requesting page {page} from {base_url} with params {params}")
+
+        # Conditional request: a 304 does not count against the GitHub rate limit
+        request_headers = {**headers, **self._validators.conditional_headers(base_url, params)}
+        r = self.session.get(base_url, headers=request_headers, params=params)
+
+        data = None
+        if r.status_code == 304:
+            data = self._validators.cached(base_url, params)
+            if data is None:
+                # Nothing to serve it from: an empty page here would end the listing early
+                logger.debug(f"Page {page} not modified but not cached, requesting it again.")
+                r = self.session.get(base_url, headers=headers, params=params)
+                if r.status_code == 304:
+                    raise RuntimeError(f"{base_url} page {page}: 304 Not Modified to an unconditional request")
+            else:
+                logger.debug(f"Page {page} not modified, using cached copy.")
+
+        if data is None:
+            r.raise_for_status()
+            data = r.json()
+            self._validators.store(base_url, params, r, data, page_count=self._last_page(r))
+
+        logger.debug(f"Page {page} returned {len(data or [])} items.")
+        return data, r
+
+    def _last_page(self, response):
+        """Reads the last page number from the `Link` header. Returns None if unknown."""
+        try:
+            last_url = response.links['last']['url']
+            return int(parse_qs(urlparse(last_url).query)['page'][0])
+        except (AttributeError, KeyError, IndexError, TypeError, ValueError):
+            return None
+
+    @traced("api")
     def prepare_push(self, repo: Repository):
         """
         Ensures the default branch is configured to allow force pushes.
@@ -122,30 +508,32 @@ class GitHubProvider(Provider):
         if not self.token:
             return
 
+        # The destination mirrors the source, so the source's default branch is the one to verify
+        if self._protection.is_fresh(repo.name, repo.default_branch):
+            logger.debug(f"[{repo.name}] Branch protection recently verified, skipping check.")
+            return
+
         try:
             # 1. Get Repo Details (for default branch)
             # We assume repo.name is "owner/repo" for GitHub
-            headers = {
-                'Authorization': f'token {self.token}',
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
             logger.debug(f"[{repo.name}] Checking branch protection...")
             
-            r = requests.get(f"{self.api_url}/repos/{repo.name}", headers=headers, timeout=10)
+            r = self.session.get(f"{self.api_url}/repos/{repo.name}", timeout=PROTECTION_TIMEOUT)
             if r.status_code == 404:
                 return
             r.raise_for_status()
             
-            default_branch = r.json().get('default_branch', 'main')
+            # Verify (and cache) the branch the mirror pushes, so is_fresh() above checks the same one
+            default_branch = repo.default_branch or r.json().get('default_branch', 'main')
 
             # 2. Check Protection
             # GET /repos/{owner}/{repo}/branches/{branch}/protection
             prot_url = f"{self.api_url}/repos/{repo.name}/branches/{default_branch}/protection"
-            r_prot = requests.get(prot_url, headers=headers, timeout=10)
+            r_prot = self.session.get(prot_url, timeout=PROTECTION_TIMEOUT)
             
             if r_prot.status_code == 404:
                 # Not protected
+                self._protection.remember(repo.name, default_branch)
                 return
                 
             if r_prot.status_code == 200:
@@ -268,9 +656,14 @@ class GitHubProvider(Provider):
                              "apps": apps
                          }
 
-                    r_put = requests.put(prot_url, headers=headers, json=update_payload, timeout=10)
+                    r_put = self.session.put(prot_url, json=update_payload, timeout=PROTECTION_TIMEOUT)
                     r_put.raise_for_status()
                     logger.info(f"[{repo.name}] Successfully enabled force push.")
 
+                self._protection.remember(repo.name, default_branch)
+
         except Exception as e:
             logger.warning(f"[{repo.name}] Failed to update GitHub branch protection: {e}")
+
+    def invalidate_protection(self, repo: Repository):
+        self._protection.invalidate(repo.name)
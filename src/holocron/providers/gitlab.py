@@ -1,20 +1,39 @@
-import requests
+from dataclasses import replace
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from ..logger import logger, log_execution
-from .base import Provider, Repository
+from ..tracing import traced
+from .base import Provider, Repository, RepoChange, ListingError, ProtectionCache, DEFAULT_PROTECTION_TTL
+from .ratelimit import RateLimitGovernor
+from .http import PooledSession, ValidatorCache, DEFAULT_PAGE_CONCURRENCY, DEFAULT_POOL_SIZE, PROTECTION_TIMEOUT
+
+# Event actions that move refs ("pushed to", "pushed new", and "deleted" for branches/tags)
+CHANGE_ACTIONS = {"pushed to", "pushed new", "deleted"}
+EVENT_FEED_PAGES = 3
 
 class GitLabProvider(Provider):
-    def __init__(self, api_url, token, namespace=None):
+    def __init__(self, api_url, token, namespace=None, page_concurrency=DEFAULT_PAGE_CONCURRENCY, pool_size=DEFAULT_POOL_SIZE, protection_ttl=DEFAULT_PROTECTION_TTL):
         self.api_url = api_url
         self.token = token
         self.namespace = namespace
+        self.page_concurrency = page_concurrency
+        self.governor = RateLimitGovernor("gitlab")
+        self.session = PooledSession(
+            headers={'Private-Token': self.token} if self.token else None,
+            pool_size=max(pool_size, page_concurrency),
+            governor=self.governor
+        )
+        # Lives as long as the provider, i.e. across watch cycles
+        self._validators = ValidatorCache()
+        self._protection = ProtectionCache(ttl=protection_ttl)
 
+    @traced("api", record=())
     @log_execution
     def fetch_repos(self) -> list[Repository]:
         """
         Fetches repositories from GitLab (User + Groups).
         """
-        headers = {'Private-Token': self.token}
+        headers = {}  # Auth is set once on the session
         all_repos = []
         seen_ids = set()
 
@@ -25,7 +44,8 @@ class GitLabProvider(Provider):
             "GitLab projects (membership=true)",
              query_params={
                 "membership": "true",
-                "simple": "true" 
+                # Real repository sizes (needs at least Reporter access, otherwise omitted)
+                "statistics": "true"
              }
         )
         
@@ -39,6 +59,59 @@ class GitLabProvider(Provider):
         
         return all_repos
 
+    def fetch_changes(self, cursor):
+        """
+        Polls the events API (`/events?scope=all`: everyone's activity in the projects the token
+        can see, not only the token owner's) for pushes and ref deletions since `cursor` ({"last_id": int}).
+        Events only carry the project ID, which is resolved against the last full listing.
+        """
+        cursor = dict(cursor or {})
+        last_id = cursor.get("last_id")
+        url = f"{self.api_url}/events"
+
+        events = []
+        newest = None
+        reached = False
+        try:
+            for page in range(1, EVENT_FEED_PAGES + 1):
+                data, _ = self._get_page(url, {}, {'per_page': 100, 'scope': 'all'}, page)
+                for event in data or []:
+                    newest = max(newest or event['id'], event['id'])
+                    if last_id is not None and event['id'] <= last_id:
+                        reached = True
+                        break
+                    events.append(event)
+                if reached or not data or len(data) < 100:
+                    reached = reached or last_id is not None or not data
+                    break
+        except Exception as e:
+            logger.error(f"ERROR polling {url}: {e}")
+            return None, cursor
+
+        if newest is not None:
+            cursor["last_id"] = newest
+
+        changes = [
+            RepoChange(repo_id=event.get('project_id'), name=None, event=event.get('action_name'))
+            for event in events
+            if event.get('action_name') in CHANGE_ACTIONS and event.get('project_id')
+        ]
+        logger.debug(f"Event feed: {len(changes)} ref changes.")
+        return (changes if reached else None), cursor
+
+    def refresh_repo(self, repo: Repository):
+        if repo.id is None:
+            return None
+        try:
+            r = self.session.get(f"{self.api_url}/projects/{repo.id}", params={"statistics": "true"})
+            r.raise_for_status()
+            fresh = self._to_repository(r.json())
+        except Exception as e:
+            logger.debug(f"[{repo.name}] Could not refresh repository: {e}")
+            return None
+        return replace(repo, pushed_at=fresh.pushed_at, size=fresh.size)
+
+    @traced("api")
     def prepare_push(self, repo: Repository):
         """
         Ensures the default branch is configured to allow force pushes (required for mirroring).
@@ -53,9 +126,11 @@ class GitLabProvider(Provider):
         # The 'repo' object comes from the source usually.
         # We need to find the project on GitLab that matches the destination path.
         
-        project_path = repo.name
-        if self.namespace:
-            project_path = f"{self.namespace}/{repo.name}"
+        project_path = self._project_path(repo)
+        # The destination mirrors the source, so the source's default branch is the one to verify
+        if self._protection.is_fresh(project_path, repo.default_branch):
+            logger.debug(f"[{repo.name}] Branch protection recently verified, skipping check.")
+            return
             
         # URL encode path
         encoded_path = project_path.replace("/", "%2F")
@@ -65,23 +140,23 @@ class GitLabProvider(Provider):
         base_url = base_url.rstrip('/')
         
         api_base = f"{base_url}/api/v4"
-        headers = {'Private-Token': self.token}
         
         try:
             logger.debug(f"[{repo.name}] Checking branch protection for '{project_path}'...")
             
             # Fetch Project
-            r = requests.get(f"{api_base}/projects/{encoded_path}", headers=headers, timeout=10)
+            r = self.session.get(f"{api_base}/projects/{encoded_path}", timeout=PROTECTION_TIMEOUT)
             if r.status_code == 404:
                 return # Project likely doesn't exist yet, so no protection to worry about
             r.raise_for_status()
             project_data = r.json()
             project_id = project_data['id']
-            default_branch = project_data.get('default_branch', 'main')
+            # Verify (and cache) the branch the mirror pushes, so is_fresh() above checks the same one
+            default_branch = repo.default_branch or project_data.get('default_branch', 'main')
             
             # 2. Check Protection Rules
             # GET /projects/:id/protected_branches/:name
-            r_prot = requests.get(f"{api_base}/projects/{project_id}/protected_branches/{default_branch}", headers=headers, timeout=10)
+            r_prot = self.session.get(f"{api_base}/projects/{project_id}/protected_branches/{default_branch}", timeout=PROTECTION_TIMEOUT)
             
             needs_update = False
             if r_prot.status_code == 200:
@@ -90,9 +165,11 @@ class GitLabProvider(Provider):
                 if not prot_data.get('allow_force_push', False):
                     needs_update = True
                     logger.info(f"[{repo.name}] Branch '{default_branch}' is protected. Enabling force push...")
+                else:
+                    self._protection.remember(project_path, default_branch)
             elif r_prot.status_code == 404:
                  # Not protected, so we are good (assuming default is not protected, or if it is, it might be implicitly handled by strict defaults but usually explicit rule exists)
-                 pass
+                 self._protection.remember(project_path, default_branch)
             
             # 3. Update Protection if needed
             if needs_update:
@@ -103,7 +180,7 @@ class GitLabProvider(Provider):
                 # Check if PATCH is supported or if we need to blindly recreate.
                 # simpler to just update.
                 payload = {'allow_force_push': True}
-                r_patch = requests.patch(f"{api_base}/projects/{project_id}/protected_branches/{default_branch}", headers=headers, json=payload, timeout=10)
+                r_patch = self.session.patch(f"{api_base}/projects/{project_id}/protected_branches/{default_branch}", json=payload, timeout=PROTECTION_TIMEOUT)
                 
                 if r_patch.status_code == 405 or r_patch.status_code == 404:
                     # Fallback: Unprotect and Protect (Old way or if PATCH fails)
@@ -113,10 +190,20 @@ class GitLabProvider(Provider):
                 else:
                     r_patch.raise_for_status()
                     logger.info(f"[{repo.name}] Successfully enabled force push for '{default_branch}'.")
+                    self._protection.remember(project_path, default_branch)
 
         except Exception as e:
             logger.warning(f"[{repo.name}] Failed to update branch protection (ignoring): {e}")
 
+    def invalidate_protection(self, repo: Repository):
+        self._protection.invalidate(self._project_path(repo))
+
+    def _project_path(self, repo: Repository) -> str:
+        """Path of the destination project, including the namespace if one is configured."""
+        if self.namespace:
+            return f"{self.namespace}/{repo.name}"
+        return repo.name
+
     def get_remote_url(self, repo: Repository) -> str:
         """
         Constructs the authenticated URL for pushing to GitLab.
@@ -161,43 +248,110 @@ class GitLabProvider(Provider):
         return Repository(
             name=item['path'], # Use path (slug) as name
             clone_url=item['http_url_to_repo'],
-            size=0, # Simple objects might not have stats, default to 0
-            pushed_at=pushed_at
+            size=(item.get('statistics') or {}).get('repository_size', 0) // 1024,  # bytes -> KB
+            pushed_at=pushed_at,
+            default_branch=item.get('default_branch'),
+            id=item.get('id'),
+            # Not part of `simple=true` listings, which is why the full representation is requested
+            fork_parent=(item.get('forked_from_project') or {}).get('path_with_namespace'),
+            fork=bool(item.get('forked_from_project'))
         )
 
+    @traced("api", record=("context_name",))
     def _get_all_pages(self, base_url, headers, context_name, query_params=None):
-        """Helper to fetch all pages from a GitLab endpoint."""
+        """
+        Helper to fetch all pages from a GitLab endpoint.
+        If the first page reports `X-Total-Pages`, the remaining pages are fetched concurrently.
+        GitLab omits that header for very large result sets, in which case pages are walked
+        one by one until a short page. Items are always returned in page order.
+        """
         if query_params is None:
             query_params = {}
 
         items = []
-        page = 1
         query_params['per_page'] = 100
         
         logger.debug(f"Fetching {context_name}...")
-        
+
+        try:
+            data, r = self._get_page(base_url, headers, query_params, 1)
+        except Exception as e:
+            logger.error(f"ERROR fetching {context_name}: {e}")
+            raise ListingError(f"{context_name}: {e}") from e
+
+        if not data:
+            return items
+        items.extend(data)
+        if len(data) < query_params['per_page']:
+            return items
+
+        # A 304 may not repeat X-Total-Pages: fall back to the count cached with the page
+        total_pages = self._total_pages(r) or self._validators.page_count(base_url, {**query_params, 'page': 1})
+        if total_pages:
+            pages = range(2, total_pages + 1)
+            logger.debug(f"Fetching pages 2-{total_pages} of {context_name} concurrently...")
+            with ThreadPoolExecutor(max_workers=max(1, min(self.page_concurrency, len(pages)))) as executor:
+                futures = [executor.submit(self._get_page, base_url, headers, query_params, page) for page in pages]
+                for future in futures:
+                    try:
+                        data, _ = future.result()
+                    except Exception as e:
+                        logger.error(f"ERROR fetching {context_name}: {e}")
+                        for pending in futures:
+                            pending.cancel()
+                        raise ListingError(f"{context_name}: {e}") from e
+                    items.extend(data or [])
+            return items
+
+        page = 2
         while True:
             try:
-                query_params['page'] = page
-                
-                logger.debug(f"Requesting page {page} from {base_url}...")
-
-                r = requests.get(base_url, headers=headers, params=query_params, timeout=20)
-                r.raise_for_status()
-                
-                data = r.json()
+                data, _ = self._get_page(base_url, headers, query_params, page)
                 if not data:
                     break
                 
-                count = len(data)
                 items.extend(data)
                 
-                # Check for pagination headers usually, but length check is robust enough for simple cases
-                if count < query_params['per_page']:
+                if len(data) < query_params['per_page']:
                      break
                 
                 page += 1
             except Exception as e:
                 logger.error(f"ERROR fetching {context_name}: {e}")
-                break
+                raise ListingError(f"{context_name}: {e}") from e
         return items
+
+    def _get_page(self, base_url, headers, query_params, page):
+        """Fetches a single page. Returns: (items, response)."""
+        # Each page gets its own params, so pages can be fetched from several threads
+        params = {**query_params, 'page': page}
+
+        logger.debug(f"Requesting page {page} from {base_url}...")
+
+        request_headers = {**headers, **self._validators.conditional_headers(base_url, params)}
+        r = self.session.get(base_url, headers=request_headers, params=params)
+
+        data = None
+        if r.status_code == 304:
+            data = self._validators.cached(base_url, params)
+            if data is None:
+                # Nothing to serve it from: an empty page here would end the listing early
+                logger.debug(f"Page {page} not modified but not cached, requesting it again.")
+                r = self.session.get(base_url, headers=headers, params=params)
+                if r.status_code == 304:
+                    raise RuntimeError(f"{base_url} page {page}: 304 Not Modified to an unconditional request")
+            else:
+                logger.debug(f"Page {page} not modified, using cached copy.")
+
+        if data is None:
+            r.raise_for_status()
+            data = r.json()
+            self._validators.store(base_url, params, r, data, page_count=self._total_pages(r))
+        return data, r
+
+    def _total_pages(self, response):
+        """Reads the page count from the `X-Total-Pages` header. Returns None if unknown."""
+        try:
+            return int(response.headers['X-Total-Pages'])
+        except (KeyError, TypeError, ValueError):
+            return None
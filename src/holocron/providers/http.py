@@ -0,0 +1,145 @@
+import threading
+import requests
+from typing import Optional
+from requests.adapters import HTTPAdapter
+from ..metrics import API_REQUESTS
+
+# Number of pages of a single listing fetched in parallel, once the page count is known
+DEFAULT_PAGE_CONCURRENCY = 4
+# Number of GitHub organizations listed in parallel
+DEFAULT_ORG_CONCURRENCY = 4
+# Keep-alive connections kept per host, sized to --concurrency by default
+DEFAULT_POOL_SIZE = 5
+# Seconds, applied to every request that does not set its own
+DEFAULT_TIMEOUT = 20
+# Seconds for the branch protection calls of prepare_push, which sit on the push path
+PROTECTION_TIMEOUT = 10
+
+class PooledSession(requests.Session):
+    """
+    A requests.Session with a keep-alive connection pool sized for `pool_size` concurrent
+    callers, plus default headers and a default timeout, all set once.
+    The underlying urllib3 pool is thread-safe, so one session is shared by all worker threads.
+    """
+
+    def __init__(self, headers=None, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, governor=None, name=None):
+        super().__init__()
+        self.timeout = timeout
+        # Optional RateLimitGovernor: paces requests and retries transient failures
+        self.governor = governor
+        # Label of the provider in the API request metrics
+        self.name = name or (governor.name if governor else "http")
+        if headers:
+            self.headers.update(headers)
+
+        # pool_block=False: a burst above pool_size opens extra (short-lived) connections instead of waiting
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size), pool_block=False)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        if self.governor is None:
+            return self._send(method, url, **kwargs)
+
+        attempt = 0
+        while True:
+            self.governor.wait()
+            try:
+                response = self._send(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.governor.max_retries:
+                    raise
+                self.governor.retry(attempt, f"{method} {url} failed: {e}")
+                attempt += 1
+                continue
+
+            self.governor.observe(response)
+            if not self.governor.should_retry(response, attempt):
+                return response
+            self.governor.retry(attempt, f"{method} {url} returned {response.status_code}")
+            attempt += 1
+
+    def _send(self, method, url, **kwargs):
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.RequestException:
+            API_REQUESTS.inc(provider=self.name, status="error")
+            raise
+        API_REQUESTS.inc(provider=self.name, status=response.status_code)
+        return response
+
+    def connection_stats(self) -> dict:
+        """Returns how many connections were opened and how many requests reused one."""
+        opened = 0
+        requests_sent = 0
+        for adapter in set(self.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                opened += pool.num_connections
+                requests_sent += pool.num_requests
+        return {"opened": opened, "reused": max(0, requests_sent - opened)}
+
+class ValidatorCache:
+    """
+    Remembers HTTP validators (ETag / Last-Modified) and the parsed body of a response,
+    keyed by URL + query params, so listings can be re-fetched with conditional requests.
+    A `304 Not Modified` answer can then be served from the cached copy, along with the
+    page count the response advertised (which a 304 does not necessarily repeat).
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url, params):
+        return (url, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+
+    def conditional_headers(self, url, params=None) -> dict:
+        """Returns the If-None-Match / If-Modified-Since headers for a cached response."""
+        with self._lock:
+            entry = self._entries.get(self._key(url, params))
+        if not entry:
+            return {}
+
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, params, response, data, page_count=None):
+        """Stores the validators, parsed body and page count of a 200 response (if it carries any validators)."""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        with self._lock:
+            self._entries[self._key(url, params)] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'data': data,
+                'page_count': page_count
+            }
+
+    def cached(self, url, params=None) -> Optional[list]:
+        """Returns the parsed body stored for a URL, or None."""
+        with self._lock:
+            entry = self._entries.get(self._key(url, params))
+        return entry['data'] if entry else None
+
+    def page_count(self, url, params=None) -> Optional[int]:
+        """Returns the page count stored for a URL, or None."""
+        with self._lock:
+            entry = self._entries.get(self._key(url, params))
+        return entry['page_count'] if entry else None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,157 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from ..logger import logger
+from ..metrics import API_BUDGET, API_RETRIES
+
+# Statuses worth retrying: rate limited, or a transient server/proxy error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class RateLimitGovernor:
+    """
+    Tracks the API budget a server reports and paces requests to stay under it.
+
+    Understands GitHub (`X-RateLimit-Limit/Remaining/Reset`) and GitLab
+    (`RateLimit-Limit/Remaining/Reset`, `Retry-After`) headers. Reset values are epoch seconds.
+    Shared by all threads using a provider's session.
+    """
+
+    def __init__(self, name, reserve=10, pace_below=0.1, max_retries=3, base_delay=1.0, max_delay=60.0, sleep=time.sleep, clock=time.time):
+        self.name = name
+        self.reserve = reserve  # requests kept back, e.g. for a manual `curl` while the daemon runs
+        self.pace_below = pace_below  # start spacing requests below this fraction of the limit
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self._blocked_until = 0.0
+        self._next_slot = 0.0
+        self.retries = 0
+
+    def wait(self):
+        """Blocks until the next request fits in the budget."""
+        with self._lock:
+            now = self._clock()
+            delay = 0.0
+
+            if self._blocked_until > now:
+                delay = self._blocked_until - now
+            elif self.remaining is not None and self.reset_at and self.reset_at > now:
+                if self.remaining <= self.reserve:
+                    # Budget exhausted: nothing to do but wait for the window to reset
+                    delay = self.reset_at - now
+                elif self.limit and self.remaining < self.limit * self.pace_below:
+                    # Budget low: spread what is left evenly over the rest of the window
+                    interval = (self.reset_at - now) / (self.remaining - self.reserve)
+                    slot = max(now, self._next_slot)
+                    self._next_slot = slot + interval
+                    delay = slot - now
+                # Count this request against the budget until the response tells us otherwise
+                self.remaining -= 1
+
+        if delay > 0:
+            logger.debug(f"[{self.name}] Rate limit pacing: waiting {delay:.1f}s")
+            self._sleep(delay)
+
+    def observe(self, response):
+        """Updates the budget from a response's headers."""
+        headers = response.headers
+        limit = _int_header(headers, 'X-RateLimit-Limit', 'RateLimit-Limit')
+        remaining = _int_header(headers, 'X-RateLimit-Remaining', 'RateLimit-Remaining')
+        reset_at = _int_header(headers, 'X-RateLimit-Reset', 'RateLimit-Reset')
+
+        with self._lock:
+            if limit is not None:
+                self.limit = limit
+            if remaining is not None:
+                self.remaining = remaining
+            if reset_at is not None:
+                self.reset_at = float(reset_at)
+            if self.limit is not None:
+                API_BUDGET.set(self.limit, provider=self.name, kind="limit")
+            if self.remaining is not None:
+                API_BUDGET.set(self.remaining, provider=self.name, kind="remaining")
+
+            if self.is_rate_limited(response):
+                retry_after = _retry_after(headers, self._clock())
+                if retry_after is not None:
+                    until = self._clock() + retry_after
+                elif self.reset_at:
+                    until = self.reset_at
+                else:
+                    until = self._clock() + self.base_delay
+                self._blocked_until = max(self._blocked_until, until)
+
+    def is_rate_limited(self, response):
+        """429, or GitHub's 403 with an exhausted budget / secondary rate limit."""
+        if response.status_code == 429:
+            return True
+        if response.status_code == 403:
+            return (
+                _int_header(response.headers, 'X-RateLimit-Remaining', 'RateLimit-Remaining') == 0
+                or 'Retry-After' in response.headers
+            )
+        return False
+
+    def should_retry(self, response, attempt):
+        if attempt >= self.max_retries:
+            return False
+        return response.status_code in RETRY_STATUSES or self.is_rate_limited(response)
+
+    def backoff(self, attempt):
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def retry(self, attempt, reason):
+        """Sleeps before retry `attempt` (0-based). Rate-limit waits are handled by the next wait()."""
+        API_RETRIES.inc(provider=self.name)
+        with self._lock:
+            self.retries += 1
+            blocked = self._blocked_until > self._clock()
+        if blocked:
+            logger.warning(f"[{self.name}] Rate limited ({reason}), retrying once the limit resets...")
+            return
+        delay = self.backoff(attempt)
+        logger.warning(f"[{self.name}] {reason}, retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+        self._sleep(delay)
+
+    def status(self) -> dict:
+        """Returns the last known budget."""
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "remaining": self.remaining,
+                "reset_at": self.reset_at,
+                "retries": self.retries
+            }
+
+def _int_header(headers, *names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+def _retry_after(headers, now):
+    """Parses `Retry-After` (seconds or an HTTP date) into seconds from now."""
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,70 @@
+import os
+import hashlib
+
+def read_local_refs(repo_dir) -> dict[str, str]:
+    """
+    Reads the refs of a local (bare) repository straight from disk.
+    Loose refs under `refs/` take precedence over `packed-refs`.
+    Returns: A dict of {refname: sha}. Empty if the repository does not exist.
+    """
+    refs = {}
+
+    packed_path = os.path.join(repo_dir, "packed-refs")
+    try:
+        with open(packed_path) as f:
+            for line in f:
+                line = line.strip()
+                # Skip the header ("# pack-refs with: ...") and peeled tag lines ("^sha")
+                if not line or line.startswith("#") or line.startswith("^"):
+                    continue
+                sha, _, refname = line.partition(" ")
+                if refname:
+                    refs[refname] = sha
+    except OSError:
+        pass
+
+    refs_root = os.path.join(repo_dir, "refs")
+    for dirpath, _, filenames in os.walk(refs_root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                with open(path) as f:
+                    value = f.read().strip()
+            except OSError:
+                continue
+            # Symbolic refs ("ref: refs/heads/main") are not tips
+            if not value or value.startswith("ref:"):
+                continue
+            refname = os.path.relpath(path, repo_dir).replace(os.sep, "/")
+            refs[refname] = value
+
+    return refs
+
+def refs_digest(refs: dict[str, str]) -> str:
+    """Returns a stable fingerprint of a set of ref tips."""
+    h = hashlib.sha1()
+    for refname in sorted(refs):
+        h.update(f"{refs[refname]} {refname}\n".encode())
+    return h.hexdigest()
+
+def parse_ls_remote(output: str) -> dict[str, str]:
+    """
+    Parses `git ls-remote` output into {refname: sha}.
+    HEAD and peeled tag entries (`^{}`) are dropped, since a mirror stores neither as refs.
+    """
+    refs = {}
+    for line in output.splitlines():
+        sha, _, refname = line.strip().partition("\t")
+        if not refname.startswith("refs/") or refname.endswith("^{}"):
+            continue
+        refs[refname] = sha
+    return refs
+
+def diff_refs(before: dict[str, str], after: dict[str, str]):
+    """
+    Compares two ref snapshots.
+    Returns: (updated, deleted) - {refname: sha} of new/moved refs, and a sorted list of removed refnames.
+    """
+    updated = {ref: sha for ref, sha in after.items() if before.get(ref) != sha}
+    deleted = sorted(ref for ref in before if ref not in after)
+    return updated, deleted
@@ -0,0 +1,71 @@
+import os
+import heapq
+from dataclasses import dataclass
+from .logger import logger
+
+# Cost model defaults, used until a repository has a sync duration of its own
+BASE_COST = 2.0  # seconds: process spawns, TLS handshakes, API calls
+CLONE_THROUGHPUT = 5 * 1024  # KB per second for an initial clone
+
+@dataclass
+class Job:
+    """A repository to sync, with its predicted duration in seconds."""
+    repo: object
+    cost: float
+
+@dataclass
+class Plan:
+    """Dispatch order for one cycle and the makespan it is expected to take."""
+    jobs: list
+    makespan: float
+
+def predict_cost(repo, last_state=None, mirror_exists=True) -> float:
+    """
+    Predicts how long syncing `repo` takes.
+    - No local mirror yet: a full clone, proportional to the repository size.
+    - Otherwise: the duration of the previous sync, if we have one.
+    """
+    if not mirror_exists:
+        return BASE_COST + (repo.size or 0) / CLONE_THROUGHPUT
+    if last_state and last_state.duration is not None:
+        return last_state.duration
+    return BASE_COST
+
+def predict_makespan(costs, workers) -> float:
+    """Simulates dispatching `costs` in order to `workers` parallel workers."""
+    finish_times = [0.0] * max(1, workers)
+    for cost in costs:
+        # The next job goes to whichever worker frees up first
+        heapq.heapreplace(finish_times, finish_times[0] + cost)
+    return max(finish_times)
+
+def plan_cycle(repos, known, storage_path, workers) -> Plan:
+    """
+    Orders the repositories of a cycle longest-expected-first (LPT), so a large
+    repository never starts last and stretches the whole cycle.
+    """
+    jobs = [
+        Job(
+            repo=repo,
+            cost=predict_cost(
+                repo,
+                known.get(repo.name),
+                mirror_exists=os.path.exists(os.path.join(storage_path, f"{repo.name}.git"))
+            )
+        )
+        for repo in repos
+    ]
+    jobs.sort(key=lambda job: job.cost, reverse=True)
+    return Plan(jobs=jobs, makespan=predict_makespan([job.cost for job in jobs], workers))
+
+def check_deadline(plan: Plan, interval):
+    """Warns if the cycle is not expected to finish within the watch interval."""
+    if not plan.jobs:
+        return
+    logger.debug(f"Scheduled {len(plan.jobs)} repositories, predicted makespan {plan.makespan:.1f}s.")
+    if interval and plan.makespan > interval:
+        slowest = plan.jobs[0]
+        logger.warning(
+            f"Cycle is predicted to take {plan.makespan:.0f}s, longer than the {interval}s interval "
+            f"(largest job: '{slowest.repo.name}', ~{slowest.cost:.0f}s)."
+        )
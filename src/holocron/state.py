@@ -0,0 +1,219 @@
+import os
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from .logger import logger
+
+# Holocron keeps its own bookkeeping next to the mirrors, under <storage>/.holocron
+STATE_DIRNAME = ".holocron"
+STATE_FILENAME = "state.db"
+# Storage usage samples kept for growth projections
+DISK_SAMPLE_RETENTION_DAYS = 30
+
+@dataclass
+class RepoState:
+    """Last known sync state of a repository."""
+    name: str
+    pushed_at: Optional[datetime] = None
+    source_tip: Optional[str] = None
+    destination_tip: Optional[str] = None
+    duration: Optional[float] = None  # in seconds
+    error: Optional[str] = None
+    synced_at: Optional[datetime] = None
+
+def default_state_path(storage_path):
+    """Returns the location of the state database for a storage directory."""
+    return os.path.join(storage_path, STATE_DIRNAME, STATE_FILENAME)
+
+def _to_text(value: Optional[datetime]):
+    return value.isoformat() if value else None
+
+def _to_datetime(value: Optional[str]):
+    return datetime.fromisoformat(value) if value else None
+
+class StateStore:
+    """
+    Durable per-repository sync state, backed by SQLite.
+    Safe to share between threads; every update is its own transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS repos (
+                    name TEXT PRIMARY KEY,
+                    pushed_at TEXT,
+                    source_tip TEXT,
+                    destination_tip TEXT,
+                    duration REAL,
+                    error TEXT,
+                    synced_at TEXT
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS maintenance (
+                    name TEXT PRIMARY KEY,
+                    maintained_at TEXT,
+                    reclaimed INTEGER,
+                    duration REAL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS disk_samples (
+                    taken_at TEXT PRIMARY KEY,
+                    used INTEGER
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cursors (
+                    name TEXT PRIMARY KEY,
+                    value TEXT
+                )
+                """
+            )
+        logger.debug(f"Using sync state at {path}")
+
+    def load(self) -> dict[str, RepoState]:
+        """Returns the state of all known repositories, keyed by name."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, pushed_at, source_tip, destination_tip, duration, error, synced_at FROM repos"
+            ).fetchall()
+        return {row[0]: self._to_state(row) for row in rows}
+
+    def get(self, name) -> Optional[RepoState]:
+        """Returns the state of a single repository, or None if it was never synced."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, pushed_at, source_tip, destination_tip, duration, error, synced_at FROM repos WHERE name = ?",
+                (name,)
+            ).fetchone()
+        return self._to_state(row) if row else None
+
+    def record_success(self, name, pushed_at=None, source_tip=None, destination_tip=None, duration=None):
+        """Records a successful sync. Clears any previous error."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO repos (name, pushed_at, source_tip, destination_tip, duration, error, synced_at)
+                VALUES (?, ?, ?, ?, ?, NULL, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    pushed_at = excluded.pushed_at,
+                    source_tip = excluded.source_tip,
+                    destination_tip = COALESCE(excluded.destination_tip, repos.destination_tip),
+                    duration = excluded.duration,
+                    error = NULL,
+                    synced_at = excluded.synced_at
+                """,
+                (name, _to_text(pushed_at), source_tip, destination_tip, duration, _to_text(self._now()))
+            )
+
+    def record_failure(self, name, error, duration=None):
+        """
+        Records a failed sync.
+        The last synced `pushed_at` is kept as-is so the repository is retried next cycle.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO repos (name, duration, error, synced_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    duration = COALESCE(excluded.duration, repos.duration),
+                    error = excluded.error,
+                    synced_at = excluded.synced_at
+                """,
+                (name, duration, error, _to_text(self._now()))
+            )
+
+    def last_maintenance(self) -> dict[str, datetime]:
+        """Returns when each repository's mirror was last maintained, keyed by name."""
+        with self._lock:
+            rows = self._conn.execute("SELECT name, maintained_at FROM maintenance").fetchall()
+        return {name: _to_datetime(maintained_at) for name, maintained_at in rows}
+
+    def record_maintenance(self, name, reclaimed, duration):
+        """Records a maintenance run: bytes reclaimed (may be negative) and seconds spent."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO maintenance (name, maintained_at, reclaimed, duration) VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    maintained_at = excluded.maintained_at,
+                    reclaimed = excluded.reclaimed,
+                    duration = excluded.duration
+                """,
+                (name, _to_text(self._now()), reclaimed, duration)
+            )
+
+    def record_disk_sample(self, taken_at: datetime, used: int):
+        """Records the bytes used under --storage at a point in time. Samples older than 30 days are dropped."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO disk_samples (taken_at, used) VALUES (?, ?)",
+                (_to_text(taken_at), used)
+            )
+            self._conn.execute(
+                "DELETE FROM disk_samples WHERE taken_at < ?",
+                (_to_text(taken_at - timedelta(days=DISK_SAMPLE_RETENTION_DAYS)),)
+            )
+
+    def disk_samples(self, since: datetime) -> list:
+        """Returns [(taken_at, used bytes)] since a point in time, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT taken_at, used FROM disk_samples WHERE taken_at >= ? ORDER BY taken_at",
+                (_to_text(since),)
+            ).fetchall()
+        return [(_to_datetime(taken_at), used) for taken_at, used in rows]
+
+    def get_cursor(self, name) -> Optional[dict]:
+        """Returns a stored change feed cursor, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cursors WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_cursor(self, name, value: dict):
+        """Stores a change feed cursor (any JSON-serializable dict)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO cursors (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (name, json.dumps(value, sort_keys=True))
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _now(self):
+        # Naive UTC, same convention as Repository.pushed_at
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def _to_state(self, row) -> RepoState:
+        return RepoState(
+            name=row[0],
+            pushed_at=_to_datetime(row[1]),
+            source_tip=row[2],
+            destination_tip=row[3],
+            duration=row[4],
+            error=row[5],
+            synced_at=_to_datetime(row[6])
+        )
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import inspect
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from .logger import logger
+
+# Spans kept per cycle; anything beyond is counted, not stored
+MAX_SPANS = 200_000
+
+# The active Tracer, or None (tracing off: spans cost one global lookup)
+_tracer = None
+
+# Overrides the thread id of spans, e.g. one lane per asyncio worker slot
+_lane = contextvars.ContextVar("holocron_trace_lane", default=None)
+
+class Tracer:
+    """
+    Collects spans (name, category, start, duration, thread, args) and writes them as
+    Chrome trace-event JSON, which chrome://tracing and https://ui.perfetto.dev open as a timeline.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._origin = clock()
+        self._lock = threading.Lock()
+        self._spans = []
+        self._threads = {}  # tid -> name
+        self.dropped = 0
+
+    def record(self, name, cat, start, end, args=None):
+        lane = _lane.get()
+        if lane is not None:
+            tid, thread_name = lane
+        else:
+            tid, thread_name = threading.get_ident(), threading.current_thread().name
+        span = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round((start - self._origin) * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": tid,
+        }
+        if args:
+            span["args"] = args
+        with self._lock:
+            self._threads.setdefault(tid, thread_name)
+            if len(self._spans) >= MAX_SPANS:
+                self.dropped += 1
+                return
+            self._spans.append(span)
+
+    def events(self) -> list:
+        """The trace events: thread-name metadata, then the spans by start time."""
+        with self._lock:
+            spans = sorted(self._spans, key=lambda span: span["ts"])
+            threads = dict(self._threads)
+        pid = os.getpid()
+        meta = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}} for tid, name in threads.items()]
+        return meta + spans
+
+    def reset(self):
+        with self._lock:
+            self._spans = []
+            self._threads = {}
+            self.dropped = 0
+
+    def dump(self, directory, label="cycle") -> str:
+        """
+        Writes the spans collected so far to `<directory>/<label>-<UTC time>.json` and starts over.
+        Returns: The path written.
+        """
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%fZ")
+        path = os.path.join(directory, f"{label}-{stamp}.json")
+        events = self.events()
+        if self.dropped:
+            logger.warning(f"Trace: {self.dropped} spans dropped (more than {MAX_SPANS} in one {label}).")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+        os.replace(tmp, path)
+        self.reset()
+        logger.debug(f"Trace: wrote {len(events)} events to {path}")
+        return path
+
+    def now(self):
+        return self._clock()
+
+def set_tracer(tracer):
+    """Installs the Tracer every span() reports to (None turns tracing off)."""
+    global _tracer
+    _tracer = tracer
+
+@contextmanager
+def span(name, cat="sync", **args):
+    """Records the block as one span, if tracing is on."""
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+    start = tracer.now()
+    try:
+        yield
+    finally:
+        tracer.record(name, cat, start, tracer.now(), args)
+
+@contextmanager
+def lane(tid, name):
+    """Spans recorded in this context show up on their own timeline row (`tid`)."""
+    token = _lane.set((tid, name))
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+def traced(cat="sync", record=("repo",)):
+    """
+    Decorator recording each call as a span named after the function.
+    The arguments named in `record` become span args (a Repository as its name).
+    Works on plain and async functions, and on generators (the span covers the whole run).
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def span_args(args, kwargs):
+            try:
+                bound = signature.bind_partial(*args, **kwargs).arguments
+            except TypeError:
+                return {}
+            return {key: getattr(bound[key], "name", bound[key]) for key in record if key in bound}
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _tracer is None:
+                    return await func(*args, **kwargs)
+                with span(func.__name__, cat, **span_args(args, kwargs)):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if _tracer is None:
+                    return (yield from func(*args, **kwargs))
+                with span(func.__name__, cat, **span_args(args, kwargs)):
+                    return (yield from func(*args, **kwargs))
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with span(func.__name__, cat, **span_args(args, kwargs)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
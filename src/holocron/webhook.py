@@ -0,0 +1,278 @@
+import hmac
+import json
+import time
+import hashlib
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from .logger import logger
+from .providers.base import Repository, RepoChange
+
+# Seconds to wait after the last event for a repository before syncing it
+DEFAULT_COALESCE_DELAY = 5.0
+# Largest payload accepted (GitHub caps deliveries at 25 MB)
+MAX_PAYLOAD_BYTES = 25 * 1024 * 1024
+
+GITHUB_EVENTS = {"push", "create", "delete"}
+GITLAB_EVENTS = {"Push Hook", "Tag Push Hook"}
+
+def verify_github_signature(secret, body: bytes, signature) -> bool:
+    """Checks GitHub's `X-Hub-Signature-256: sha256=<hmac>` header."""
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+def verify_gitlab_token(secret, token) -> bool:
+    """Checks GitLab's `X-Gitlab-Token` header (a shared secret, not a signature)."""
+    return bool(token) and hmac.compare_digest(secret, token)
+
+def parse_event(headers, payload: dict) -> Optional[RepoChange]:
+    """
+    Turns a GitHub push/create/delete or GitLab push hook payload into the change it reports.
+    Only the repository's name and ID are taken: the payload is a signal, never a source of
+    URLs or paths (see find_repository).
+    Returns: None for events that do not change refs (e.g. `ping`).
+    """
+    github_event = headers.get("X-GitHub-Event")
+    if github_event:
+        if github_event not in GITHUB_EVENTS:
+            return None
+        repo = payload.get("repository") or {}
+        if not repo.get("name"):
+            raise ValueError("payload has no repository name")
+        return RepoChange(repo_id=repo.get("id"), name=_checked_name(repo["name"]), event=github_event)
+
+    gitlab_event = headers.get("X-Gitlab-Event")
+    if gitlab_event:
+        if gitlab_event not in GITLAB_EVENTS:
+            return None
+        project = payload.get("project") or {}
+        name = project.get("path") or (project.get("path_with_namespace") or "").rsplit("/", 1)[-1]
+        if not name:
+            raise ValueError("payload has no project path")
+        return RepoChange(repo_id=payload.get("project_id") or project.get("id"), name=_checked_name(name), event=gitlab_event)
+
+    raise ValueError("neither X-GitHub-Event nor X-Gitlab-Event is set")
+
+def _checked_name(name) -> str:
+    # Names end up in paths under --storage
+    if not isinstance(name, str) or "/" in name or "\\" in name or ".." in name or "\0" in name:
+        raise ValueError(f"invalid repository name: {name!r}")
+    return name
+
+class Inventory:
+    """
+    The source's repositories by name, as of the last listing. Webhook threads read it while
+    reconciliations update it: every update swaps in a new dict, so readers never iterate one
+    that is being modified.
+    """
+
+    def __init__(self):
+        self._repos = {}
+
+    def update(self, repos: dict):
+        self._repos = {**self._repos, **repos}
+
+    def get(self, name, default=None):
+        return self._repos.get(name, default)
+
+    def values(self):
+        return self._repos.values()
+
+    def __iter__(self):
+        return iter(self._repos)
+
+def find_repository(inventory: dict, change: RepoChange) -> Optional[Repository]:
+    """
+    The repository of `inventory` ({name: Repository}, as listed by the source) a change is about,
+    matched by ID, then by name. None if it is not listed (yet).
+    """
+    if change.repo_id is not None:
+        for repo in inventory.values():
+            if repo.id == change.repo_id:
+                return repo
+    return inventory.get(change.name)
+
+def is_loopback(host) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def check_exposure(host, secret):
+    """Refuses unauthenticated listeners reachable from other machines."""
+    if not secret and not is_loopback(host):
+        raise ValueError(f"--webhook-secret is required to listen for webhooks on {host} (only loopback addresses may go without)")
+
+class Coalescer:
+    """
+    Debounces sync requests per repository: a burst of events (e.g. a push of 20 tags)
+    becomes one sync, started `delay` seconds after the last event.
+    A repository is never synced twice at the same time; events arriving during
+    its sync schedule exactly one follow-up sync.
+    """
+
+    def __init__(self, handler, delay=DEFAULT_COALESCE_DELAY, workers=5, clock=time.monotonic):
+        self.handler = handler  # handler(repo), called on a worker thread
+        self.delay = delay
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="webhook-sync")
+        self._cond = threading.Condition()
+        self._pending = {}  # name -> (repo, due)
+        self._running = set()
+        self._dirty = {}  # name -> repo, events seen while the repository was syncing
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, name="webhook-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, repo):
+        """Schedules a sync of `repo`, merging it with any sync already scheduled."""
+        with self._cond:
+            if repo.name in self._running:
+                self._dirty[repo.name] = repo
+            else:
+                self._pending[repo.name] = (repo, self._clock() + self.delay)
+            self._cond.notify()
+
+    def idle(self) -> bool:
+        with self._cond:
+            return not self._pending and not self._running and not self._dirty
+
+    def wait_idle(self, timeout=None) -> bool:
+        """Blocks until nothing is scheduled or running. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._running or self._dirty:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 1.0)
+        return True
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def _dispatch(self):
+        with self._cond:
+            while not self._closed:
+                now = self._clock()
+                due = [name for name, (_, at) in self._pending.items() if at <= now]
+                for name in due:
+                    repo, _ = self._pending.pop(name)
+                    self._running.add(name)
+                    self._executor.submit(self._run, repo)
+
+                if self._pending:
+                    timeout = max(0.0, min(at for _, at in self._pending.values()) - now)
+                    self._cond.wait(min(timeout, 1.0))
+                else:
+                    self._cond.wait(1.0)
+
+    def _run(self, repo):
+        try:
+            self.handler(repo)
+        except Exception as e:
+            logger.error(f"[{repo.name}] Webhook-triggered sync failed: {e}")
+        finally:
+            with self._cond:
+                self._running.discard(repo.name)
+                follow_up = self._dirty.pop(repo.name, None)
+                if follow_up is not None:
+                    self._pending[repo.name] = (follow_up, self._clock() + self.delay)
+                self._cond.notify_all()
+
+class WebhookServer:
+    """
+    Receives GitHub and GitLab webhooks on `host:port` and hands the RepoChange of every
+    delivery that changed refs to `on_event(change)`.
+    Deliveries are authenticated with `secret` (GitHub: HMAC signature, GitLab: token),
+    which may only be left out on a loopback `host`.
+    """
+
+    def __init__(self, host, port, secret, on_event):
+        check_exposure(host, secret)
+        self.secret = secret
+        self.on_event = on_event
+        self.received = 0
+        self.rejected = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="webhook-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Listening for webhooks on port {self.port}...")
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def handle(self, headers, body: bytes):
+        """
+        Processes one delivery.
+        Returns: (HTTP status, message)
+        """
+        self.received += 1
+        if not self._authenticated(headers, body):
+            self.rejected += 1
+            return 401, "invalid signature or token"
+
+        try:
+            change = parse_event(headers, json.loads(body or b"{}"))
+        except ValueError as e:  # includes JSONDecodeError
+            return 400, f"bad payload: {e}"
+
+        if change is None:
+            return 202, "ignored"
+
+        logger.debug(f"[{change.name}] Webhook received.")
+        self.on_event(change)
+        return 202, "queued"
+
+    def _authenticated(self, headers, body) -> bool:
+        if not self.secret:
+            return True
+        if headers.get("X-GitHub-Event"):
+            return verify_github_signature(self.secret, body, headers.get("X-Hub-Signature-256"))
+        return verify_gitlab_token(self.secret, headers.get("X-Gitlab-Token"))
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_PAYLOAD_BYTES:
+                    self._reply(413, "payload too large")
+                    return
+                status, message = server.handle(self.headers, self.rfile.read(length))
+                self._reply(status, message)
+
+            def _reply(self, status, message):
+                body = message.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Webhook: {format % args}")
+
+        return Handler
@@ -0,0 +1,8 @@
+import subprocess
+
+def git(*args, cwd=None):
+    """Runs git for test fixtures, with a fixed identity and default branch. Returns: stdout."""
+    return subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", "-c", "init.defaultBranch=main", *args],
+        cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
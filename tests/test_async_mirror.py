@@ -0,0 +1,118 @@
+import asyncio
+import subprocess
+import pytest
+from unittest.mock import MagicMock, patch
+from holocron.__main__ import run_sync_cycle
+from holocron.async_mirror import run_git, run_plan, sync_all
+from holocron.mirror import Call, Git, create_job, sync_one_repo
+from holocron.providers.base import Repository
+from holocron.refs import read_local_refs
+from holocron.state import RepoState, StateStore
+from conftest import git
+
+@pytest.fixture
+def sources(tmp_path):
+    """Three source repositories with one commit each, plus an empty bare destination for each."""
+    repos = []
+    for name in ("alpha", "beta", "gamma"):
+        src = tmp_path / "src" / name
+        src.mkdir(parents=True)
+        git("init", "--quiet", cwd=src)
+        (src / "README.md").write_text(f"{name}\n")
+        git("add", ".", cwd=src)
+        git("commit", "--quiet", "-m", "initial", cwd=src)
+        git("init", "--quiet", "--bare", str(tmp_path / "dest" / f"{name}.git"))
+        repos.append(Repository(name=name, clone_url=str(src)))
+    return repos
+
+def _providers(tmp_path):
+    source_provider = MagicMock()
+    source_provider.get_remote_url.side_effect = lambda repo: repo.clone_url
+    destination_provider = MagicMock()
+    destination_provider.get_remote_url.side_effect = lambda repo: str(tmp_path / "dest" / f"{repo.name}.git")
+    return source_provider, destination_provider
+
+def test_run_git_raises_called_process_error():
+    with pytest.raises(subprocess.CalledProcessError) as e:
+        asyncio.run(run_git(["git", "rev-parse", "--verify", "no-such-ref"]))
+    assert e.value.stderr.startswith("fatal")
+
+    assert "git version" in asyncio.run(run_git(["git", "--version"], capture=True))
+
+def test_async_engine_matches_threaded_engine(sources, tmp_path):
+    source_provider, destination_provider = _providers(tmp_path)
+    threaded_storage = str(tmp_path / "threaded")
+    async_storage = str(tmp_path / "async")
+
+    threaded = {
+        repo.name: sync_one_repo(repo, storage_path=threaded_storage, backup_only=True, source_provider=source_provider)
+        for repo in sources
+    }
+    jobs = [create_job(repo, async_storage, backup_only=True, source_provider=source_provider) for repo in sources]
+    outcomes = asyncio.run(sync_all(jobs, concurrency=2))
+
+    assert len(outcomes) == 3
+    for job, exc in outcomes:
+        assert exc is None and job.result.ok
+        assert job.result.source_tip == threaded[job.repo.name].source_tip
+
+    # Second round: the ref pre-check skips every fetch
+    jobs = [create_job(repo, async_storage, backup_only=True, source_provider=source_provider) for repo in sources]
+    outcomes = asyncio.run(sync_all(jobs, concurrency=2))
+    assert all(not job.result.fetched for job, _ in outcomes)
+
+def test_async_engine_incremental_push(sources, tmp_path):
+    source_provider, destination_provider = _providers(tmp_path)
+    storage = tmp_path / "mirror"
+    repo = sources[0]
+
+    job = create_job(repo, str(storage), source_provider=source_provider, destination_provider=destination_provider)
+    (job, exc), = asyncio.run(sync_all([job], concurrency=1))
+    assert exc is None and job.result.ok
+    first_tip = job.result.destination_tip
+
+    src = tmp_path / "src" / repo.name
+    (src / "README.md").write_text("changed\n")
+    git("commit", "--quiet", "-am", "change", cwd=src)
+
+    job = create_job(repo, str(storage), source_provider=source_provider, destination_provider=destination_provider,
+                     last_state=RepoState(name=repo.name, destination_tip=first_tip))
+    (job, exc), = asyncio.run(sync_all([job], concurrency=1))
+    assert job.result.ok and job.changes is not None
+    assert read_local_refs(str(tmp_path / "dest" / "alpha.git")) == read_local_refs(str(storage / "alpha.git"))
+    assert destination_provider.prepare_push.call_count == 2
+
+def test_run_plan_sends_results_and_errors():
+    def plan():
+        out = yield Git(["git", "--version"], capture=True)
+        total = yield Call(lambda a, b: a + b, 2, 3)
+        try:
+            yield Git(["git", "rev-parse", "--verify", "no-such-ref"])
+        except subprocess.CalledProcessError as e:
+            return out.startswith("git version"), total, bool(e.stderr)
+
+    assert asyncio.run(run_plan(plan())) == (True, 5, True)
+
+@patch("holocron.mirror.logger")
+def test_async_engine_records_git_failure(mock_logger, tmp_path):
+    source_provider = MagicMock()
+    source_provider.get_remote_url.return_value = str(tmp_path / "missing")
+    job = create_job(Repository(name="missing", clone_url="url"), str(tmp_path), backup_only=True, source_provider=source_provider)
+
+    (job, exc), = asyncio.run(sync_all([job], concurrency=1))
+
+    assert exc is None
+    assert not job.result.ok
+    assert job.result.duration is not None
+
+def test_run_sync_cycle_async_engine(sources, tmp_path):
+    source_provider, _ = _providers(tmp_path)
+    source_provider.fetch_repos.return_value = sources
+    config = {
+        "concurrency": 8, "storage": str(tmp_path / "mirror"), "watch": False, "window": 10, "interval": 60,
+        "backup_only": True, "dry_run": False, "checkout": False, "engine": "async"
+    }
+    state = StateStore(":memory:")
+
+    assert run_sync_cycle(config, source_provider, None, state) == 3
+    assert all(state.get(repo.name).source_tip for repo in sources)
@@ -0,0 +1,48 @@
+import os
+import sys
+import requests
+from holocron.logger import setup_logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from fake_api import FakeApi, repo_metadata  # noqa: E402
+import run as bench  # noqa: E402
+
+def test_fake_api_pages_and_rate_limits():
+    api = FakeApi("github", rate_limit=3, rate_window=60, page_size=2).start()
+    try:
+        for i in range(5):
+            api.repos[f"r{i}"] = repo_metadata(i, f"r{i}", f"file:///r{i}.git", 10)
+        first = requests.get(f"{api.url}/user/repos", params={"per_page": 100, "page": 1}, timeout=5)
+        assert [r["name"] for r in first.json()] == ["r0", "r1"]
+        assert first.links["last"]["url"].endswith("page=3")
+        assert first.headers["X-RateLimit-Remaining"] == "2"
+
+        requests.get(f"{api.url}/user/repos", timeout=5)
+        requests.get(f"{api.url}/user/repos", timeout=5)
+        throttled = requests.get(f"{api.url}/user/repos", timeout=5)
+        assert throttled.status_code == 403 and throttled.headers["X-RateLimit-Remaining"] == "0"
+        assert api.calls == 4 and api.throttled == 1
+    finally:
+        api.stop()
+
+def test_benchmark_cycles_over_http(tmp_path):
+    args = bench.parse_args(["--repos", "3", "--transport", "http", "--destination", "gitlab", "--commits", "2", "--churn", "0.5"])
+    try:
+        result = bench.run_size(args, 3, str(tmp_path))
+    finally:
+        setup_logger(verbose=False)
+
+    cycles = {cycle["cycle"]: cycle for cycle in result["cycles"]}
+    assert [c["cycle"] for c in result["cycles"]] == ["cold", "churn", "idle"]
+    assert all(c["synced"] == 3 for c in cycles.values())
+    assert cycles["churn"]["changed"] == 1 and cycles["idle"]["changed"] == 0
+    assert cycles["cold"]["api_calls"] > cycles["idle"]["api_calls"] > 0
+    assert cycles["cold"]["git_http_requests"] > 0
+    assert result["peak_rss_kb"] > 0
+
+def test_compare_flags_regressions():
+    baseline = {"results": [{"repos": 100, "cycles": [{"cycle": "cold", "makespan_s": 10.0}, {"cycle": "idle", "makespan_s": 1.0}]}]}
+    current = {"results": [{"repos": 100, "cycles": [{"cycle": "cold", "makespan_s": 11.0}, {"cycle": "idle", "makespan_s": 1.5}]}]}
+    rows = bench.compare(current, baseline, tolerance=0.2)
+    assert [(cycle, regressed) for _, cycle, _, _, _, regressed in rows] == [("cold", False), ("idle", True)]
@@ -0,0 +1,104 @@
+import os
+import pytest
+from unittest.mock import MagicMock
+from holocron.bundles import BundlePolicy, export_bundle, load_manifest
+from holocron.mirror import sync_one_repo
+from holocron.providers.base import Repository
+from holocron.refs import read_local_refs
+from conftest import git
+
+def _commit(src, text):
+    (src / "README.md").write_text(text)
+    git("add", ".", cwd=src)
+    git("commit", "--quiet", "-m", text, cwd=src)
+
+@pytest.fixture
+def mirror(tmp_path):
+    """A source repository with one commit, and a bare mirror of it. Returns (src, mirror_dir)."""
+    src = tmp_path / "src"
+    src.mkdir()
+    git("init", "--quiet", cwd=src)
+    _commit(src, "initial")
+    mirror_dir = tmp_path / "repo.git"
+    git("clone", "--mirror", "--quiet", str(src), str(mirror_dir))
+    return src, mirror_dir
+
+def _update(mirror_dir):
+    git("-C", str(mirror_dir), "fetch", "--quiet", "-p", "origin")
+
+def _restore(bundle_dir, target):
+    """Replays a bundle chain into a fresh repository."""
+    chain = [entry for entry in load_manifest(bundle_dir)["bundles"] if entry["file"]]
+    git("clone", "--mirror", "--quiet", str(bundle_dir / chain[0]["file"]), str(target))
+    for entry in chain[1:]:
+        git("-C", str(target), "fetch", "--quiet", str(bundle_dir / entry["file"]), "refs/*:refs/*")
+
+def test_full_then_incremental(mirror, tmp_path):
+    src, mirror_dir = mirror
+    policy = BundlePolicy(str(tmp_path / "bundles"))
+    bundle_dir = tmp_path / "bundles" / "repo"
+
+    first = export_bundle("repo", str(mirror_dir), policy)
+    assert first.endswith("000001-full.bundle")
+    # Nothing changed: nothing written
+    assert export_bundle("repo", str(mirror_dir), policy) is None
+
+    _commit(src, "second")
+    git("tag", "v1", cwd=src)
+    _update(mirror_dir)
+    second = export_bundle("repo", str(mirror_dir), policy)
+    assert second.endswith("000002-incremental.bundle")
+
+    # The incremental needs the full bundle's tip and holds only the new objects
+    heads = git("bundle", "list-heads", second)
+    assert "refs/heads/main" in heads and "refs/tags/v1" in heads
+    assert os.path.getsize(second) < os.path.getsize(first) + 200
+
+    restored = tmp_path / "restored.git"
+    _restore(bundle_dir, restored)
+    assert read_local_refs(str(restored)) == read_local_refs(str(mirror_dir))
+
+def test_deletion_only_entry(mirror, tmp_path):
+    src, mirror_dir = mirror
+    policy = BundlePolicy(str(tmp_path / "bundles"))
+    git("tag", "v1", cwd=src)
+    _update(mirror_dir)
+    export_bundle("repo", str(mirror_dir), policy)
+
+    git("tag", "-d", "v1", cwd=src)
+    _update(mirror_dir)
+    assert export_bundle("repo", str(mirror_dir), policy) is None
+
+    chain = load_manifest(tmp_path / "bundles" / "repo")["bundles"]
+    assert [entry["file"] for entry in chain] == ["000001-full.bundle", None]
+    assert chain[-1]["deleted"] == ["refs/tags/v1"]
+    assert chain[-1]["refs"] == read_local_refs(str(mirror_dir))
+
+def test_chain_is_consolidated(mirror, tmp_path):
+    src, mirror_dir = mirror
+    policy = BundlePolicy(str(tmp_path / "bundles"), chain_length=2)
+    bundle_dir = tmp_path / "bundles" / "repo"
+    export_bundle("repo", str(mirror_dir), policy)
+
+    for n in range(3):
+        _commit(src, f"change {n}")
+        _update(mirror_dir)
+        export_bundle("repo", str(mirror_dir), policy)
+
+    chain = load_manifest(bundle_dir)["bundles"]
+    assert [entry["type"] for entry in chain] == ["full"]
+    assert chain[0]["sequence"] == 4
+    assert sorted(os.listdir(bundle_dir)) == ["000004-full.bundle", "manifest.json"]
+
+def test_sync_writes_bundles(mirror, tmp_path):
+    src, _ = mirror
+    source_provider = MagicMock()
+    source_provider.get_remote_url.return_value = str(src)
+    policy = BundlePolicy(str(tmp_path / "bundles"))
+    repo = Repository(name="src", clone_url=str(src))
+
+    result = sync_one_repo(repo, storage_path=str(tmp_path / "storage"), backup_only=True,
+                           source_provider=source_provider, bundles=policy)
+
+    assert result.ok
+    assert os.path.exists(tmp_path / "bundles" / "src" / "000001-full.bundle")
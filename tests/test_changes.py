@@ -0,0 +1,223 @@
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+from holocron.changes import ChangeFeed
+from holocron.providers.base import Repository, RepoChange, ListingError
+from holocron.providers.github import GitHubProvider
+from holocron.providers.gitlab import GitLabProvider
+from holocron.state import StateStore
+
+def _response(data, status=200):
+    r = Mock()
+    r.status_code = status
+    r.headers = {}
+    r.json.return_value = data
+    r.raise_for_status.return_value = None
+    return r
+
+def _event(event_id, event_type="PushEvent", repo="someone/holocron", repo_id=1):
+    return {"id": str(event_id), "type": event_type, "repo": {"id": repo_id, "name": repo}}
+
+def _github_get(feeds):
+    """Routes Session.get by URL: /user, /user/orgs, then one event page per feed."""
+    def get(url, **kwargs):
+        if url.endswith("/user"):
+            return _response({"login": "someone"})
+        if url.endswith("/user/orgs"):
+            return _response([{"login": "acme"}])
+        return _response(feeds[url])
+    return get
+
+@patch("requests.Session.get")
+def test_github_fetch_changes(mock_get):
+    user_feed = "https://api.github.com/users/someone/events"
+    received_feed = "https://api.github.com/users/someone/received_events"
+    org_feed = "https://api.github.com/users/someone/events/orgs/acme"
+    mock_get.side_effect = _github_get({
+        user_feed: [_event(12), _event(11, "WatchEvent"), _event(10)],
+        received_feed: [_event(9)],
+        org_feed: [_event(7, "DeleteEvent", "acme/tools", 2), _event(5, "CreateEvent", "acme/tools", 2)],
+    })
+    provider = GitHubProvider(token="t")
+
+    # First poll: no cursor, so the feeds cannot vouch for completeness
+    changes, cursor = provider.fetch_changes(None)
+    assert changes is None
+    assert cursor == {user_feed: 12, received_feed: 9, org_feed: 7}
+
+    # Next poll: only events after the cursor, including a collaborator's push to a user-owned repository
+    mock_get.side_effect = _github_get({
+        user_feed: [_event(14, repo="someone/other", repo_id=3), _event(13, "IssuesEvent"), _event(12)],
+        received_feed: [_event(15, repo="someone/shared", repo_id=4), _event(9)],
+        org_feed: [_event(7, "DeleteEvent", "acme/tools", 2)],
+    })
+    changes, cursor = provider.fetch_changes(cursor)
+    assert changes == [
+        RepoChange(repo_id=3, name="other", event="PushEvent"),
+        RepoChange(repo_id=4, name="shared", event="PushEvent"),
+    ]
+    assert cursor == {user_feed: 14, received_feed: 15, org_feed: 7}
+
+@patch("requests.Session.get")
+def test_github_fetch_changes_gap(mock_get):
+    user_feed = "https://api.github.com/users/someone/events"
+    # Three full pages of new events and the cursor was never reached
+    pages = iter([[_event(1000 - n - page * 100) for n in range(100)] for page in range(3)])
+    mock_get.side_effect = lambda url, **kwargs: (
+        _response({"login": "someone"}) if url.endswith("/user")
+        else _response([]) if url.endswith("/user/orgs") or url.endswith("/received_events")
+        else _response(next(pages))
+    )
+    provider = GitHubProvider(token="t")
+
+    changes, cursor = provider.fetch_changes({user_feed: 5, "https://api.github.com/users/someone/received_events": 1})
+    assert changes is None
+    assert cursor[user_feed] == 1000
+
+@patch("requests.Session.get")
+def test_gitlab_fetch_changes(mock_get):
+    mock_get.return_value = _response([
+        {"id": 30, "project_id": 7, "action_name": "pushed to"},
+        {"id": 29, "project_id": 8, "action_name": "commented on"},
+        {"id": 28, "project_id": 9, "action_name": "deleted"},
+        {"id": 20, "project_id": 7, "action_name": "pushed new"},
+    ])
+    provider = GitLabProvider("http://gitlab.local/api/v4", "t")
+
+    changes, cursor = provider.fetch_changes({"last_id": 20})
+    assert [(c.repo_id, c.event) for c in changes] == [(7, "pushed to"), (9, "deleted")]
+    assert cursor == {"last_id": 30}
+    assert mock_get.call_args.kwargs["params"]["scope"] == "all"
+
+    changes, _ = provider.fetch_changes(None)
+    assert changes is None
+
+def test_state_store_cursor():
+    state = StateStore(":memory:")
+    assert state.get_cursor("events:github") is None
+    state.set_cursor("events:github", {"feed": 12})
+    state.set_cursor("events:github", {"feed": 14})
+    assert state.get_cursor("events:github") == {"feed": 14}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def inventory():
+    return [
+        Repository(name="holocron", clone_url="url", id=1),
+        Repository(name="tools", clone_url="url", id=2),
+    ]
+
+def test_change_feed_lists_only_when_needed(inventory):
+    source = MagicMock()
+    source.fetch_repos.return_value = inventory
+    source.fetch_changes.return_value = (None, {"feed": 1})
+    source.refresh_repo.side_effect = lambda repo: repo
+    state = StateStore(":memory:")
+    clock = FakeClock()
+    feed = ChangeFeed(source, state, reconcile_interval=3600, clock=clock)
+
+    # 1. First cycle: full listing
+    repos, full = feed.poll()
+    assert full and repos == inventory
+    assert state.get_cursor("events:source") == {"feed": 1}
+
+    # 2. Feed reports a change: only that repository, no listing
+    source.fetch_changes.return_value = ([RepoChange(repo_id=2, name="tools", event="PushEvent")] * 3, {"feed": 2})
+    clock.now = 60
+    repos, full = feed.poll()
+    assert not full and [repo.name for repo in repos] == ["tools"]
+    assert source.fetch_repos.call_count == 1
+    source.refresh_repo.assert_called_once()
+    source.fetch_changes.assert_called_with({"feed": 1})
+
+    # 3. Unknown repository (e.g. just created): full listing
+    source.fetch_changes.return_value = ([RepoChange(repo_id=99, name=None, event="pushed new")], {"feed": 3})
+    repos, full = feed.poll()
+    assert full and source.fetch_repos.call_count == 2
+
+    # 4. Reconciliation due: full listing even with a clean feed
+    source.fetch_changes.return_value = ([], {"feed": 4})
+    clock.now = 60 + 3600
+    repos, full = feed.poll()
+    assert full and source.fetch_repos.call_count == 3
+
+@patch("holocron.__main__.sync_one_repo")
+def test_run_sync_cycle_with_change_feed(mock_sync, tmp_path, inventory):
+    from holocron.__main__ import run_sync_cycle
+    from holocron.mirror import SyncResult
+
+    mock_sync.side_effect = lambda repo, **kwargs: SyncResult(name=repo.name)
+    (tmp_path / "holocron.git").mkdir()
+    (tmp_path / "tools.git").mkdir()
+    feed = MagicMock()
+    # Old pushed_at and local mirrors present: --window would skip both on a full listing
+    feed.poll.return_value = (inventory, False)
+    config = {
+        "concurrency": 2, "storage": str(tmp_path), "watch": True, "window": 10, "interval": 60,
+        "backup_only": True, "dry_run": False, "checkout": False, "engine": "threaded"
+    }
+
+    assert run_sync_cycle(config, MagicMock(), None, StateStore(":memory:"), change_feed=feed) == 2
+
+@patch("holocron.__main__.sync_one_repo")
+def test_run_sync_cycle_skipped_on_incomplete_listing(mock_sync, tmp_path):
+    from holocron.__main__ import run_sync_cycle
+
+    source = MagicMock()
+    source.fetch_repos.side_effect = ListingError("user repositories: 502 Bad Gateway")
+    config = {
+        "concurrency": 2, "storage": str(tmp_path), "watch": True, "window": 10, "interval": 60,
+        "backup_only": True, "dry_run": False, "checkout": False, "engine": "threaded"
+    }
+    state = StateStore(":memory:")
+    feed = ChangeFeed(source, state, reconcile_interval=3600)
+    source.fetch_changes.return_value = (None, {"feed": 1})
+
+    assert run_sync_cycle(config, source, None, state) == 0
+    assert run_sync_cycle(config, source, None, state, change_feed=feed) == 0
+    mock_sync.assert_not_called()
+    # The feed cursor only moves after a complete listing
+    assert state.get_cursor("events:source") is None
+
+def test_change_feed_refreshes_pushed_at(inventory):
+    from datetime import datetime
+    source = MagicMock()
+    source.fetch_repos.return_value = inventory
+    source.fetch_changes.return_value = (None, {"feed": 1})
+    state = StateStore(":memory:")
+    feed = ChangeFeed(source, state, reconcile_interval=3600, clock=FakeClock())
+    feed.poll()
+
+    # The listed pushed_at is stale: the repository is re-read before it is handed out
+    pushed = datetime(2024, 6, 1, 12, 0)
+    source.fetch_changes.return_value = ([RepoChange(repo_id=1, name="holocron", event="PushEvent")], {"feed": 2})
+    source.refresh_repo.side_effect = lambda repo: Repository(name=repo.name, clone_url=repo.clone_url, id=repo.id, pushed_at=pushed)
+    repos, full = feed.poll()
+    assert not full and repos[0].pushed_at == pushed
+
+    # Cannot be refreshed: the feed is not trusted this cycle
+    source.refresh_repo.side_effect = lambda repo: None
+    source.fetch_changes.return_value = ([RepoChange(repo_id=2, name="tools", event="PushEvent")], {"feed": 3})
+    repos, full = feed.poll()
+    assert full and source.fetch_repos.call_count == 2
+
+@patch("requests.Session.get")
+def test_github_refresh_repo(mock_get):
+    mock_get.return_value = _response({
+        "id": 1, "name": "holocron", "clone_url": "https://github.com/someone/holocron.git",
+        "size": 99, "pushed_at": "2024-06-01T12:00:00Z", "default_branch": "main"
+    })
+    provider = GitHubProvider(token="t")
+    listed = Repository(name="holocron", clone_url="url", id=1, fork_parent="upstream/holocron")
+
+    fresh = provider.refresh_repo(listed)
+    assert mock_get.call_args[0][0] == "https://api.github.com/repositories/1"
+    assert fresh.pushed_at.isoformat() == "2024-06-01T12:00:00" and fresh.size == 99
+    # Listing-only fields (e.g. the GraphQL fork parent) are kept
+    assert fresh.fork_parent == "upstream/holocron" and fresh.clone_url == "url"
+    assert provider.refresh_repo(Repository(name="x", clone_url="url")) is None
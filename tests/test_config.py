@@ -9,6 +9,7 @@ def test_parse_args_defaults():
         assert args.concurrency == 5
         assert args.backup_only is False
         assert args.checkout is False
+        assert args.checkout_mode == "clone"
         assert args.watch is False
         assert args.interval == 60
 
@@ -18,6 +19,7 @@ def test_parse_args_overrides():
         '--concurrency', '10',
         '--backup-only',
         '--checkout',
+        '--checkout-mode', 'worktree',
         '--watch',
         '--interval', '30'
     ]
@@ -26,5 +28,6 @@ def test_parse_args_overrides():
         assert args.concurrency == 10
         assert args.backup_only is True
         assert args.checkout is True
+        assert args.checkout_mode == "worktree"
         assert args.watch is True
         assert args.interval == 30
@@ -0,0 +1,88 @@
+import os
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from holocron.diskusage import DirectorySizer, DiskAccountant
+from holocron.providers.base import Repository
+from holocron.providers.gitlab import GitLabProvider
+from holocron.state import StateStore
+
+def _write(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+
+def test_directory_sizer_rescans_only_changed_dirs(tmp_path):
+    _write(tmp_path / "a.git" / "objects" / "pack" / "p1.pack", 1000)
+    _write(tmp_path / "a.git" / "HEAD", 20)
+    _write(tmp_path / "a.git" / "refs" / "heads" / "main", 41)
+    sizer = DirectorySizer()
+
+    assert sizer.size(str(tmp_path / "a.git")) == 1061
+    first_scan = sizer.rescanned
+
+    sizer.rescanned = 0
+    assert sizer.size(str(tmp_path / "a.git")) == 1061
+    assert sizer.rescanned == 0
+
+    # A new pack: only objects/pack changed
+    _write(tmp_path / "a.git" / "objects" / "pack" / "p2.pack", 500)
+    os.utime(tmp_path / "a.git" / "objects" / "pack", ns=(1, 1))
+    assert sizer.size(str(tmp_path / "a.git")) == 1561
+    assert sizer.rescanned == 1 < first_scan
+
+    assert sizer.size(str(tmp_path / "missing")) == 0
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2024, 1, 1)
+
+    def __call__(self):
+        return self.now
+
+@patch("holocron.diskusage._free_bytes")
+@patch("holocron.diskusage.logger")
+def test_accountant_reports_growth_and_projection(mock_logger, mock_free, tmp_path):
+    mock_free.return_value = 10 * 1024 * 1024
+    clock = Clock()
+    state = StateStore(":memory:")
+    accountant = DiskAccountant(str(tmp_path), state, top_n=2, clock=clock)
+    repos = [
+        Repository(name="small", clone_url="url"),
+        Repository(name="big", clone_url="url"),
+        Repository(name="new", clone_url="url", size=300),
+    ]
+    _write(tmp_path / "small.git" / "objects" / "x", 1000)
+    _write(tmp_path / "big.git" / "objects" / "x", 1024 * 1024)
+    _write(tmp_path / "big" / "README.md", 100)
+
+    first = accountant.report(repos)
+    assert first["mirrors"] == 1000 + 1024 * 1024
+    assert first["checkouts"] == 100
+    assert first["pending_clones"] == 300 * 1024
+    assert [name for _, name in first["largest"]] == ["big", "small"]
+    assert first["growth"] is None and first["days_until_full"] is None
+
+    # One day later the mirrors grew by 1 MB: 10 MB free lasts ~10 days
+    clock.now += timedelta(days=1)
+    _write(tmp_path / "small.git" / "objects" / "y", 1024 * 1024)
+    second = accountant.report(repos)
+    assert second["growth"] == 1024 * 1024
+    assert second["bytes_per_day"] == pytest.approx(1024 * 1024)
+    assert second["days_until_full"] == pytest.approx(10)
+    mock_logger.warning.assert_called_once()
+
+def test_disk_samples_are_persisted():
+    state = StateStore(":memory:")
+    now = datetime(2024, 3, 1)
+    state.record_disk_sample(now - timedelta(days=40), 1)
+    state.record_disk_sample(now - timedelta(days=2), 2)
+    state.record_disk_sample(now, 3)
+    assert state.disk_samples(since=now - timedelta(days=7)) == [(now - timedelta(days=2), 2), (now, 3)]
+    # Older than the retention period: gone
+    assert len(state.disk_samples(since=datetime(2000, 1, 1))) == 2
+
+def test_gitlab_size_from_statistics():
+    provider = GitLabProvider("http://gitlab.local/api/v4", "t")
+    repo = provider._to_repository({"id": 1, "path": "p", "http_url_to_repo": "url", "statistics": {"repository_size": 4 * 1024 * 1024}})
+    assert repo.size == 4096
+    assert provider._to_repository({"id": 1, "path": "p", "http_url_to_repo": "url"}).size == 0
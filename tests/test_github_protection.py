@@ -6,10 +6,10 @@ from holocron.providers.base import Repository
 
 @pytest.fixture
 def repo():
-    return Repository(name="owner/repo", clone_url="url")
+    return Repository(name="owner/repo", clone_url="url", default_branch="main")
 
-@patch("requests.get")
-@patch("requests.put")
+@patch("requests.Session.get")
+@patch("requests.Session.put")
 def test_github_prepare_push_enables_force(mock_put, mock_get, repo):
     provider = GitHubProvider("token")
     
@@ -43,8 +43,8 @@ def test_github_prepare_push_enables_force(mock_put, mock_get, repo):
     assert kwargs['json']['allow_force_pushes'] is True
     assert kwargs['json']['enforce_admins'] is False
 
-@patch("requests.get")
-@patch("requests.put")
+@patch("requests.Session.get")
+@patch("requests.Session.put")
 def test_github_prepare_push_already_enabled(mock_put, mock_get, repo):
     provider = GitHubProvider("token")
     
@@ -64,8 +64,8 @@ def test_github_prepare_push_already_enabled(mock_put, mock_get, repo):
     
     mock_put.assert_not_called()
 
-@patch("requests.get")
-@patch("requests.put")
+@patch("requests.Session.get")
+@patch("requests.Session.put")
 def test_github_prepare_push_not_protected(mock_put, mock_get, repo):
     provider = GitHubProvider("token")
     
@@ -81,3 +81,38 @@ def test_github_prepare_push_not_protected(mock_put, mock_get, repo):
     provider.prepare_push(repo)
     
     mock_put.assert_not_called()
+
+@patch("requests.Session.get")
+@patch("requests.Session.put")
+def test_github_prepare_push_caches_after_enabling(mock_put, mock_get, repo):
+    provider = GitHubProvider("token")
+
+    repo_resp = MagicMock()
+    repo_resp.status_code = 200
+    repo_resp.json.return_value = {"default_branch": "main"}
+    prot_resp = MagicMock()
+    prot_resp.status_code = 200
+    prot_resp.json.return_value = {"allow_force_pushes": {"enabled": False}}
+    mock_get.side_effect = [repo_resp, prot_resp]
+
+    provider.prepare_push(repo)
+    provider.prepare_push(repo)
+
+    assert mock_get.call_count == 2
+    mock_put.assert_called_once()
+
+@patch("requests.Session.get")
+def test_github_prepare_push_caches_the_verified_branch(mock_get, repo):
+    provider = GitHubProvider("token")
+    repo_resp = MagicMock()
+    repo_resp.status_code = 200
+    # The destination still reports another default branch than the source's
+    repo_resp.json.return_value = {"default_branch": "master"}
+    prot_resp = MagicMock()
+    prot_resp.status_code = 404
+    mock_get.side_effect = [repo_resp, prot_resp]
+
+    provider.prepare_push(repo)
+    provider.prepare_push(repo)
+    assert mock_get.call_count == 2
+    assert mock_get.call_args_list[1].args[0].endswith("/branches/main/protection")
@@ -1,9 +1,10 @@
 import pytest
 from unittest.mock import Mock, patch
 from holocron.providers.github import GitHubProvider
-from holocron.providers.base import Repository
+from holocron.providers.base import Repository, ListingError
+from datetime import datetime
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_get_all_pages_pagination(mock_get):
     # Setup mock to return 2 pages, then empty
     
@@ -26,21 +27,21 @@ def test_get_all_pages_pagination(mock_get):
     assert len(items) == 150
     assert mock_get.call_count == 2
 
-@patch("requests.get")
+@patch("requests.Session.get")
 @patch("holocron.providers.github.logger")
 def test_get_all_pages_error(mock_logger, mock_get):
     # Simulate a network error
     mock_get.side_effect = Exception("Boom")
     
     provider = GitHubProvider(token="test_token")
-    items = provider._get_all_pages("url", {}, "context")
+    with pytest.raises(ListingError):
+        provider._get_all_pages("url", {}, "context")
     
-    assert len(items) == 0
     # Should have logged error
     mock_logger.error.assert_called()
     assert "ERROR fetching context" in mock_logger.error.call_args[0][0]
 
-@patch("requests.get")
+@patch("requests.Session.get")
 @patch("holocron.providers.github.logger")
 def test_get_all_pages_http_error(mock_logger, mock_get):
     # Simulate 404
@@ -49,8 +50,8 @@ def test_get_all_pages_http_error(mock_logger, mock_get):
     mock_get.return_value = mock_resp
     
     provider = GitHubProvider(token="test_token")
-    items = provider._get_all_pages("url", {}, "context")
-    assert len(items) == 0
+    with pytest.raises(ListingError):
+        provider._get_all_pages("url", {}, "context")
 
 @patch("holocron.providers.github.GitHubProvider._get_all_pages")
 def test_fetch_repos_with_orgs(mock_get_pages):
@@ -88,3 +89,301 @@ def test_fetch_repos_with_orgs(mock_get_pages):
     assert len(repos) == 3
     names = {r.name for r in repos}
     assert names == {'u1', 'u2', 'o1'}
+
+@patch("requests.Session.get")
+def test_get_all_pages_conditional_request(mock_get):
+    # First cycle: 200 with an ETag
+    fresh = Mock()
+    fresh.status_code = 200
+    fresh.headers = {'ETag': 'W/"abc"'}
+    fresh.json.return_value = [{'id': 1}, {'id': 2}]
+
+    # Second cycle: 304, body must come from the cache
+    not_modified = Mock()
+    not_modified.status_code = 304
+    not_modified.headers = {}
+
+    mock_get.side_effect = [fresh, not_modified]
+
+    provider = GitHubProvider(token="test_token")
+    first = provider._get_all_pages("http://api.github.com/user/repos", {}, "test")
+    second = provider._get_all_pages("http://api.github.com/user/repos", {}, "test")
+
+    assert first == second == [{'id': 1}, {'id': 2}]
+    # No validators on the first request, If-None-Match on the second
+    assert 'If-None-Match' not in mock_get.call_args_list[0][1]['headers']
+    assert mock_get.call_args_list[1][1]['headers']['If-None-Match'] == 'W/"abc"'
+    not_modified.json.assert_not_called()
+
+@patch("requests.Session.get")
+def test_get_all_pages_304_reuses_cached_page_count(mock_get):
+    def get(url, headers=None, params=None, **kwargs):
+        page = params['page']
+        r = Mock()
+        if 'If-None-Match' in headers:
+            # Second cycle: nothing changed, and the 304 carries no Link header
+            r.status_code = 304
+            r.headers = {}
+            r.links = {}
+            return r
+        r.status_code = 200
+        r.headers = {'ETag': f'"p{page}"'}
+        r.links = {'last': {'url': 'https://api.github.com/user/repos?per_page=100&page=3'}}
+        r.json.return_value = [{'id': page * 1000 + i} for i in range(100 if page <= 3 else 0)]
+        return r
+    mock_get.side_effect = get
+
+    provider = GitHubProvider(token="test_token")
+    first = provider._get_all_pages("https://api.github.com/user/repos", {}, "test")
+    mock_get.reset_mock()
+    second = provider._get_all_pages("https://api.github.com/user/repos", {}, "test")
+
+    # The last page is full, so only the cached count stops a page-by-page walk from asking for page 4
+    assert second == first and len(second) == 300
+    assert sorted(call.kwargs['params']['page'] for call in mock_get.call_args_list) == [1, 2, 3]
+
+@patch("requests.Session.get")
+def test_get_all_pages_304_without_cached_copy(mock_get):
+    # E.g. a caching proxy answering 304 although nothing is cached here
+    not_modified = Mock()
+    not_modified.status_code = 304
+    not_modified.headers = {}
+    fresh = Mock()
+    fresh.status_code = 200
+    fresh.headers = {}
+    fresh.json.return_value = [{'id': 1}, {'id': 2}]
+    mock_get.side_effect = [not_modified, fresh]
+
+    provider = GitHubProvider(token="test_token")
+    items = provider._get_all_pages("http://api.github.com/user/repos", {}, "test")
+
+    # Asked again without validators instead of ending the listing on an empty page
+    assert items == [{'id': 1}, {'id': 2}]
+    assert mock_get.call_count == 2
+    assert 'If-None-Match' not in mock_get.call_args_list[1][1]['headers']
+
+    mock_get.side_effect = [not_modified, not_modified]
+    with pytest.raises(ListingError):
+        provider._get_all_pages("http://api.github.com/user/orgs", {}, "test")
+
+@patch("requests.Session.get")
+def test_get_all_pages_parallel_with_link_header(mock_get):
+    # 3 full pages + 1 short page, last page advertised on page 1
+    def respond(url, headers=None, params=None, timeout=None):
+        page = params['page']
+        resp = Mock()
+        resp.status_code = 200
+        resp.headers = {}
+        resp.links = {'last': {'url': f"{url}?per_page=100&page=4"}} if page == 1 else {}
+        count = 100 if page < 4 else 10
+        resp.json.return_value = [{'id': (page - 1) * 100 + i} for i in range(count)]
+        return resp
+
+    mock_get.side_effect = respond
+
+    provider = GitHubProvider(token="test_token", page_concurrency=3)
+    items = provider._get_all_pages("http://api.github.com/user/repos", {}, "test")
+
+    assert mock_get.call_count == 4
+    # Order is preserved even though pages 2-4 are fetched concurrently
+    assert [item['id'] for item in items] == list(range(310))
+
+@patch("requests.Session.get")
+@patch("holocron.providers.github.logger")
+def test_get_all_pages_parallel_error_fails_listing(mock_logger, mock_get):
+    def respond(url, headers=None, params=None, timeout=None):
+        page = params['page']
+        if page == 3:
+            raise Exception("Boom")
+        resp = Mock()
+        resp.status_code = 200
+        resp.headers = {}
+        resp.links = {'last': {'url': f"{url}?page=3"}} if page == 1 else {}
+        resp.json.return_value = [{'id': (page - 1) * 100 + i} for i in range(100)]
+        return resp
+
+    mock_get.side_effect = respond
+
+    provider = GitHubProvider(token="test_token")
+    # Page 3 keeps failing: no partial list of 200
+    with pytest.raises(ListingError):
+        provider._get_all_pages("http://api.github.com/user/repos", {}, "context")
+    assert "ERROR fetching context" in mock_logger.error.call_args[0][0]
+
+@patch("requests.Session.get")
+@patch("holocron.providers.github.logger")
+def test_get_all_pages_sequential_error_fails_listing(mock_logger, mock_get):
+    def respond(url, headers=None, params=None, timeout=None):
+        page = params['page']
+        resp = Mock()
+        resp.status_code = 200
+        resp.headers = {}
+        resp.links = {}  # No last page: walked one by one
+        if page == 3:
+            resp.raise_for_status.side_effect = Exception("502 Bad Gateway")
+        resp.json.return_value = [{'id': (page - 1) * 100 + i} for i in range(100)]
+        return resp
+
+    mock_get.side_effect = respond
+
+    provider = GitHubProvider(token="test_token")
+    with pytest.raises(ListingError):
+        provider.fetch_repos()
+
+@patch("holocron.providers.github.GitHubProvider._get_all_pages")
+def test_fetch_changes_incomplete_without_org_list(mock_get_pages):
+    provider = GitHubProvider(token="token", api_url="http://api")
+    user = Mock(status_code=200)
+    user.json.return_value = {'login': 'me'}
+    mock_get_pages.side_effect = ListingError("organizations: Boom")
+
+    with patch.object(provider.session, "get", return_value=user):
+        changes, cursor = provider.fetch_changes({"feed": 5})
+
+    assert changes is None
+    assert cursor == {"feed": 5}
+
+@patch("holocron.providers.github.logger")
+@patch("holocron.providers.github.GitHubProvider._get_all_pages")
+def test_fetch_repos_orgs_concurrently(mock_get_pages, mock_logger):
+    user_repos = [{'id': 1, 'name': 'u1', 'clone_url': 'http://u1'}]
+    orgs = [{'login': f'org{i}'} for i in range(5)]
+    # Every org shares repo 100, which must only be listed once
+    org_repos = {
+        f"http://api/orgs/org{i}/repos": [
+            {'id': 10 + i, 'name': f'o{i}', 'clone_url': f'http://o{i}'},
+            {'id': 100, 'name': 'shared', 'clone_url': 'http://shared'}
+        ]
+        for i in range(5)
+    }
+
+    def pages(url, headers, context_name, query_params=None):
+        if url.endswith("/user/repos"):
+            return user_repos
+        if url.endswith("/user/orgs"):
+            return orgs
+        return org_repos[url]
+
+    mock_get_pages.side_effect = pages
+
+    provider = GitHubProvider(token="token", api_url="http://api", org_concurrency=3)
+    repos = provider.fetch_repos()
+
+    # Merged in org order, regardless of which org finished first
+    assert [r.name for r in repos] == ['u1', 'o0', 'shared', 'o1', 'o2', 'o3', 'o4']
+
+    debug_logs = [c[0][0] for c in mock_logger.debug.call_args_list]
+    assert any("for organization 'org3' in" in msg for msg in debug_logs)
+    assert any("Slowest organization listing" in msg for msg in debug_logs)
+
+def _graphql_response(data):
+    resp = Mock()
+    resp.status_code = 200
+    resp.json.return_value = {"data": data}
+    return resp
+
+def _repo_node(db_id, name):
+    return {
+        "databaseId": db_id,
+        "name": name,
+        "url": f"https://github.com/owner/{name}",
+        "diskUsage": 2048,
+        "pushedAt": "2024-05-01T10:00:00Z",
+        "defaultBranchRef": {"name": "main"}
+    }
+
+@patch("requests.Session.post")
+def test_fetch_repos_graphql(mock_post):
+    def respond(url, json=None):
+        query, variables = json["query"], json["variables"]
+        if "organizations(" in query:
+            return _graphql_response({"viewer": {"organizations": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "nodes": [{"login": "org1"}]
+            }}})
+        if "organization(" in query:
+            assert variables["login"] == "org1"
+            return _graphql_response({"organization": {"repositories": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "nodes": [_repo_node(3, "o1"), _repo_node(1, "u1")]
+            }}})
+        # Viewer repositories, 2 pages
+        if variables["cursor"] is None:
+            return _graphql_response({"viewer": {"repositories": {
+                "pageInfo": {"hasNextPage": True, "endCursor": "c1"},
+                "nodes": [_repo_node(1, "u1")]
+            }}})
+        assert variables["cursor"] == "c1"
+        return _graphql_response({"viewer": {"repositories": {
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+            "nodes": [_repo_node(2, "u2")]
+        }}})
+
+    mock_post.side_effect = respond
+
+    provider = GitHubProvider(token="token", use_graphql=True)
+    repos = provider.fetch_repos()
+
+    assert [r.name for r in repos] == ["u1", "u2", "o1"]
+    assert mock_post.call_count == 4
+    assert mock_post.call_args[0][0] == "https://api.github.com/graphql"
+
+    u1 = repos[0]
+    assert u1.clone_url == "https://github.com/owner/u1.git"
+    assert u1.size == 2048
+    assert u1.pushed_at == datetime(2024, 5, 1, 10, 0, 0)
+    assert u1.default_branch == "main"
+
+@patch("requests.Session.post")
+@patch("holocron.providers.github.logger")
+def test_fetch_repos_graphql_errors(mock_logger, mock_post):
+    resp = Mock()
+    resp.json.return_value = {"errors": [{"message": "Bad credentials"}]}
+    mock_post.return_value = resp
+
+    provider = GitHubProvider(token="token", use_graphql=True)
+    with pytest.raises(ListingError):
+        provider.fetch_repos()
+    assert "Bad credentials" in mock_logger.error.call_args[0][0]
+
+@patch("requests.Session.post")
+@patch("holocron.providers.github.logger")
+def test_fetch_repos_graphql_skips_forbidden_org(mock_logger, mock_post):
+    saml = {"type": "FORBIDDEN", "message": "Resource protected by organization SAML enforcement."}
+
+    def respond(url, json=None):
+        query, variables = json["query"], json["variables"]
+        if "organizations(" in query:
+            return _graphql_response({"viewer": {"organizations": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "nodes": [{"login": "open"}, {"login": "sso"}]
+            }}})
+        if "organization(" in query:
+            if variables["login"] == "sso":
+                resp = _graphql_response({"organization": None})
+                resp.json.return_value["errors"] = [saml]
+                return resp
+            return _graphql_response({"organization": {"repositories": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "nodes": [_repo_node(3, "o1")]
+            }}})
+        # The viewer's repositories of the SAML org are nulled out, the others are listed
+        resp = _graphql_response({"viewer": {"repositories": {
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+            "nodes": [_repo_node(1, "u1"), None]
+        }}})
+        resp.json.return_value["errors"] = [saml]
+        return resp
+
+    mock_post.side_effect = respond
+
+    provider = GitHubProvider(token="token", use_graphql=True)
+    repos = provider.fetch_repos()
+
+    assert [r.name for r in repos] == ["u1", "o1"]
+    warnings = [c[0][0] for c in mock_logger.warning.call_args_list]
+    assert any("organization 'sso'" in msg and "SAML" in msg for msg in warnings)
+
+def test_graphql_url_enterprise():
+    assert GitHubProvider("t", api_url="https://ghe.local/api/v3")._graphql_url() == "https://ghe.local/api/graphql"
+    assert GitHubProvider("t")._graphql_url() == "https://api.github.com/graphql"
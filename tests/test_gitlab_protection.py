@@ -6,10 +6,10 @@ from holocron.providers.base import Repository
 
 @pytest.fixture
 def repo():
-    return Repository(name="test-repo", clone_url="http://src/test-repo.git")
+    return Repository(name="test-repo", clone_url="http://src/test-repo.git", default_branch="main")
 
-@patch("requests.get")
-@patch("requests.patch")
+@patch("requests.Session.get")
+@patch("requests.Session.patch")
 def test_prepare_push_enables_force_push(mock_patch, mock_get, repo):
     """
     Test that prepare_push enables allow_force_push if it is disabled.
@@ -49,8 +49,8 @@ def test_prepare_push_enables_force_push(mock_patch, mock_get, repo):
     assert "projects/123/protected_branches/main" in args[0]
     assert kwargs['json'] == {'allow_force_push': True}
 
-@patch("requests.get")
-@patch("requests.patch")
+@patch("requests.Session.get")
+@patch("requests.Session.patch")
 def test_prepare_push_already_enabled(mock_patch, mock_get, repo):
     """
     Test that preserve_push does nothing if allow_force_push is already True.
@@ -73,8 +73,8 @@ def test_prepare_push_already_enabled(mock_patch, mock_get, repo):
     
     mock_patch.assert_not_called()
 
-@patch("requests.get")
-@patch("requests.patch")
+@patch("requests.Session.get")
+@patch("requests.Session.patch")
 def test_prepare_push_branch_not_protected(mock_patch, mock_get, repo):
     """
     Test that prepare_push does nothing if branch is not protected.
@@ -95,8 +95,8 @@ def test_prepare_push_branch_not_protected(mock_patch, mock_get, repo):
     
     mock_patch.assert_not_called()
 
-@patch("requests.get")
-@patch("requests.patch")
+@patch("requests.Session.get")
+@patch("requests.Session.patch")
 def test_prepare_push_project_not_found(mock_patch, mock_get, repo):
     provider = GitLabProvider("http://gitlab.com", "token")
     
@@ -109,3 +109,113 @@ def test_prepare_push_project_not_found(mock_patch, mock_get, repo):
     
     mock_get.assert_called_once()
     mock_patch.assert_not_called()
+
+@patch("requests.Session.get")
+@patch("requests.Session.patch")
+def test_prepare_push_uses_protection_cache(mock_patch, mock_get, repo):
+    provider = GitLabProvider("http://gitlab.com", "token", namespace="group")
+
+    project_resp = MagicMock()
+    project_resp.status_code = 200
+    project_resp.json.return_value = {"id": 123, "default_branch": "main"}
+    prot_resp = MagicMock()
+    prot_resp.status_code = 200
+    prot_resp.json.return_value = {"name": "main", "allow_force_push": True}
+    mock_get.side_effect = [project_resp, prot_resp, project_resp, prot_resp]
+
+    provider.prepare_push(repo)
+    assert mock_get.call_count == 2
+
+    # Steady state: no API calls at all
+    provider.prepare_push(repo)
+    assert mock_get.call_count == 2
+
+    # A protected-branch rejection invalidates the entry
+    provider.invalidate_protection(repo)
+    provider.prepare_push(repo)
+    assert mock_get.call_count == 4
+
+@patch("requests.Session.get")
+def test_prepare_push_cache_expires(mock_get, repo):
+    provider = GitLabProvider("http://gitlab.com", "token", protection_ttl=60)
+    now = [0.0]
+    provider._protection._clock = lambda: now[0]
+
+    project_resp = MagicMock()
+    project_resp.status_code = 200
+    project_resp.json.return_value = {"id": 123, "default_branch": "main"}
+    prot_resp = MagicMock()
+    prot_resp.status_code = 404
+    mock_get.side_effect = [project_resp, prot_resp, project_resp, prot_resp]
+
+    provider.prepare_push(repo)
+    now[0] = 59
+    provider.prepare_push(repo)
+    assert mock_get.call_count == 2
+
+    now[0] = 61
+    provider.prepare_push(repo)
+    assert mock_get.call_count == 4
+
+@patch("requests.Session.get")
+def test_prepare_push_project_not_found_is_not_cached(mock_get, repo):
+    provider = GitLabProvider("http://gitlab.com", "token")
+    project_resp = MagicMock()
+    project_resp.status_code = 404
+    mock_get.return_value = project_resp
+
+    provider.prepare_push(repo)
+    provider.prepare_push(repo)
+    assert mock_get.call_count == 2
+
+@patch("requests.Session.get")
+def test_prepare_push_default_branch_rename_is_checked(mock_get, repo):
+    provider = GitLabProvider("http://gitlab.com", "token")
+
+    def project(branch):
+        resp = MagicMock()
+        resp.status_code = 200
+        resp.json.return_value = {"id": 123, "default_branch": branch}
+        return resp
+
+    prot_resp = MagicMock()
+    prot_resp.status_code = 404
+    mock_get.side_effect = [project("main"), prot_resp, project("trunk"), prot_resp]
+
+    provider.prepare_push(repo)
+    assert mock_get.call_count == 2
+
+    # Renamed at the source: the entry for "main" does not vouch for "trunk"
+    repo.default_branch = "trunk"
+    provider.prepare_push(repo)
+    assert mock_get.call_count == 4
+    assert provider._protection.is_fresh("test-repo", "trunk")
+    assert not provider._protection.is_fresh("test-repo", "main")
+    assert not provider._protection.is_fresh("test-repo", None)
+
+@patch("requests.Session.get")
+def test_prepare_push_caches_the_verified_branch(mock_get, repo):
+    provider = GitLabProvider("http://gitlab.com", "token")
+    project_resp = MagicMock()
+    project_resp.status_code = 200
+    # The destination still reports another default branch than the source's
+    project_resp.json.return_value = {"id": 123, "default_branch": "master"}
+    prot_resp = MagicMock()
+    prot_resp.status_code = 404
+    mock_get.side_effect = [project_resp, prot_resp]
+
+    provider.prepare_push(repo)
+    provider.prepare_push(repo)
+    assert mock_get.call_count == 2
+    assert mock_get.call_args_list[1].args[0].endswith("/protected_branches/main")
+
+@patch("requests.Session.get")
+def test_prepare_push_protection_timeout(mock_get, repo):
+    provider = GitLabProvider("http://gitlab.com", "token")
+    project_resp = MagicMock()
+    project_resp.status_code = 404
+    mock_get.return_value = project_resp
+
+    provider.prepare_push(repo)
+    # Shorter than the session default: a slow API must not hold up the push for long
+    assert mock_get.call_args[1]["timeout"] == 10
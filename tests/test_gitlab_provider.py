@@ -0,0 +1,122 @@
+import pytest
+from unittest.mock import Mock, patch
+from holocron.providers.gitlab import GitLabProvider
+from holocron.providers.base import ListingError
+
+@patch("requests.Session.get")
+def test_get_all_pages_pagination(mock_get):
+    mock_resp_1 = Mock()
+    mock_resp_1.status_code = 200
+    mock_resp_1.headers = {}
+    mock_resp_1.json.return_value = [{'id': i} for i in range(100)]
+
+    mock_resp_2 = Mock()
+    mock_resp_2.status_code = 200
+    mock_resp_2.headers = {}
+    mock_resp_2.json.return_value = [{'id': i} for i in range(100, 120)]
+
+    mock_get.side_effect = [mock_resp_1, mock_resp_2]
+
+    provider = GitLabProvider("http://gitlab.local/api/v4", "token")
+    items = provider._get_all_pages("http://gitlab.local/api/v4/projects", {}, "test")
+
+    assert len(items) == 120
+    assert mock_get.call_count == 2
+
+@patch("requests.Session.get")
+def test_get_all_pages_conditional_request(mock_get):
+    fresh = Mock()
+    fresh.status_code = 200
+    fresh.headers = {'Last-Modified': 'Wed, 01 Jan 2025 00:00:00 GMT'}
+    fresh.json.return_value = [{'id': 1}]
+
+    not_modified = Mock()
+    not_modified.status_code = 304
+    not_modified.headers = {}
+
+    mock_get.side_effect = [fresh, not_modified]
+
+    provider = GitLabProvider("http://gitlab.local/api/v4", "token")
+    provider._get_all_pages("http://gitlab.local/api/v4/projects", {}, "test")
+    items = provider._get_all_pages("http://gitlab.local/api/v4/projects", {}, "test")
+
+    assert items == [{'id': 1}]
+    assert mock_get.call_args_list[1][1]['headers']['If-Modified-Since'] == 'Wed, 01 Jan 2025 00:00:00 GMT'
+    not_modified.json.assert_not_called()
+
+@patch("requests.Session.get")
+def test_get_all_pages_304_reuses_cached_page_count(mock_get):
+    def get(url, headers=None, params=None, **kwargs):
+        page = params['page']
+        r = Mock()
+        if 'If-None-Match' in headers:
+            # Second cycle: nothing changed, and the 304 carries no X-Total-Pages
+            r.status_code = 304
+            r.headers = {}
+            return r
+        r.status_code = 200
+        r.headers = {'ETag': f'"p{page}"', 'X-Total-Pages': '3'}
+        r.json.return_value = [{'id': page * 1000 + i} for i in range(100 if page <= 3 else 0)]
+        return r
+    mock_get.side_effect = get
+
+    provider = GitLabProvider("http://gitlab.local/api/v4", "token")
+    first = provider._get_all_pages("http://gitlab.local/api/v4/projects", {}, "test")
+    mock_get.reset_mock()
+    second = provider._get_all_pages("http://gitlab.local/api/v4/projects", {}, "test")
+
+    # The last page is full, so only the cached count stops a page-by-page walk from asking for page 4
+    assert second == first and len(second) == 300
+    assert sorted(call.kwargs['params']['page'] for call in mock_get.call_args_list) == [1, 2, 3]
+
+@patch("requests.Session.get")
+def test_get_all_pages_params_are_part_of_cache_key(mock_get):
+    fresh = Mock()
+    fresh.status_code = 200
+    fresh.headers = {'ETag': '"v1"'}
+    fresh.json.return_value = [{'id': 1}]
+    mock_get.return_value = fresh
+
+    provider = GitLabProvider("http://gitlab.local/api/v4", "token")
+    provider._get_all_pages("http://gitlab.local/api/v4/projects", {}, "test", query_params={"membership": "true"})
+    provider._get_all_pages("http://gitlab.local/api/v4/projects", {}, "test", query_params={"membership": "false"})
+
+    assert 'If-None-Match' not in mock_get.call_args_list[1][1]['headers']
+
+@patch("requests.Session.get")
+def test_get_all_pages_parallel_with_total_pages(mock_get):
+    def respond(url, headers=None, params=None, timeout=None):
+        page = params['page']
+        resp = Mock()
+        resp.status_code = 200
+        resp.headers = {'X-Total-Pages': '3'}
+        count = 100 if page < 3 else 5
+        resp.json.return_value = [{'id': (page - 1) * 100 + i} for i in range(count)]
+        return resp
+
+    mock_get.side_effect = respond
+
+    provider = GitLabProvider("http://gitlab.local/api/v4", "token")
+    items = provider._get_all_pages("http://gitlab.local/api/v4/projects", {}, "test")
+
+    assert mock_get.call_count == 3
+    assert [item['id'] for item in items] == list(range(205))
+
+@patch("requests.Session.get")
+def test_get_all_pages_failing_page_fails_listing(mock_get):
+    def respond(url, headers=None, params=None, timeout=None):
+        page = params['page']
+        if page == 3:
+            raise Exception("Boom")
+        resp = Mock()
+        resp.status_code = 200
+        resp.headers = {'X-Total-Pages': '4'}
+        resp.json.return_value = [{'id': (page - 1) * 100 + i} for i in range(100)]
+        return resp
+
+    mock_get.side_effect = respond
+
+    provider = GitLabProvider("http://gitlab.local/api/v4", "token")
+    # Page 3 keeps failing: no partial list
+    with pytest.raises(ListingError):
+        provider.fetch_repos()
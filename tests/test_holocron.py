@@ -4,24 +4,34 @@ import pytest
 import argparse
 from unittest.mock import MagicMock, patch, call
 from holocron.__main__ import main
+from holocron.config import parse_args
 from holocron.providers.base import Repository
+from holocron.mirror import SyncResult
 from datetime import datetime
 
+def make_args(**overrides):
+    """CLI defaults (as parsed with no flags), with per-test overrides."""
+    with patch.object(sys, 'argv', ['holocron']):
+        args = parse_args()
+    for key, value in overrides.items():
+        setattr(args, key, value)
+    return args
+
 @patch("holocron.__main__.parse_args")
 @patch.dict(os.environ, {"GITHUB_TOKEN": "gh_token", "GITLAB_TOKEN": "gl_token"})
 @patch("holocron.__main__.get_provider")
 @patch("holocron.__main__.sync_one_repo")
 @patch("holocron.__main__.logger")
-def test_main_single_run(mock_logger, mock_sync, mock_get_provider, mock_parse):
+def test_main_single_run(mock_logger, mock_sync, mock_get_provider, mock_parse, tmp_path):
     # Setup args: single run (not watch), dry run False
-    args = argparse.Namespace(
+    args = make_args(
         watch=False,
         dry_run=False,
         concurrency=1,
         backup_only=False,
         window=10,
         verbose=False,
-        storage="/tmp/data",
+        storage=str(tmp_path),
         source="github",
         destination="gitlab",
         credits=False,
@@ -46,6 +56,7 @@ def test_main_single_run(mock_logger, mock_sync, mock_get_provider, mock_parse):
     mock_dest = MagicMock()
     
     mock_get_provider.side_effect = [mock_source, mock_dest]
+    mock_sync.return_value = SyncResult(name='repo1')
 
     main()
 
@@ -56,8 +67,8 @@ def test_main_single_run(mock_logger, mock_sync, mock_get_provider, mock_parse):
 
 @patch("holocron.__main__.parse_args")
 @patch.dict(os.environ, {}, clear=True) # Empty env
-def test_main_missing_tokens(mock_parse):
-    args = argparse.Namespace(
+def test_main_missing_tokens(mock_parse, tmp_path):
+    args = make_args(
         backup_only=False,
         source="github",
         destination="gitlab",
@@ -66,7 +77,7 @@ def test_main_missing_tokens(mock_parse):
         concurrency=1,
         watch=False,
         dry_run=False,
-        storage="/tmp",
+        storage=str(tmp_path),
         window=10,
         checkout=False,
         gitlab_namespace=None,
@@ -80,9 +91,9 @@ def test_main_missing_tokens(mock_parse):
 
 @patch("holocron.__main__.parse_args")
 @patch.dict(os.environ, {"GITHUB_TOKEN": "gh"}, clear=True)
-def test_main_missing_gitlab_token_normal_mode(mock_parse):
+def test_main_missing_gitlab_token_normal_mode(mock_parse, tmp_path):
     # If backup_only is False, we NEED GitLab token
-    args = argparse.Namespace(
+    args = make_args(
         backup_only=False,
         source="github",
         destination="gitlab",
@@ -91,7 +102,7 @@ def test_main_missing_gitlab_token_normal_mode(mock_parse):
         concurrency=1,
         watch=False,
         dry_run=False,
-        storage="/tmp",
+        storage=str(tmp_path),
         window=10,
         checkout=False,
         gitlab_namespace=None,
@@ -106,15 +117,15 @@ def test_main_missing_gitlab_token_normal_mode(mock_parse):
 @patch("holocron.__main__.parse_args")
 @patch.dict(os.environ, {"GITHUB_TOKEN": "gh", "GITLAB_TOKEN": "gl"})
 @patch("holocron.__main__.get_provider")
-def test_main_backup_only_no_gitlab_token(mock_get_provider, mock_parse):
+def test_main_backup_only_no_gitlab_token(mock_get_provider, mock_parse, tmp_path):
     # Should NOT exit
-    args = argparse.Namespace(
+    args = make_args(
         backup_only=True,
         watch=False,
         concurrency=1,
         dry_run=False,
         verbose=False,
-        storage="/tmp",
+        storage=str(tmp_path),
         source="github",
         destination="local", # implies backup_only=True usually, but set explicitly below
         credits=False,
@@ -140,17 +151,17 @@ def test_main_backup_only_no_gitlab_token(mock_get_provider, mock_parse):
 @patch("holocron.__main__.get_provider")
 @patch("holocron.__main__.sync_one_repo")
 @patch("time.sleep")
-def test_main_watch_loop(mock_sleep, mock_sync, mock_get_provider, mock_parse):
+def test_main_watch_loop(mock_sleep, mock_sync, mock_get_provider, mock_parse, tmp_path):
     # Test watch mode loop
     # We make mock_sleep raise an exception to break the infinite loop
-    args = argparse.Namespace(
+    args = make_args(
         watch=True,
         interval=60,
         concurrency=1,
         window=10,
         dry_run=False,
         verbose=False,
-        storage="/tmp",
+        storage=str(tmp_path),
         backup_only=False,
         source="github",
         destination="gitlab",
@@ -176,6 +187,7 @@ def test_main_watch_loop(mock_sleep, mock_sync, mock_get_provider, mock_parse):
     mock_dest = MagicMock()
     
     mock_get_provider.return_value = mock_source
+    mock_sync.return_value = SyncResult(name='repo1')
     
     # Break loop after 2 sleeps (end of cycle 2)
     mock_sleep.side_effect = [None, RuntimeError("Break Loop")]
@@ -191,15 +203,15 @@ def test_main_watch_loop(mock_sleep, mock_sync, mock_get_provider, mock_parse):
 @patch("holocron.__main__.get_provider")
 @patch("holocron.__main__.sync_one_repo")
 @patch("holocron.__main__.logger")
-def test_main_verbose_no_sync(mock_logger, mock_sync, mock_get_provider, mock_parse):
+def test_main_verbose_no_sync(mock_logger, mock_sync, mock_get_provider, mock_parse, tmp_path):
     # Test path where sync_count is 0 and verbose is True
-    args = argparse.Namespace(
+    args = make_args(
         watch=False,
         concurrency=1,
         backup_only=False,
         dry_run=False,
         verbose=True,
-        storage="/tmp",
+        storage=str(tmp_path),
         source="github",
         destination="gitlab",
         credits=False,
@@ -226,13 +238,13 @@ def test_main_verbose_no_sync(mock_logger, mock_sync, mock_get_provider, mock_pa
 @patch("holocron.__main__.get_provider")
 @patch("holocron.__main__.sync_one_repo")
 @patch("holocron.__main__.logger")
-def test_main_exception_logging(mock_logger, mock_sync, mock_get_provider, mock_parse):
+def test_main_exception_logging(mock_logger, mock_sync, mock_get_provider, mock_parse, tmp_path):
     # Test exception within thread execution
-    args = argparse.Namespace(
+    args = make_args(
         watch=False,
         concurrency=1,
         backup_only=False,
-        storage="/tmp",
+        storage=str(tmp_path),
         verbose=False,
         source="github",
         destination="gitlab",
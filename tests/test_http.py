@@ -0,0 +1,85 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from holocron.providers.http import PooledSession
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        body = json.dumps({"auth": self.headers.get("Private-Token")}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_pooled_session_reuses_connections(server):
+    session = PooledSession(headers={"Private-Token": "secret"}, pool_size=2)
+
+    for _ in range(3):
+        r = session.get(f"{server}/projects")
+        assert r.json() == {"auth": "secret"}
+
+    assert session.connection_stats() == {"opened": 1, "reused": 2}
+
+def test_pooled_session_default_timeout():
+    session = PooledSession(timeout=7)
+    with patch("requests.Session.send") as mock_send:
+        session.get("http://example.invalid/")
+        assert mock_send.call_args[1]["timeout"] == 7
+
+        session.get("http://example.invalid/", timeout=1)
+        assert mock_send.call_args[1]["timeout"] == 1
+
+def test_pooled_session_thread_safe(server):
+    session = PooledSession(pool_size=4)
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(10):
+                session.get(f"{server}/projects").raise_for_status()
+        except Exception as e:  # pragma: no cover - only on failure
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    stats = session.connection_stats()
+    assert stats["opened"] <= 4
+    assert stats["opened"] + stats["reused"] == 40
+
+def test_report_usage_is_per_cycle(server):
+    from holocron.providers.gitlab import GitLabProvider
+    provider = GitLabProvider(f"{server}/api/v4", "token")
+
+    with patch("holocron.providers.base.logger") as mock_logger:
+        for _ in range(3):
+            provider.session.get(f"{server}/projects")
+        provider.report_usage("source")
+        assert "1 opened, 2 reused" in mock_logger.debug.call_args[0][0]
+
+        # Next cycle: two requests on the kept-alive connection, not the running totals
+        for _ in range(2):
+            provider.session.get(f"{server}/projects")
+        provider.report_usage("source")
+        assert "0 opened, 2 reused" in mock_logger.debug.call_args[0][0]
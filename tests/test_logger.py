@@ -1,5 +1,6 @@
 import pytest
 import logging
+import logging.handlers
 from unittest.mock import patch, MagicMock
 from holocron.logger import setup_logger, log_execution, logger
 
@@ -46,3 +47,51 @@ def test_log_execution_exception(mock_is_enabled, mock_debug):
     assert mock_debug.called
     args_str = str(mock_debug.call_args_list)
     assert "Exception" in args_str
+
+def test_setup_logger_replaces_handlers():
+    setup_logger(verbose=False)
+    setup_logger(verbose=False)
+    assert len(logger.handlers) == 1
+    assert isinstance(logger.handlers[0], logging.handlers.QueueHandler)
+
+def test_json_lines_output(capsys):
+    import json
+    from holocron.logger import shutdown_logger
+    setup_logger(verbose=True, json_format=True)
+    try:
+        logger.debug("[repo-a] fetch took 1.00s", extra={"repo": "repo-a", "phase": "fetch", "duration_ms": 1000, "outcome": "success"})
+        logger.info("[repo-b] Cloning new mirror...")
+        logger.info("Sync cycle complete.")
+        shutdown_logger()  # flushes the queue
+        lines = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    finally:
+        setup_logger(verbose=False)
+
+    assert lines[0]["repo"] == "repo-a" and lines[0]["phase"] == "fetch" and lines[0]["duration_ms"] == 1000
+    assert lines[0]["outcome"] == "success" and lines[0]["level"] == "debug"
+    # The repo is taken from the message prefix when not given; the other fields are always present
+    assert lines[1]["repo"] == "repo-b" and lines[1]["phase"] is None
+    assert lines[2]["repo"] is None and set(lines[2]) >= {"time", "message", "duration_ms", "outcome"}
+
+def test_log_execution_caps_argument_reprs():
+    class Expensive:
+        reprs = 0
+        def __repr__(self):
+            Expensive.reprs += 1
+            return "x" * 10_000
+
+    @log_execution
+    def run(repos, provider):
+        return len(repos)
+
+    setup_logger(verbose=False)
+    assert run([Expensive()] * 10_000, provider=Expensive()) == 10_000
+    # Not verbose: nothing is rendered at all
+    assert Expensive.reprs == 0
+
+    with patch("holocron.logger.logger.debug") as mock_debug, patch("holocron.logger.logger.isEnabledFor", return_value=True):
+        run([Expensive()] * 10_000, provider=Expensive())
+    call = mock_debug.call_args_list[0][0][1]
+    rendered = str(call)
+    assert len(rendered) < 300 and rendered.startswith("run(")
+    assert Expensive.reprs <= 5
@@ -0,0 +1,90 @@
+import threading
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from holocron.maintenance import Maintainer, maintenance_reason, object_stats, low_priority
+from holocron.mirror import repo_lock, sync_one_repo
+from holocron.providers.base import Repository
+from holocron.state import StateStore
+from conftest import git
+
+@pytest.fixture
+def fragmented(tmp_path):
+    """A bare mirror built from many small fetches: one pack each, plus loose objects."""
+    src = tmp_path / "src"
+    src.mkdir()
+    git("init", "--quiet", cwd=src)
+    storage = tmp_path / "storage"
+    storage.mkdir()
+    mirror = storage / "repo.git"
+    for n in range(12):
+        (src / f"file{n}.txt").write_text(f"{n}\n" * 100)
+        git("add", ".", cwd=src)
+        git("commit", "--quiet", "-m", f"commit {n}", cwd=src)
+        if n == 0:
+            git("clone", "--mirror", "--quiet", str(src), str(mirror))
+        else:
+            # -c fetch.unpackLimit=1 keeps every fetch as its own pack
+            git("-C", str(mirror), "-c", "fetch.unpackLimit=1", "fetch", "--quiet", "origin")
+    return storage, mirror
+
+def test_maintenance_reason():
+    now = datetime(2024, 6, 1)
+    fresh = now - timedelta(days=1)
+    assert maintenance_reason({"packs": 20, "count": 0}, fresh, now) == "20 packs"
+    assert maintenance_reason({"packs": 1, "count": 5000}, fresh, now) == "5000 loose objects"
+    assert maintenance_reason({"packs": 1, "count": 0}, None, now) == "never maintained"
+    assert "8 days" in maintenance_reason({"packs": 1, "count": 0}, now - timedelta(days=8), now)
+    assert maintenance_reason({"packs": 1, "count": 0}, fresh, now) is None
+
+def test_low_priority_prefix():
+    cmd = low_priority(["git", "gc"])
+    assert cmd[-2:] == ["git", "gc"]
+
+def test_maintainer_consolidates_packs(fragmented):
+    storage, mirror = fragmented
+    assert object_stats(str(mirror))["packs"] > 8
+    state = StateStore(":memory:")
+    maintainer = Maintainer(str(storage), state, interval=3600)
+
+    done = maintainer.run_once()
+
+    assert [name for name, _, _ in done] == ["repo"]
+    assert object_stats(str(mirror))["packs"] < 8
+    assert (mirror / "objects" / "info" / "commit-graphs").exists()
+    assert "repo" in state.last_maintenance()
+    # Freshly maintained: nothing to do next round
+    assert maintainer.run_once() == []
+
+def test_maintainer_skips_mirror_being_synced(fragmented):
+    storage, mirror = fragmented
+    maintainer = Maintainer(str(storage), StateStore(":memory:"), interval=3600)
+    lock = repo_lock(str(mirror))
+    lock.acquire()
+    try:
+        assert maintainer.run_once() == []
+    finally:
+        lock.release()
+    assert len(maintainer.run_once()) == 1
+
+def test_sync_waits_for_maintenance(fragmented, tmp_path):
+    storage, mirror = fragmented
+    source_provider = MagicMock()
+    source_provider.get_remote_url.return_value = str(tmp_path / "src")
+    lock = repo_lock(str(mirror))
+    lock.acquire()
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(
+        sync_one_repo(Repository(name="repo", clone_url="url"), storage_path=str(storage), backup_only=True, source_provider=source_provider)
+    ))
+    thread.start()
+    thread.join(timeout=0.2)
+    assert thread.is_alive() and not results
+
+    lock.release()
+    thread.join(timeout=10)
+    assert results and results[0].ok
+    # The sync released the lock
+    assert lock.acquire(blocking=False)
+    lock.release()
@@ -0,0 +1,71 @@
+import requests
+import pytest
+from unittest.mock import MagicMock
+from holocron.metrics import Registry, Counter, Gauge, Histogram, MetricsServer, SYNC_PHASE_SECONDS, API_REQUESTS, API_BUDGET
+from holocron.mirror import create_job, prepare_stage
+from holocron.providers.base import Repository
+from holocron.providers.http import PooledSession
+from holocron.providers.ratelimit import RateLimitGovernor
+
+def test_render_exposition_format():
+    registry = Registry()
+    requests_total = Counter("t_requests_total", "Requests.", ["provider", "status"], registry=registry)
+    depth = Gauge("t_depth", "Depth.", ["stage"], registry=registry)
+    duration = Histogram("t_seconds", "Duration.", ["phase"], buckets=(1, 5), registry=registry)
+
+    requests_total.inc(provider="github", status=200)
+    requests_total.inc(2, provider="github", status=200)
+    depth.set(3, stage='a"b')
+    depth.dec(stage='a"b')
+    duration.observe(0.5, phase="fetch")
+    duration.observe(3, phase="fetch")
+    duration.observe(10, phase="fetch")
+
+    text = registry.render()
+    assert "# TYPE t_requests_total counter" in text
+    assert 't_requests_total{provider="github",status="200"} 3' in text
+    assert 't_depth{stage="a\\"b"} 2' in text
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{phase="fetch",le="1"} 1' in text
+    assert 't_seconds_bucket{phase="fetch",le="5"} 2' in text
+    assert 't_seconds_bucket{phase="fetch",le="+Inf"} 3' in text
+    assert 't_seconds_sum{phase="fetch"} 13.5' in text
+    assert 't_seconds_count{phase="fetch"} 3' in text
+    assert duration.value(phase="fetch") == (3, 13.5)
+
+    with pytest.raises(ValueError):
+        requests_total.inc(provider="github")
+
+def test_metrics_server():
+    registry = Registry()
+    Gauge("t_up", "Up.", registry=registry).set(1)
+    server = MetricsServer("127.0.0.1", 0, registry)
+    server.start()
+    try:
+        response = requests.get(f"http://127.0.0.1:{server.port}/metrics", timeout=5)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert "t_up 1" in response.text
+        assert requests.get(f"http://127.0.0.1:{server.port}/other", timeout=5).status_code == 404
+    finally:
+        server.stop()
+
+def test_phase_and_api_metrics_are_recorded():
+    repo = Repository(name="metered", clone_url="https://example.com/metered.git")
+    provider = MagicMock()
+    provider.get_remote_url.return_value = "https://example.com/metered.git"
+    job = create_job(repo, "/tmp/unused", source_provider=provider, destination_provider=provider)
+    job.push_needed = True
+
+    count, _ = SYNC_PHASE_SECONDS.value(phase="prepare_push")
+    prepare_stage(job)
+    assert SYNC_PHASE_SECONDS.value(phase="prepare_push")[0] == count + 1
+
+    session = PooledSession(governor=RateLimitGovernor("metered"))
+    response = MagicMock(status_code=200, headers={"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "4999"})
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("requests.Session.request", lambda self, method, url, **kwargs: response)
+        session.get("https://api.example.com/")
+    assert API_REQUESTS.value(provider="metered", status="200") == 1
+    assert API_BUDGET.value(provider="metered", kind="remaining") == 4999
+    assert API_BUDGET.value(provider="metered", kind="limit") == 5000
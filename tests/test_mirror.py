@@ -1,9 +1,11 @@
+import os
 import pytest
 import subprocess
 from datetime import datetime, timedelta, timezone
 from unittest.mock import MagicMock, patch
-from holocron.mirror import needs_sync, sync_one_repo
+from holocron.mirror import Call, Git, needs_sync, run_plan, sync_one_repo
 from holocron.providers.base import Repository
+from conftest import git
 
 def test_needs_sync_true():
     # 5 minutes ago
@@ -112,9 +114,10 @@ def test_sync_one_repo_checkout_failure(mock_logger, mock_exists, mock_makedirs,
     # 2. checkout_dir exists (True) -> Pull
     mock_exists.return_value = True
     
-    # Fetch succeeds, Pull fails
+    # Pre-check reports nothing, Fetch succeeds, Pull fails
+    ls_remote = subprocess.CompletedProcess(["git", "ls-remote"], 0, stdout="")
     err = subprocess.CalledProcessError(1, ["git", "pull"], stderr=b"Merge conflict")
-    mock_run.side_effect = [None, err]  # 1st call (fetch), 2nd call (pull)
+    mock_run.side_effect = [ls_remote, None, err]  # ls-remote, fetch, pull
 
     sync_one_repo(repo, storage_path="/tmp", backup_only=True, checkout=True, source_provider=source_provider)
     
@@ -169,3 +172,200 @@ def test_sync_one_repo_full_flow_success(mock_logger, mock_exists, mock_makedirs
     assert any("remote" in cmd for cmd in cmds)
     assert any("push" in cmd for cmd in cmds)
     assert any("pull" in cmd for cmd in cmds)
+
+@pytest.fixture
+def source_repo(tmp_path):
+    """A real (non-bare) source repository with one commit."""
+    src = tmp_path / "src"
+    src.mkdir()
+    git("init", "--quiet", cwd=src)
+    (src / "README.md").write_text("hello\n")
+    git("add", ".", cwd=src)
+    git("commit", "--quiet", "-m", "initial", cwd=src)
+    return src
+
+def test_sync_skips_fetch_when_source_unchanged(source_repo, tmp_path):
+    repo = Repository(name="src", clone_url=str(source_repo))
+    source_provider = MagicMock()
+    source_provider.get_remote_url.return_value = str(source_repo)
+    storage = str(tmp_path / "mirror")
+
+    first = sync_one_repo(repo, storage_path=storage, backup_only=True, source_provider=source_provider)
+    assert first.ok and first.fetched
+
+    second = sync_one_repo(repo, storage_path=storage, backup_only=True, source_provider=source_provider)
+    assert second.ok and not second.fetched
+    assert second.source_tip == first.source_tip
+
+    # A new commit is picked up
+    (source_repo / "README.md").write_text("changed\n")
+    git("commit", "--quiet", "-am", "change", cwd=source_repo)
+    third = sync_one_repo(repo, storage_path=storage, backup_only=True, source_provider=source_provider)
+    assert third.ok and third.fetched
+    assert third.source_tip != first.source_tip
+
+def test_worktree_checkout_shares_mirror_objects(source_repo, tmp_path):
+    repo = Repository(name="src", clone_url=str(source_repo), default_branch="main")
+    source_provider = MagicMock()
+    source_provider.get_remote_url.return_value = str(source_repo)
+    storage = str(tmp_path / "mirror")
+
+    first = sync_one_repo(repo, storage_path=storage, backup_only=True, checkout=True, source_provider=source_provider, checkout_mode="worktree")
+    assert first.ok
+    checkout = tmp_path / "mirror" / "src"
+    # Attached to the mirror: `.git` is a file, the objects stay in the mirror
+    assert (checkout / ".git").is_file()
+    assert not (checkout / "objects").exists()
+    assert (checkout / "README.md").read_text() == "hello\n"
+
+    (source_repo / "README.md").write_text("changed\n")
+    git("commit", "--quiet", "-am", "change", cwd=source_repo)
+    second = sync_one_repo(repo, storage_path=storage, backup_only=True, checkout=True, source_provider=source_provider, checkout_mode="worktree")
+    assert second.ok and second.fetched
+    assert (checkout / "README.md").read_text() == "changed\n"
+
+    # The mirror still accepts fetches into the branch the worktree shows
+    (source_repo / "README.md").write_text("again\n")
+    git("commit", "--quiet", "-am", "again", cwd=source_repo)
+    third = sync_one_repo(repo, storage_path=storage, backup_only=True, checkout=True, source_provider=source_provider, checkout_mode="worktree")
+    assert third.ok
+    assert (checkout / "README.md").read_text() == "again\n"
+
+def _plan(*outcomes):
+    """side_effect for a patched plan step: each call returns (or raises) the next outcome, without running git."""
+    outcomes = list(outcomes)
+
+    def plan(*args, **kwargs):
+        outcome = outcomes.pop(0) if len(outcomes) > 1 else outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+        yield  # makes this a generator, like the plan it stands in for
+    return plan
+
+@patch("holocron.mirror._push_to_destination")
+@patch("holocron.mirror._source_unchanged")
+@patch("os.path.exists")
+def test_sync_skips_push_when_destination_up_to_date(mock_exists, mock_unchanged, mock_push):
+    from holocron.refs import refs_digest
+    from holocron.state import RepoState
+
+    repo = Repository(name="repo", clone_url="url")
+    source_provider = MagicMock()
+    destination_provider = MagicMock()
+    mock_exists.return_value = True
+    mock_unchanged.side_effect = _plan(True)
+    mock_push.side_effect = _plan(None)
+
+    # /nonexistent has no refs, so its digest is the digest of {}
+    up_to_date = RepoState(name="repo", destination_tip=refs_digest({}))
+    result = sync_one_repo(repo, storage_path="/nonexistent", source_provider=source_provider,
+                           destination_provider=destination_provider, last_state=up_to_date)
+    assert result.ok and not result.fetched
+    mock_push.assert_not_called()
+    destination_provider.prepare_push.assert_not_called()
+
+    # Destination behind (e.g. last push failed): push even though the source is unchanged
+    behind = RepoState(name="repo", destination_tip="stale")
+    sync_one_repo(repo, storage_path="/nonexistent", source_provider=source_provider,
+                  destination_provider=destination_provider, last_state=behind)
+    mock_push.assert_called_once()
+
+def test_incremental_push(source_repo, tmp_path):
+    from holocron.refs import read_local_refs
+    from holocron.state import RepoState
+
+    dest = tmp_path / "dest.git"
+    git("init", "--quiet", "--bare", str(dest))
+    git("tag", "v1", cwd=source_repo)
+    git("tag", "v2", cwd=source_repo)
+
+    repo = Repository(name="src", clone_url=str(source_repo))
+    source_provider = MagicMock()
+    source_provider.get_remote_url.return_value = str(source_repo)
+    destination_provider = MagicMock()
+    destination_provider.get_remote_url.return_value = str(dest)
+    storage = str(tmp_path / "mirror")
+
+    # 1. First sync: destination state unknown -> full mirror push
+    with patch("subprocess.run", wraps=subprocess.run) as spy:
+        first = sync_one_repo(repo, storage_path=storage, source_provider=source_provider, destination_provider=destination_provider)
+    cmds = [c[0][0] for c in spy.call_args_list]
+    assert first.ok
+    assert any("--mirror" in cmd and "push" in cmd for cmd in cmds)
+    assert any("set-url" in cmd for cmd in cmds)
+
+    # 2. Move main, delete a tag
+    (source_repo / "README.md").write_text("changed\n")
+    git("commit", "--quiet", "-am", "change", cwd=source_repo)
+    git("tag", "-d", "v2", cwd=source_repo)
+
+    last_state = RepoState(name="src", destination_tip=first.destination_tip)
+    with patch("subprocess.run", wraps=subprocess.run) as spy:
+        second = sync_one_repo(repo, storage_path=storage, source_provider=source_provider,
+                               destination_provider=destination_provider, last_state=last_state)
+    cmds = [c[0][0] for c in spy.call_args_list]
+    push = next(cmd for cmd in cmds if "push" in cmd)
+    assert second.ok
+    assert "--mirror" not in push
+    assert push[-2:] == ["+refs/heads/main:refs/heads/main", ":refs/tags/v2"]
+    # Push URL is already correct
+    assert not any("set-url" in cmd for cmd in cmds)
+    assert read_local_refs(str(dest)) == read_local_refs(os.path.join(storage, "src.git"))
+
+    # 3. Nothing changed: no push at all
+    last_state = RepoState(name="src", destination_tip=second.destination_tip)
+    with patch("subprocess.run", wraps=subprocess.run) as spy:
+        third = sync_one_repo(repo, storage_path=storage, source_provider=source_provider,
+                              destination_provider=destination_provider, last_state=last_state)
+    assert third.ok
+    assert not any("push" in c[0][0] for c in spy.call_args_list)
+    destination_provider.prepare_push.assert_called()
+    assert destination_provider.prepare_push.call_count == 2
+
+@patch("holocron.mirror._push_to_destination")
+@patch("holocron.mirror._ensure_local_mirror")
+def test_protected_rejection_invalidates_and_retries(mock_mirror, mock_push):
+    repo = Repository(name="repo", clone_url="url")
+    source_provider = MagicMock()
+    destination_provider = MagicMock()
+    mock_mirror.side_effect = _plan(True)
+
+    rejected = subprocess.CalledProcessError(
+        1, ["git", "push"],
+        stderr="remote: GitLab: You are not allowed to force push code to a protected branch on this project."
+    )
+    mock_push.side_effect = _plan(rejected, None)
+
+    result = sync_one_repo(repo, storage_path="/nonexistent", source_provider=source_provider, destination_provider=destination_provider)
+
+    assert result.ok
+    destination_provider.invalidate_protection.assert_called_once_with(repo)
+    assert destination_provider.prepare_push.call_count == 2
+    assert mock_push.call_count == 2
+
+@patch("holocron.mirror._push_to_destination")
+@patch("holocron.mirror._ensure_local_mirror")
+@patch("holocron.mirror.logger")
+def test_other_push_errors_are_not_retried(mock_logger, mock_mirror, mock_push):
+    repo = Repository(name="repo", clone_url="url")
+    destination_provider = MagicMock()
+    mock_mirror.side_effect = _plan(True)
+    mock_push.side_effect = _plan(subprocess.CalledProcessError(128, ["git", "push"], stderr="fatal: Authentication failed"))
+
+    result = sync_one_repo(repo, storage_path="/nonexistent", source_provider=MagicMock(), destination_provider=destination_provider)
+
+    assert not result.ok
+    destination_provider.invalidate_protection.assert_not_called()
+    assert mock_push.call_count == 1
+
+def test_run_plan_sends_results_and_errors():
+    def plan():
+        out = yield Git(["git", "--version"], capture=True)
+        total = yield Call(lambda a, b: a + b, 2, 3)
+        try:
+            yield Git(["git", "rev-parse", "--verify", "no-such-ref"])
+        except subprocess.CalledProcessError as e:
+            return out.startswith("git version"), total, bool(e.stderr)
+
+    assert run_plan(plan()) == (True, 5, True)
@@ -0,0 +1,90 @@
+import subprocess
+import threading
+from unittest.mock import MagicMock, patch
+from holocron.__main__ import run_sync_cycle
+from holocron.pipeline import Pipeline, Stage
+from holocron.providers.base import Repository
+from holocron.state import StateStore
+
+def test_pipeline_runs_every_stage():
+    seen = []
+    lock = threading.Lock()
+
+    def record(stage):
+        def func(item):
+            with lock:
+                seen.append((stage, item))
+        return func
+
+    pipeline = Pipeline([Stage("a", record("a"), 2), Stage("b", record("b"), 1)])
+    results = list(pipeline.run(range(10)))
+
+    assert sorted(item for item, _ in results) == list(range(10))
+    assert all(exc is None for _, exc in results)
+    for item in range(10):
+        assert seen.index(("a", item)) < seen.index(("b", item))
+    assert set(pipeline.busy) == {"a", "b"}
+
+def test_pipeline_error_skips_later_stages():
+    later = MagicMock()
+
+    def fail_odd(item):
+        if item % 2:
+            raise ValueError(f"bad {item}")
+
+    pipeline = Pipeline([Stage("check", fail_odd, 1), Stage("later", later, 1)])
+    results = dict(pipeline.run(range(4)))
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], ValueError)
+    assert sorted(call.args[0] for call in later.call_args_list) == [0, 2]
+
+def test_pipeline_stages_overlap():
+    # The slow stage holds its only worker, yet the fast stage keeps going
+    release = threading.Event()
+    fetched = []
+
+    def fetch(item):
+        fetched.append(item)
+        if len(fetched) == 3:
+            release.set()
+
+    def push(item):
+        release.wait(timeout=5)
+
+    pipeline = Pipeline([Stage("fetch", fetch, 1), Stage("push", push, 1)], queue_size=8)
+    results = list(pipeline.run(range(3)))
+
+    assert len(results) == 3
+    assert release.is_set()
+
+def test_pipeline_no_items():
+    pipeline = Pipeline([Stage("a", MagicMock(), 3)])
+    assert list(pipeline.run([])) == []
+
+@patch("holocron.__main__.push_stage")
+@patch("holocron.__main__.prepare_stage")
+@patch("holocron.__main__.fetch_stage")
+def test_run_sync_cycle_pipeline_engine(mock_fetch, mock_prepare, mock_push, tmp_path):
+    def fetch(job):
+        if job.repo.name == "broken":
+            raise subprocess.CalledProcessError(128, ["git", "fetch"], stderr="not found")
+
+    mock_fetch.side_effect = fetch
+    source = MagicMock()
+    source.fetch_repos.return_value = [
+        Repository(name="ok", clone_url="url"),
+        Repository(name="broken", clone_url="url"),
+    ]
+    config = {
+        "concurrency": 2, "storage": str(tmp_path), "watch": False, "window": 10, "interval": 60,
+        "backup_only": True, "dry_run": False, "checkout": False, "engine": "pipeline",
+        "fetch_concurrency": 1, "prepare_concurrency": None, "push_concurrency": 3
+    }
+    state = StateStore(":memory:")
+
+    assert run_sync_cycle(config, source, None, state) == 1
+    assert mock_prepare.call_count == 1
+    assert mock_push.call_count == 1
+    assert state.get("ok").error is None
+    assert "not found" in state.get("broken").error
@@ -0,0 +1,145 @@
+import os
+import shutil
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+from holocron.mirror import sync_one_repo
+from holocron.pools import pool_dir
+from holocron.providers.base import Repository
+from holocron.providers.github import GitHubProvider
+from holocron.providers.gitlab import GitLabProvider
+from conftest import git
+
+def _objects_size(repo_dir):
+    total = 0
+    for dirpath, _, filenames in os.walk(os.path.join(repo_dir, "objects")):
+        total += sum(os.path.getsize(os.path.join(dirpath, f)) for f in filenames)
+    return total
+
+@pytest.fixture
+def network(tmp_path):
+    """An upstream with a sizeable history and a fork of it with one extra commit."""
+    upstream = tmp_path / "upstream"
+    upstream.mkdir()
+    git("init", "--quiet", cwd=upstream)
+    for n in range(5):
+        (upstream / f"data{n}.bin").write_bytes(os.urandom(64 * 1024))
+        git("add", ".", cwd=upstream)
+        git("commit", "--quiet", "-m", f"commit {n}", cwd=upstream)
+
+    fork = tmp_path / "fork"
+    git("clone", "--quiet", str(upstream), str(fork))
+    (fork / "patch.txt").write_text("fork change\n")
+    git("add", ".", cwd=fork)
+    git("commit", "--quiet", "-m", "fork change", cwd=fork)
+    return upstream, fork
+
+def _sync(repo, storage, url):
+    source_provider = MagicMock()
+    # file:// forces a real transfer; a plain path would be hardlinked whatever --reference says
+    source_provider.get_remote_url.return_value = f"file://{url}"
+    source_provider.fork_parent.side_effect = lambda repo: repo.fork_parent
+    return sync_one_repo(repo, storage_path=str(storage), backup_only=True, source_provider=source_provider, fork_pools=True)
+
+def test_fork_is_cloned_against_pool(network, tmp_path):
+    upstream, fork = network
+    storage = tmp_path / "storage"
+
+    assert _sync(Repository(name="upstream", clone_url="url"), storage, upstream).ok
+    result = _sync(Repository(name="fork", clone_url="url", fork_parent="someone/upstream"), storage, fork)
+    assert result.ok
+
+    pool = pool_dir(str(storage), "someone/upstream")
+    fork_mirror = storage / "fork.git"
+    assert (fork_mirror / "objects" / "info" / "alternates").read_text().strip() == os.path.join(pool, "objects")
+    # Only the fork's own commit was transferred
+    assert _objects_size(fork_mirror) < _objects_size(storage / "upstream.git") / 10
+    # The pool now references the fork's objects too
+    assert "refs/members/fork/heads/main" in git("-C", pool, "for-each-ref", "--format=%(refname)")
+
+    # Losing the parent mirror (or repacking/pruning it) does not affect the fork
+    shutil.rmtree(storage / "upstream.git")
+    git("-C", str(fork_mirror), "fsck", "--no-dangling")
+
+def test_pool_keeps_force_pushed_objects(network, tmp_path):
+    upstream, fork = network
+    storage = tmp_path / "storage"
+    repo = Repository(name="fork", clone_url="url", fork_parent="someone/upstream")
+    _sync(Repository(name="upstream", clone_url="url"), storage, upstream)
+    _sync(repo, storage, fork)
+    old_tip = git("-C", str(fork), "rev-parse", "HEAD").strip()
+
+    git("reset", "--quiet", "--hard", "HEAD~1", cwd=fork)
+    (fork / "other.txt").write_text("rewritten\n")
+    git("add", ".", cwd=fork)
+    git("commit", "--quiet", "-m", "rewritten", cwd=fork)
+    assert _sync(repo, storage, fork).ok
+
+    pool = pool_dir(str(storage), "someone/upstream")
+    git("-C", pool, "cat-file", "-e", old_tip)
+
+def test_non_forks_do_not_use_pools(network, tmp_path):
+    upstream, _ = network
+    storage = tmp_path / "storage"
+    assert _sync(Repository(name="upstream", clone_url="url"), storage, upstream).ok
+    assert not (storage / "upstream.git" / "objects" / "info" / "alternates").exists()
+    assert not (storage / ".holocron" / "pools").exists()
+
+@patch("requests.Session.get")
+def test_github_fork_parent_is_looked_up_lazily(mock_get):
+    detail = Mock()
+    detail.json.return_value = {"parent": {"full_name": "torvalds/linux"}}
+    detail.raise_for_status.return_value = None
+    mock_get.return_value = detail
+    provider = GitHubProvider(token="t")
+    item = {"id": 1, "name": "linux", "full_name": "me/linux", "clone_url": "https://github.com/me/linux.git", "fork": True}
+
+    # Listing only flags the fork
+    repo = provider._to_repository(item)
+    assert repo.fork and repo.fork_parent is None
+    mock_get.assert_not_called()
+
+    assert provider.fork_parent(repo) == "torvalds/linux"
+    assert provider.fork_parent(repo) == "torvalds/linux"
+    assert mock_get.call_args[0][0] == "https://api.github.com/repos/me/linux"
+    assert mock_get.call_count == 1
+    assert provider.fork_parent(provider._to_repository({**item, "fork": False})) is None
+
+    # Failed lookups are remembered too
+    mock_get.side_effect = Exception("403 SAML enforcement")
+    other = provider._to_repository({**item, "clone_url": "https://github.com/me/other.git"})
+    assert provider.fork_parent(other) is None
+    assert provider.fork_parent(other) is None
+    assert mock_get.call_count == 2
+
+def test_fork_parent_only_resolved_for_new_fork_clones(network, tmp_path):
+    upstream, fork = network
+    storage = tmp_path / "storage"
+    source_provider = MagicMock()
+    source_provider.get_remote_url.side_effect = lambda repo: f"file://{upstream if repo.name == 'upstream' else fork}"
+    source_provider.fork_parent.return_value = "someone/upstream"
+    repo = Repository(name="fork", clone_url="url", fork=True)
+
+    def sync(repo, fork_pools=True):
+        return sync_one_repo(repo, storage_path=str(storage), backup_only=True, source_provider=source_provider, fork_pools=fork_pools)
+
+    # Without --fork-pools, never looked up
+    assert sync(Repository(name="upstream", clone_url="url"), fork_pools=False).ok
+    assert sync(repo).ok
+    assert source_provider.fork_parent.call_count == 1
+    assert (storage / "fork.git" / "objects" / "info" / "alternates").exists()
+
+    # Later syncs fetch and feed the pool without asking again
+    (fork / "more.txt").write_text("more\n")
+    git("add", ".", cwd=fork)
+    git("commit", "--quiet", "-m", "more", cwd=fork)
+    assert sync(repo).ok
+    assert source_provider.fork_parent.call_count == 1
+    assert "refs/members/fork/heads/main" in git("-C", pool_dir(str(storage), "someone/upstream"), "for-each-ref", "--format=%(refname)")
+
+def test_gitlab_fork_parent():
+    provider = GitLabProvider("http://gitlab.local/api/v4", "t")
+    repo = provider._to_repository({
+        "id": 2, "path": "tools", "http_url_to_repo": "url",
+        "forked_from_project": {"path_with_namespace": "infra/tools"}
+    })
+    assert repo.fork_parent == "infra/tools" and repo.fork
@@ -0,0 +1,110 @@
+import pytest
+import requests
+from unittest.mock import Mock, patch
+from holocron.providers.http import PooledSession
+from holocron.providers.ratelimit import RateLimitGovernor
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def _response(status=200, headers=None):
+    resp = Mock()
+    resp.status_code = status
+    resp.headers = headers or {}
+    return resp
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_governor_reads_github_headers(clock):
+    gov = RateLimitGovernor("github", sleep=clock.sleep, clock=clock)
+    gov.observe(_response(headers={'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': '4999', 'X-RateLimit-Reset': '4600'}))
+    assert gov.status() == {"limit": 5000, "remaining": 4999, "reset_at": 4600.0, "retries": 0}
+
+    # Plenty of budget: no waiting
+    gov.wait()
+    assert clock.sleeps == []
+
+def test_governor_reads_gitlab_headers(clock):
+    gov = RateLimitGovernor("gitlab", sleep=clock.sleep, clock=clock)
+    gov.observe(_response(headers={'RateLimit-Limit': '600', 'RateLimit-Remaining': '42', 'RateLimit-Reset': '1060'}))
+    assert gov.status()["remaining"] == 42
+
+def test_governor_waits_for_reset_when_exhausted(clock):
+    gov = RateLimitGovernor("github", reserve=10, sleep=clock.sleep, clock=clock)
+    gov.observe(_response(headers={'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': '10', 'X-RateLimit-Reset': '1300'}))
+    gov.wait()
+    assert clock.sleeps == [300.0]
+
+def test_governor_paces_low_budget(clock):
+    gov = RateLimitGovernor("github", reserve=0, pace_below=0.1, sleep=clock.sleep, clock=clock)
+    # 100 requests left for the next 100 seconds -> ~1 request per second
+    gov.observe(_response(headers={'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': '100', 'X-RateLimit-Reset': '1100'}))
+    gov.wait()
+    gov.wait()
+    assert clock.sleeps[0] == pytest.approx(1.0, rel=0.05)
+
+def test_governor_honours_retry_after(clock):
+    gov = RateLimitGovernor("gitlab", sleep=clock.sleep, clock=clock)
+    gov.observe(_response(status=429, headers={'Retry-After': '30'}))
+    gov.wait()
+    assert clock.sleeps == [30.0]
+
+def test_governor_github_403_exhausted_is_rate_limited(clock):
+    gov = RateLimitGovernor("github", sleep=clock.sleep, clock=clock)
+    resp = _response(status=403, headers={'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '1060'})
+    assert gov.should_retry(resp, 0)
+    # A plain 403 (missing scope) is not
+    assert not gov.should_retry(_response(status=403), 0)
+
+@patch("requests.Session.request")
+def test_session_retries_transient_errors(mock_request, clock):
+    gov = RateLimitGovernor("gitlab", sleep=clock.sleep, clock=clock)
+    mock_request.side_effect = [_response(status=502), _response(status=200)]
+
+    session = PooledSession(governor=gov)
+    r = session.get("http://gitlab.local/api/v4/projects")
+
+    assert r.status_code == 200
+    assert mock_request.call_count == 2
+    assert gov.status()["retries"] == 1
+    assert len(clock.sleeps) == 1 and clock.sleeps[0] <= 1.0  # jittered, first backoff capped by base_delay
+
+@patch("requests.Session.request")
+def test_session_retries_connection_errors(mock_request, clock):
+    gov = RateLimitGovernor("github", sleep=clock.sleep, clock=clock)
+    mock_request.side_effect = [requests.ConnectionError("reset"), _response(status=200)]
+
+    r = PooledSession(governor=gov).get("https://api.github.com/user/repos")
+    assert r.status_code == 200
+
+@patch("requests.Session.request")
+def test_session_gives_up_after_max_retries(mock_request, clock):
+    gov = RateLimitGovernor("github", max_retries=2, sleep=clock.sleep, clock=clock)
+    mock_request.return_value = _response(status=503)
+
+    r = PooledSession(governor=gov).get("https://api.github.com/user/repos")
+    assert r.status_code == 503
+    assert mock_request.call_count == 3
+
+@patch("requests.Session.request")
+def test_session_waits_for_rate_limit_reset(mock_request, clock):
+    gov = RateLimitGovernor("github", sleep=clock.sleep, clock=clock)
+    mock_request.side_effect = [
+        _response(status=429, headers={'Retry-After': '5'}),
+        _response(status=200)
+    ]
+
+    r = PooledSession(governor=gov).get("https://api.github.com/user/repos")
+    assert r.status_code == 200
+    assert clock.sleeps == [5.0]
@@ -0,0 +1,53 @@
+import os
+from holocron.refs import read_local_refs, refs_digest
+
+def test_read_local_refs_packed_and_loose(tmp_path):
+    (tmp_path / "packed-refs").write_text(
+        "# pack-refs with: peeled fully-peeled sorted\n"
+        "1111111111111111111111111111111111111111 refs/heads/main\n"
+        "2222222222222222222222222222222222222222 refs/tags/v1\n"
+        "^3333333333333333333333333333333333333333\n"
+    )
+    heads = tmp_path / "refs" / "heads"
+    heads.mkdir(parents=True)
+    # Loose ref overrides packed one
+    (heads / "main").write_text("4444444444444444444444444444444444444444\n")
+    (tmp_path / "refs" / "remotes").mkdir()
+    (tmp_path / "refs" / "remotes" / "HEAD").write_text("ref: refs/heads/main\n")
+
+    refs = read_local_refs(str(tmp_path))
+    assert refs == {
+        "refs/heads/main": "4444444444444444444444444444444444444444",
+        "refs/tags/v1": "2222222222222222222222222222222222222222",
+    }
+
+def test_read_local_refs_missing_repo(tmp_path):
+    assert read_local_refs(str(tmp_path / "missing.git")) == {}
+
+def test_refs_digest_is_order_independent():
+    a = {"refs/heads/a": "1", "refs/heads/b": "2"}
+    b = {"refs/heads/b": "2", "refs/heads/a": "1"}
+    assert refs_digest(a) == refs_digest(b)
+    assert refs_digest(a) != refs_digest({"refs/heads/a": "1"})
+
+def test_parse_ls_remote():
+    out = (
+        "1111111111111111111111111111111111111111\tHEAD\n"
+        "1111111111111111111111111111111111111111\trefs/heads/main\n"
+        "2222222222222222222222222222222222222222\trefs/tags/v1\n"
+        "3333333333333333333333333333333333333333\trefs/tags/v1^{}\n"
+    )
+    from holocron.refs import parse_ls_remote
+    assert parse_ls_remote(out) == {
+        "refs/heads/main": "1111111111111111111111111111111111111111",
+        "refs/tags/v1": "2222222222222222222222222222222222222222",
+    }
+
+def test_diff_refs():
+    from holocron.refs import diff_refs
+    before = {"refs/heads/main": "1", "refs/heads/old": "2", "refs/tags/v1": "3"}
+    after = {"refs/heads/main": "4", "refs/tags/v1": "3", "refs/heads/new": "5"}
+    updated, deleted = diff_refs(before, after)
+    assert updated == {"refs/heads/main": "4", "refs/heads/new": "5"}
+    assert deleted == ["refs/heads/old"]
+    assert diff_refs(after, after) == ({}, [])
@@ -0,0 +1,75 @@
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from holocron.__main__ import run_sync_cycle
+from holocron.mirror import SyncResult
+from holocron.providers.base import Repository
+from holocron.scheduler import predict_cost, predict_makespan, plan_cycle, check_deadline, BASE_COST, CLONE_THROUGHPUT
+from holocron.state import RepoState, StateStore
+
+def test_predict_cost_new_mirror_scales_with_size():
+    small = Repository(name="small", clone_url="url", size=0)
+    big = Repository(name="big", clone_url="url", size=CLONE_THROUGHPUT * 100)
+    assert predict_cost(small, mirror_exists=False) == BASE_COST
+    assert predict_cost(big, mirror_exists=False) == BASE_COST + 100
+
+def test_predict_cost_uses_history():
+    repo = Repository(name="repo", clone_url="url", size=10**9)
+    assert predict_cost(repo, RepoState(name="repo", duration=7.5)) == 7.5
+    assert predict_cost(repo, None) == BASE_COST
+
+def test_predict_makespan():
+    assert predict_makespan([], 4) == 0
+    assert predict_makespan([10, 1, 1, 1], 2) == 10
+    assert predict_makespan([5, 5, 5], 1) == 15
+    # LPT beats submitting the long job last
+    assert predict_makespan([10, 4, 4, 4], 2) < predict_makespan([4, 4, 4, 10], 2)
+
+def test_plan_cycle_longest_first(tmp_path):
+    (tmp_path / "known.git").mkdir()
+    repos = [
+        Repository(name="known", clone_url="url"),
+        Repository(name="monorepo", clone_url="url", size=CLONE_THROUGHPUT * 600),
+        Repository(name="tiny", clone_url="url", size=1),
+    ]
+    known = {"known": RepoState(name="known", duration=30.0)}
+
+    plan = plan_cycle(repos, known, str(tmp_path), workers=2)
+
+    assert [job.repo.name for job in plan.jobs] == ["monorepo", "known", "tiny"]
+    assert plan.makespan == pytest.approx(BASE_COST + 600)
+
+@patch("holocron.scheduler.logger")
+def test_check_deadline_warns(mock_logger, tmp_path):
+    repos = [Repository(name="monorepo", clone_url="url", size=CLONE_THROUGHPUT * 600)]
+    plan = plan_cycle(repos, {}, str(tmp_path), workers=4)
+
+    check_deadline(plan, interval=60)
+    assert "monorepo" in mock_logger.warning.call_args[0][0]
+
+    mock_logger.reset_mock()
+    check_deadline(plan, interval=3600)
+    mock_logger.warning.assert_not_called()
+
+@patch("holocron.__main__.sync_one_repo")
+def test_run_sync_cycle_dispatches_lpt(mock_sync, tmp_path):
+    order = []
+
+    def sync(repo, **kwargs):
+        order.append(repo.name)
+        return SyncResult(name=repo.name)
+
+    mock_sync.side_effect = sync
+    source = MagicMock()
+    source.fetch_repos.return_value = [
+        Repository(name="a", clone_url="url", size=10),
+        Repository(name="b", clone_url="url", size=CLONE_THROUGHPUT * 50),
+        Repository(name="c", clone_url="url", size=CLONE_THROUGHPUT * 5),
+    ]
+    config = {
+        "concurrency": 1, "storage": str(tmp_path), "watch": False, "window": 10, "interval": 60,
+        "backup_only": True, "dry_run": False, "checkout": False, "engine": "threaded"
+    }
+
+    assert run_sync_cycle(config, source, None, StateStore(":memory:")) == 3
+    assert order == ["b", "c", "a"]
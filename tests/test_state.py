@@ -0,0 +1,95 @@
+import os
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from holocron.__main__ import run_sync_cycle
+from holocron.mirror import SyncResult
+from holocron.providers.base import Repository
+from holocron.state import StateStore, default_state_path
+
+@pytest.fixture
+def state_path(tmp_path):
+    return default_state_path(str(tmp_path))
+
+def test_state_record_success_roundtrip(state_path):
+    pushed_at = datetime(2024, 1, 1, 12, 0, 0)
+    store = StateStore(state_path)
+    store.record_success("repo", pushed_at=pushed_at, source_tip="abc", destination_tip="abc", duration=1.5)
+    store.close()
+
+    # Reopen to prove it is durable
+    store = StateStore(state_path)
+    state = store.get("repo")
+    assert state.pushed_at == pushed_at
+    assert state.source_tip == "abc"
+    assert state.destination_tip == "abc"
+    assert state.duration == 1.5
+    assert state.error is None
+    assert state.synced_at is not None
+
+def test_state_record_failure_keeps_last_push(state_path):
+    pushed_at = datetime(2024, 1, 1, 12, 0, 0)
+    store = StateStore(state_path)
+    store.record_success("repo", pushed_at=pushed_at, source_tip="abc", duration=1.0)
+    store.record_failure("repo", "Authentication failed")
+
+    state = store.get("repo")
+    assert state.pushed_at == pushed_at
+    assert state.source_tip == "abc"
+    assert state.duration == 1.0
+    assert state.error == "Authentication failed"
+
+    # Next success clears the error
+    store.record_success("repo", pushed_at=pushed_at, source_tip="def", duration=2.0)
+    assert store.get("repo").error is None
+
+def test_state_backup_only_success_keeps_destination_tip(state_path):
+    store = StateStore(state_path)
+    store.record_success("repo", source_tip="abc", destination_tip="abc")
+    store.record_success("repo", source_tip="def")
+    assert store.get("repo").destination_tip == "abc"
+
+def test_state_load(state_path):
+    store = StateStore(state_path)
+    store.record_success("a")
+    store.record_failure("b", "boom")
+    assert set(store.load()) == {"a", "b"}
+    assert store.get("missing") is None
+
+@patch("holocron.__main__.sync_one_repo")
+def test_restart_resumes_with_warm_state(mock_sync, tmp_path):
+    config = {
+        "concurrency": 1, "storage": str(tmp_path), "watch": True, "window": 10, "interval": 60,
+        "backup_only": True, "dry_run": False, "checkout": False, "engine": "threaded"
+    }
+    repo = Repository(name="repo1", clone_url="url", pushed_at=datetime(2024, 1, 1))
+    source = MagicMock()
+    source.fetch_repos.return_value = [repo]
+    mock_sync.return_value = SyncResult(name="repo1", source_tip="abc", duration=0.1)
+
+    # First daemon run syncs the repo
+    store = StateStore(default_state_path(str(tmp_path)))
+    assert run_sync_cycle(config, source, None, store) == 1
+    store.close()
+
+    # A restarted daemon remembers it
+    store = StateStore(default_state_path(str(tmp_path)))
+    assert run_sync_cycle(config, source, None, store) == 0
+    assert mock_sync.call_count == 1
+
+@patch("holocron.__main__.sync_one_repo")
+def test_failed_sync_is_retried(mock_sync, tmp_path):
+    config = {
+        "concurrency": 1, "storage": str(tmp_path), "watch": True, "window": 10, "interval": 60,
+        "backup_only": True, "dry_run": False, "checkout": False, "engine": "threaded"
+    }
+    repo = Repository(name="repo1", clone_url="url", pushed_at=datetime(2024, 1, 1))
+    source = MagicMock()
+    source.fetch_repos.return_value = [repo]
+    mock_sync.return_value = SyncResult(name="repo1", error="fatal: could not read from remote")
+
+    store = StateStore(":memory:")
+    assert run_sync_cycle(config, source, None, store) == 0
+    assert run_sync_cycle(config, source, None, store) == 0
+    assert mock_sync.call_count == 2
+    assert store.get("repo1").error == "fatal: could not read from remote"
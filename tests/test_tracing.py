@@ -0,0 +1,90 @@
+import json
+import asyncio
+import threading
+from holocron.providers.base import Repository
+from holocron.tracing import Tracer, set_tracer, span, lane, traced
+
+def test_traced_records_spans_per_thread(tmp_path):
+    @traced("git")
+    def fetch(repo, storage):
+        with span("inner", "git"):
+            pass
+
+    tracer = Tracer()
+    set_tracer(tracer)
+    try:
+        fetch(Repository(name="alpha", clone_url="url"), "/tmp")
+        worker = threading.Thread(target=fetch, kwargs={"repo": Repository(name="beta", clone_url="url"), "storage": "/tmp"}, name="worker-1")
+        worker.start()
+        worker.join()
+        path = tracer.dump(str(tmp_path))
+    finally:
+        set_tracer(None)
+
+    events = json.load(open(path))["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    names = {e["args"]["name"] for e in events if e["ph"] == "M"}
+    assert "worker-1" in names
+    outer = [e for e in spans if e["name"] == "fetch"]
+    assert [e["args"] for e in outer] == [{"repo": "alpha"}, {"repo": "beta"}]
+    assert outer[0]["tid"] != outer[1]["tid"] and outer[0]["cat"] == "git"
+    inner = [e for e in spans if e["name"] == "inner"][0]
+    assert outer[0]["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer[0]["ts"] + outer[0]["dur"] + 1
+    # dump() starts a new trace
+    assert tracer.events() == []
+
+def test_async_spans_use_lanes():
+    @traced("git", record=())
+    async def work():
+        await asyncio.sleep(0.01)
+
+    async def run(slot):
+        with lane(1000 + slot, f"async-worker-{slot}"):
+            await work()
+
+    async def main():
+        await asyncio.gather(run(0), run(1))
+
+    tracer = Tracer()
+    set_tracer(tracer)
+    try:
+        asyncio.run(main())
+    finally:
+        set_tracer(None)
+
+    spans = [e for e in tracer.events() if e["ph"] == "X"]
+    assert sorted(e["tid"] for e in spans) == [1000, 1001]
+    assert all(e["dur"] >= 10_000 for e in spans)
+
+def test_traced_generator_spans_whole_run():
+    @traced("git")
+    def plan(repo):
+        out = yield "step"
+        return out * 2
+
+    tracer = Tracer()
+    set_tracer(tracer)
+    try:
+        steps = plan(Repository(name="alpha", clone_url="url"))
+        assert next(steps) == "step"
+        # The span is still open while the plan waits for its step
+        assert tracer.events() == []
+        try:
+            steps.send(21)
+        except StopIteration as stop:
+            assert stop.value == 42
+    finally:
+        set_tracer(None)
+
+    spans = [e for e in tracer.events() if e["ph"] == "X"]
+    assert [(e["name"], e["args"]) for e in spans] == [("plan", {"repo": "alpha"})]
+
+def test_tracing_off_records_nothing():
+    calls = []
+
+    @traced("sync")
+    def sync(repo):
+        calls.append(repo)
+        return 42
+
+    assert sync("r") == 42 and calls == ["r"]
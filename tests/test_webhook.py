@@ -0,0 +1,199 @@
+import hmac
+import json
+import time
+import hashlib
+import threading
+import pytest
+import requests
+from unittest.mock import MagicMock
+from holocron.__main__ import reconcile, route_event
+from holocron.providers.base import Repository, RepoChange
+from holocron.state import StateStore
+from holocron.webhook import Coalescer, WebhookServer, Inventory, parse_event, find_repository, check_exposure, verify_github_signature, verify_gitlab_token
+
+GITHUB_PUSH = {
+    "ref": "refs/heads/main",
+    "repository": {"id": 7, "name": "holocron", "clone_url": "https://github.com/someone/holocron.git", "default_branch": "main", "size": 42}
+}
+GITLAB_PUSH = {
+    "object_kind": "push",
+    "project": {"path": "holocron", "path_with_namespace": "group/holocron", "git_http_url": "https://gitlab.local/group/holocron.git"}
+}
+
+def _sign(secret, body):
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+def test_verify_github_signature():
+    body = b'{"a": 1}'
+    assert verify_github_signature("s3cret", body, _sign("s3cret", body))
+    assert not verify_github_signature("s3cret", body, _sign("other", body))
+    assert not verify_github_signature("s3cret", body, None)
+    assert not verify_github_signature("s3cret", body, "sha1=abc")
+
+def test_verify_gitlab_token():
+    assert verify_gitlab_token("s3cret", "s3cret")
+    assert not verify_gitlab_token("s3cret", "wrong")
+    assert not verify_gitlab_token("s3cret", None)
+
+def test_parse_event():
+    change = parse_event({"X-GitHub-Event": "push"}, GITHUB_PUSH)
+    assert change == RepoChange(repo_id=7, name="holocron", event="push")
+
+    change = parse_event({"X-Gitlab-Event": "Tag Push Hook"}, GITLAB_PUSH)
+    assert change.name == "holocron" and change.repo_id is None
+
+    assert parse_event({"X-GitHub-Event": "ping"}, {}) is None
+    assert parse_event({"X-Gitlab-Event": "Issue Hook"}, {}) is None
+    with pytest.raises(ValueError):
+        parse_event({"X-GitHub-Event": "push"}, {})
+    with pytest.raises(ValueError):
+        parse_event({}, GITHUB_PUSH)
+
+@pytest.mark.parametrize("name", ["../../x", "a/b", "..", "x\\..\\y"])
+def test_parse_event_rejects_path_names(name):
+    with pytest.raises(ValueError):
+        parse_event({"X-GitHub-Event": "push"}, {"repository": {"name": name, "clone_url": "https://evil.example/x.git"}})
+    with pytest.raises(ValueError):
+        parse_event({"X-Gitlab-Event": "Push Hook"}, {"project": {"path": name}})
+
+def test_route_event_syncs_listed_repository_only():
+    listed = Repository(name="holocron", clone_url="https://github.com/someone/holocron.git", id=7)
+    inventory = {"holocron": listed}
+    submitted, reconciles = [], []
+
+    # The payload's URL never matters: the listed repository is submitted
+    route_event(parse_event({"X-GitHub-Event": "push"}, GITHUB_PUSH), inventory, submitted.append, lambda: reconciles.append(1))
+    # Matched by ID even if renamed since the listing
+    route_event(RepoChange(repo_id=7, name="renamed", event="push"), inventory, submitted.append, lambda: reconciles.append(1))
+    assert submitted == [listed, listed] and reconciles == []
+
+    # Unknown: reconcile instead of syncing
+    route_event(RepoChange(repo_id=None, name="unknown", event="push"), inventory, submitted.append, lambda: reconciles.append(1))
+    assert submitted == [listed, listed] and reconciles == [1]
+    assert find_repository(inventory, RepoChange(repo_id=8, name="unknown", event="push")) is None
+
+def test_inventory_read_during_reconciliation():
+    inventory = Inventory()
+    change = RepoChange(repo_id=-1, name="missing", event="push")
+    errors = []
+
+    def read():
+        try:
+            for _ in range(2000):
+                find_repository(inventory, change)
+        except RuntimeError as exc:  # "dictionary changed size during iteration"
+            errors.append(exc)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for n in range(2000):
+        inventory.update({f"repo-{n}": Repository(name=f"repo-{n}", clone_url="url", id=n)})
+    reader.join()
+    assert errors == []
+    assert find_repository(inventory, RepoChange(repo_id=1999, name="renamed", event="push")).name == "repo-1999"
+
+def test_secret_required_off_loopback():
+    check_exposure("127.0.0.1", None)
+    check_exposure("::1", None)
+    check_exposure("localhost", None)
+    check_exposure("0.0.0.0", "s3cret")
+    for host in ("0.0.0.0", "::", "192.168.1.5", "example.com"):
+        with pytest.raises(ValueError):
+            check_exposure(host, None)
+    with pytest.raises(ValueError):
+        WebhookServer("0.0.0.0", 0, None, lambda change: None)
+
+@pytest.fixture
+def server():
+    events = []
+    srv = WebhookServer("127.0.0.1", 0, "s3cret", events.append)
+    srv.events = events
+    srv.start()
+    yield srv
+    srv.stop()
+
+def test_server_accepts_signed_deliveries(server):
+    url = f"http://127.0.0.1:{server.port}/"
+    body = json.dumps(GITHUB_PUSH).encode()
+
+    ok = requests.post(url, data=body, headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": _sign("s3cret", body)})
+    gitlab = requests.post(url, json=GITLAB_PUSH, headers={"X-Gitlab-Event": "Push Hook", "X-Gitlab-Token": "s3cret"})
+    ping = requests.post(url, json={}, headers={"X-GitHub-Event": "ping", "X-Hub-Signature-256": _sign("s3cret", b"{}")})
+
+    assert ok.status_code == 202 and ok.text == "queued"
+    assert gitlab.status_code == 202
+    assert ping.status_code == 202 and ping.text == "ignored"
+    assert [repo.name for repo in server.events] == ["holocron", "holocron"]
+
+def test_server_rejects_bad_deliveries(server):
+    url = f"http://127.0.0.1:{server.port}/"
+    body = json.dumps(GITHUB_PUSH).encode()
+
+    forged = requests.post(url, data=body, headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": _sign("guess", body)})
+    no_token = requests.post(url, json=GITLAB_PUSH, headers={"X-Gitlab-Event": "Push Hook"})
+    garbage = requests.post(url, data=b"not json", headers={"X-Gitlab-Event": "Push Hook", "X-Gitlab-Token": "s3cret"})
+
+    assert forged.status_code == 401
+    assert no_token.status_code == 401
+    assert garbage.status_code == 400
+    assert server.events == []
+    assert server.rejected == 2
+
+def test_coalescer_merges_bursts():
+    calls = []
+    coalescer = Coalescer(lambda repo: calls.append(repo.name), delay=0.05)
+    try:
+        for _ in range(20):
+            coalescer.submit(Repository(name="a", clone_url="url"))
+        coalescer.submit(Repository(name="b", clone_url="url"))
+        assert coalescer.wait_idle(timeout=5)
+    finally:
+        coalescer.close()
+    assert sorted(calls) == ["a", "b"]
+
+def test_coalescer_follow_up_for_events_during_sync():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def handler(repo):
+        calls.append(repo.name)
+        started.set()
+        release.wait(timeout=5)
+
+    coalescer = Coalescer(handler, delay=0.01)
+    try:
+        coalescer.submit(Repository(name="a", clone_url="url"))
+        assert started.wait(timeout=5)
+        # Two more pushes while the first sync runs: one follow-up sync, never two in parallel
+        coalescer.submit(Repository(name="a", clone_url="url"))
+        coalescer.submit(Repository(name="a", clone_url="url"))
+        time.sleep(0.05)
+        assert calls == ["a"]
+        release.set()
+        assert coalescer.wait_idle(timeout=5)
+    finally:
+        coalescer.close()
+    assert calls == ["a", "a"]
+
+def test_reconcile_submits_unsynced_repos(tmp_path):
+    from datetime import datetime
+    pushed = datetime(2024, 1, 1)
+    (tmp_path / "synced.git").mkdir()
+    (tmp_path / "moved.git").mkdir()
+    state = StateStore(":memory:")
+    state.record_success("synced", pushed_at=pushed, source_tip="a", destination_tip="a", duration=1.0)
+    state.record_success("moved", pushed_at=pushed, source_tip="a", destination_tip="a", duration=1.0)
+
+    source = MagicMock()
+    source.fetch_repos.return_value = [
+        Repository(name="synced", clone_url="url", pushed_at=pushed),
+        Repository(name="moved", clone_url="url", pushed_at=datetime(2024, 6, 1)),
+        Repository(name="new", clone_url="url", pushed_at=pushed),
+    ]
+    inventory = Inventory()
+    submitted = []
+
+    assert reconcile(source, state, str(tmp_path), inventory, submitted.append) == 2
+    assert sorted(repo.name for repo in submitted) == ["moved", "new"]
+    assert set(inventory) == {"synced", "moved", "new"}